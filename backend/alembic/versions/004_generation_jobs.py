@@ -0,0 +1,55 @@
+"""Add generation_jobs table for the durable generation queue
+
+Revision ID: 004_generation_jobs
+Revises: 003_fix_schema_issues
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_generation_jobs'
+down_revision = '003_fix_schema_issues'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    创建 generation_jobs 表（替代 BackgroundTasks 的持久化生成队列）
+    """
+    op.create_table(
+        'generation_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('worker_id', sa.String(length=100), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_generation_job_claim', 'generation_jobs', ['status', 'available_at'])
+    op.create_index('idx_generation_job_heartbeat', 'generation_jobs', ['status', 'heartbeat_at'])
+    op.create_index('idx_generation_job_course', 'generation_jobs', ['course_id'])
+
+
+def downgrade() -> None:
+    """
+    回滚：删除 generation_jobs 表
+    """
+    op.drop_index('idx_generation_job_course', table_name='generation_jobs')
+    op.drop_index('idx_generation_job_heartbeat', table_name='generation_jobs')
+    op.drop_index('idx_generation_job_claim', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,32 @@
+"""Add checkpoint columns to generation_jobs for resumable generation
+
+Revision ID: 005_generation_checkpoints
+Revises: 004_generation_jobs
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_generation_checkpoints'
+down_revision = '004_generation_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    generation_jobs 增加 checkpoint 字段（部分生成结果，重试时续写）
+    """
+    op.add_column('generation_jobs', sa.Column('checkpoint', sa.Text(), nullable=True))
+    op.add_column('generation_jobs', sa.Column('checkpoint_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """
+    回滚：删除 checkpoint 字段
+    """
+    op.drop_column('generation_jobs', 'checkpoint_at')
+    op.drop_column('generation_jobs', 'checkpoint')
@@ -0,0 +1,37 @@
+"""Move generated course HTML to content-addressed blob storage
+
+Revision ID: 006_course_content_blobs
+Revises: 005_generation_checkpoints
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_course_content_blobs'
+down_revision = '005_generation_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    courses 增加内容引用字段（HTML 存放在对象存储，按 SHA-256 寻址）
+
+    旧数据仍保留在 content 列中，读取时惰性迁移，
+    也可运行 migrate_course_content.py 批量迁移。
+    """
+    op.add_column('courses', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('courses', sa.Column('content_size', sa.Integer(), nullable=True))
+    op.add_column('courses', sa.Column('content_url', sa.String(length=1000), nullable=True))
+
+
+def downgrade() -> None:
+    """
+    回滚：删除内容引用字段（对象存储中的 HTML 不会被删除）
+    """
+    op.drop_column('courses', 'content_url')
+    op.drop_column('courses', 'content_size')
+    op.drop_column('courses', 'content_hash')
@@ -0,0 +1,48 @@
+"""Add (sort key, id) indexes for keyset pagination
+
+Revision ID: 007_keyset_pagination_indexes
+Revises: 006_course_content_blobs
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '007_keyset_pagination_indexes'
+down_revision = '006_course_content_blobs'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('idx_course_user_created_id', 'courses', ['user_id', 'created_at', 'id']),
+    ('idx_course_public_created_id', 'courses', ['is_public', 'status', 'created_at', 'id']),
+    ('idx_course_public_views_id', 'courses', ['is_public', 'status', 'views_count', 'id']),
+    ('idx_course_public_likes_id', 'courses', ['is_public', 'status', 'likes_count', 'id']),
+    ('idx_post_created_id', 'posts', ['created_at', 'id']),
+    ('idx_post_views_id', 'posts', ['views_count', 'id']),
+    ('idx_post_likes_id', 'posts', ['likes_count', 'id']),
+    ('idx_message_user_created_id', 'messages', ['user_id', 'created_at', 'id']),
+    ('idx_export_user_created_id', 'export_tasks', ['user_id', 'created_at', 'id']),
+    ('idx_trans_user_created_id', 'credit_transactions', ['user_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """
+    为 keyset 分页添加 (排序键, id) 复合索引
+
+    WHERE (sort_key, id) < (:key, :id) ORDER BY sort_key DESC, id DESC
+    可以直接走索引范围扫描，不再随页数线性变慢
+    """
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """
+    回滚：删除 keyset 分页索引
+    """
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,65 @@
+"""Add full-text and trigram search indexes for public courses
+
+Revision ID: 008_course_search_index
+Revises: 007_keyset_pagination_indexes
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '008_course_search_index'
+down_revision = '007_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """
+    courses 增加全文检索生成列与 GIN 索引
+
+    - search_vector: 标题 / 简介的 tsvector（数据库随行更新自动维护）
+    - pg_trgm 三元组索引：让 ILIKE '%term%'（中文子串）可以走索引
+    """
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        'courses',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_SQL, persisted=True),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'idx_course_search_vector', 'courses', ['search_vector'],
+        postgresql_using='gin'
+    )
+    op.create_index(
+        'idx_course_title_trgm', 'courses', ['title'],
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'idx_course_description_trgm', 'courses', ['description'],
+        postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """
+    回滚：删除搜索索引与生成列（保留 pg_trgm 扩展）
+    """
+    op.drop_index('idx_course_description_trgm', table_name='courses')
+    op.drop_index('idx_course_title_trgm', table_name='courses')
+    op.drop_index('idx_course_search_vector', table_name='courses')
+    op.drop_column('courses', 'search_vector')
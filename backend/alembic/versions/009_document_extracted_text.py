@@ -0,0 +1,44 @@
+"""Persist extracted document text on upload
+
+Revision ID: 009_document_extracted_text
+Revises: 008_course_search_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_document_extracted_text'
+down_revision = '008_course_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    documents 增加存储路径与提取结果字段
+
+    - file_path: 对象存储中的路径（删除文件、重新解析时使用）
+    - extracted_text: zlib 压缩的提取文本（上传后后台解析一次）
+    - page_count / char_count / content_hash: 页数、字符数、文本 SHA-256
+
+    旧文档在首次生成时解析并回填。
+    """
+    op.add_column('documents', sa.Column('file_path', sa.String(length=1000), nullable=True))
+    op.add_column('documents', sa.Column('extracted_text', sa.LargeBinary(), nullable=True))
+    op.add_column('documents', sa.Column('page_count', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('char_count', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """
+    回滚：删除提取结果与存储路径字段
+    """
+    op.drop_column('documents', 'content_hash')
+    op.drop_column('documents', 'char_count')
+    op.drop_column('documents', 'page_count')
+    op.drop_column('documents', 'extracted_text')
+    op.drop_column('documents', 'file_path')
@@ -0,0 +1,34 @@
+"""Claim document text extraction across processes
+
+Revision ID: 010_document_extract_claim
+Revises: 009_document_extracted_text
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010_document_extract_claim'
+down_revision = '009_document_extracted_text'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    documents 增加 claimed_at
+
+    多个 API 进程 / 机器启动时都会重新排队未完成的文档：
+    解析前以条件 UPDATE 认领（写入 claimed_at），解析期间心跳续期，
+    同一文档只被一个进程解析；认领失效后由其他进程接管。
+    """
+    op.add_column('documents', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """
+    回滚：删除 claimed_at
+    """
+    op.drop_column('documents', 'claimed_at')
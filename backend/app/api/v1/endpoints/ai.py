@@ -2,7 +2,7 @@
 AI Generation API endpoints
 """
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -12,7 +12,9 @@ from app.models.user import User
 from app.models.document import Document
 from app.models.course import Course
 from app.services.ai_service import ai_service
-from app.services.document_parser import document_parser
+from app.services.course_content_store import course_content_store
+from app.services.document_pipeline import document_pipeline
+from app.services.stream_sessions import stream_sessions, parse_last_event_id
 from pydantic import BaseModel
 
 
@@ -68,7 +70,7 @@ async def generate_from_document(
     # Parse document content
     try:
         # Extract text from document file
-        content = await document_parser.parse_from_storage(document.file_url)
+        content = await document_pipeline.get_text(db, document)
 
         # Add title as context
         full_content = f"# {document.title}\n\n## 文档内容\n\n{content}"
@@ -88,20 +90,22 @@ async def generate_from_document(
                 difficulty=gen_request.difficulty,
                 title=gen_request.title or document.title
             ):
-                if await request.is_disconnected():
-                    break
                 yield chunk
         except Exception as e:
             import json
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
+    # 生成在后台进行，客户端断开后可带 Last-Event-ID 重连
+    stream_id = await stream_sessions.start(event_generator(), owner_id=current_user.id)
+
     headers = {
         "Cache-Control": "no-store",
         "Content-Type": "text/event-stream; charset=utf-8",
         "X-Accel-Buffering": "no",
+        "X-Stream-Id": stream_id,
     }
 
-    return StreamingResponse(event_generator(), headers=headers)
+    return StreamingResponse(stream_sessions.subscribe(stream_id), headers=headers)
 
 
 @router.post("/generate/text")
@@ -124,20 +128,22 @@ async def generate_from_text(
                 difficulty=gen_request.difficulty,
                 title=gen_request.title
             ):
-                if await request.is_disconnected():
-                    break
                 yield chunk
         except Exception as e:
             import json
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
+    # 生成在后台进行，客户端断开后可带 Last-Event-ID 重连
+    stream_id = await stream_sessions.start(event_generator(), owner_id=current_user.id)
+
     headers = {
         "Cache-Control": "no-store",
         "Content-Type": "text/event-stream; charset=utf-8",
         "X-Accel-Buffering": "no",
+        "X-Stream-Id": stream_id,
     }
 
-    return StreamingResponse(event_generator(), headers=headers)
+    return StreamingResponse(stream_sessions.subscribe(stream_id), headers=headers)
 
 
 @router.post("/regenerate")
@@ -174,7 +180,7 @@ async def regenerate_course(
         if document:
             try:
                 # Parse document content
-                parsed_content = await document_parser.parse_from_storage(document.file_url)
+                parsed_content = await document_pipeline.get_text(db, document)
                 content = f"# {document.title}\n\n## 文档内容\n\n{parsed_content}"
             except Exception:
                 content = f"Document: {document.title}"
@@ -186,8 +192,9 @@ async def regenerate_course(
     # Add feedback to history if provided
     history = []
     if regen_request.feedback:
+        previous_html = await course_content_store.load(course)
         history = [
-            {"role": "assistant", "content": course.content or ""},
+            {"role": "assistant", "content": previous_html or ""},
             {"role": "user", "content": f"请根据以下反馈重新生成：{regen_request.feedback}"}
         ]
 
@@ -201,17 +208,47 @@ async def regenerate_course(
                 title=course.title,
                 history=history
             ):
-                if await request.is_disconnected():
-                    break
                 yield chunk
         except Exception as e:
             import json
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
+    # 生成在后台进行，客户端断开后可带 Last-Event-ID 重连
+    stream_id = await stream_sessions.start(event_generator(), owner_id=current_user.id)
+
+    headers = {
+        "Cache-Control": "no-store",
+        "Content-Type": "text/event-stream; charset=utf-8",
+        "X-Accel-Buffering": "no",
+        "X-Stream-Id": stream_id,
+    }
+
+    return StreamingResponse(stream_sessions.subscribe(stream_id), headers=headers)
+
+
+@router.get("/generate/stream/{stream_id}")
+async def resume_generation_stream(
+    stream_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Reattach to a generation stream after a dropped connection
+
+    Replays events after Last-Event-ID, then follows the live generation
+    """
+    owner_id = await stream_sessions.owner(stream_id)
+    if owner_id is None or owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+
     headers = {
         "Cache-Control": "no-store",
         "Content-Type": "text/event-stream; charset=utf-8",
         "X-Accel-Buffering": "no",
+        "X-Stream-Id": stream_id,
     }
 
-    return StreamingResponse(event_generator(), headers=headers)
+    return StreamingResponse(
+        stream_sessions.subscribe(stream_id, parse_last_event_id(last_event_id)),
+        headers=headers
+    )
@@ -1,33 +1,96 @@
 """
 Course Management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Header
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload, load_only
+from typing import List, Optional, Set
 import json
+import logging
 
 from app.core.supabase_db import get_db
 from app.core.dependencies import get_current_user, get_current_user_optional
+from app.core.pagination import paginate, page_results, paginate_ranked, page_ranked_results
 from app.models.user import User
 from app.models.course import Course
 from app.models.document import Document
-from app.models.message import Message
-from app.models.course_like import CourseLike
 from app.schemas.course import (
     CourseCreate,
     CourseUpdate,
     CourseResponse,
+    CourseListItem,
     CourseListResponse,
     CourseGenerationRequest
 )
 from app.services.ai_service import ai_service
+from app.services.course_content_store import course_content_store
+from app.services.count_cache import count_cache
+from app.services.response_cache import response_cache, SQUARE, course_namespace
+from app.services.search_service import course_search
+from app.services.engagement import counter_buffer, like_service
 from app.services.credit_service import credit_service
+from app.services.generation_queue import generation_queue
+from app.services.stream_sessions import stream_sessions, parse_last_event_id
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+# 列表接口可返回的字段（不含 content，HTML 只从详情 / content 接口获取）
+LIST_FIELDS = set(CourseListItem.model_fields)
+# 列表查询始终加载的列（主键 + 用户外键，用于关系解析）
+LIST_REQUIRED_COLUMNS = {"id", "user_id"}
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """
+    解析 sparse fieldset 参数（逗号分隔）
+
+    Returns:
+        None 表示返回全部列表字段
+    """
+    if not fields:
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - LIST_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return requested
+
+
+# 列表排序（keyset 分页的排序键，最后一列必须唯一）
+LIST_SORT_COLUMNS = {
+    "latest": (Course.created_at, Course.id),
+    "popular": (Course.views_count, Course.id),
+    "rating": (Course.likes_count, Course.id),
+}
+
+
+def _list_load_only(fields: Optional[Set[str]], order_columns=()):
+    """只加载列表需要的列（不加载 content JSON 列），排序键始终加载以生成游标"""
+    names = (fields or LIST_FIELDS) - {"user"}
+    names |= LIST_REQUIRED_COLUMNS | {column.key for column in order_columns}
+    columns = [getattr(Course, name) for name in sorted(names)]
+    return load_only(*columns)
+
+
+def _to_list_item(course: Course, fields: Optional[Set[str]]) -> CourseListItem:
+    if fields is None:
+        item = CourseListItem.model_validate(course)
+    else:
+        item = CourseListItem.model_validate({name: getattr(course, name) for name in fields})
+
+    # 浏览量 = 已持久化的值 + 尚未写回的增量
+    if item.views_count is not None:
+        item.views_count = counter_buffer.current(Course, course.id, item.views_count)
+    return item
 
 
 @router.post("/", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
@@ -65,11 +128,15 @@ async def create_course(
         description=course_data.description or "",
         style=course_data.style or "standard",
         difficulty=course_data.difficulty or "beginner",
-        content=course_data.content,  # 支持保存生成的 HTML
         status=course_data.status or "draft",
         is_public=course_data.is_public or False
     )
 
+    # 生成的 HTML 写入内容寻址存储，行上只保留哈希 / 大小 / URL
+    html = _generated_html(course_data.content)
+    if html is not None:
+        await course_content_store.attach(course, html)
+
     db.add(course)
     await db.commit()
     await db.refresh(course)
@@ -77,49 +144,62 @@ async def create_course(
     return CourseResponse.model_validate(course)
 
 
-@router.get("/", response_model=CourseListResponse)
+@router.get("/", response_model=CourseListResponse, response_model_exclude_unset=True)
 async def get_courses(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (compatibility mode, ignored with cursor)"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor of the previous page"),
     status: Optional[str] = Query(None, description="Filter by status"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,cover_image"),
+    count: str = Query("exact", regex="^(exact|estimated)$", description="Total mode: exact (cached) / estimated"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get user's courses with pagination
+
+    List items never include the generated HTML; use GET /{course_id}
+    or GET /{course_id}/content for that.
     """
+    selected_fields = _parse_fields(fields)
+
     # Build query
     query_filter = [Course.user_id == current_user.id]
     if status:
         query_filter.append(Course.status == status)
 
-    # Get total count
-    count_query = select(func.count()).select_from(Course).where(*query_filter)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # Get total count (cached per filter; estimated mode skips COUNT(*))
+    total = await count_cache.count(
+        db, Course.__tablename__, select(Course.id).where(*query_filter), mode=count
+    )
 
     # Get courses
-    offset = (page - 1) * page_size
-    query = select(Course).where(*query_filter).order_by(
-        Course.created_at.desc()
-    ).offset(offset).limit(page_size)
+    order_columns = LIST_SORT_COLUMNS["latest"]
+    query = select(Course).options(
+        _list_load_only(selected_fields, order_columns)
+    ).where(*query_filter)
+    query = paginate(query, order_columns, "latest", page_size, cursor=cursor, page=page)
 
     result = await db.execute(query)
-    courses = result.scalars().all()
+    courses, next_cursor = page_results(result.scalars().all(), order_columns, "latest", page_size)
 
     return CourseListResponse(
-        courses=[CourseResponse.model_validate(course) for course in courses],
+        courses=[_to_list_item(course, selected_fields) for course in courses],
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/my-courses", response_model=CourseListResponse)
+@router.get("/my-courses", response_model=CourseListResponse, response_model_exclude_unset=True)
 async def get_my_courses(
-    page: int = Query(1, ge=1),
+    page: int = Query(1, ge=1, description="页码（兼容模式，传 cursor 时忽略）"),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
     status: Optional[str] = Query(None, description="processing(含pending)/completed/failed"),
+    fields: Optional[str] = Query(None, description="只返回指定字段（逗号分隔）"),
+    count: str = Query("exact", regex="^(exact|estimated)$", description="总数模式: exact（缓存的精确值）/estimated（估算）"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -130,7 +210,11 @@ async def get_my_courses(
     - processing: 生成中（包含 pending 排队中）
     - completed: 已完成
     - failed: 失败
+
+    列表不包含生成的 HTML（content），需要时请求详情或 content 接口
     """
+    selected_fields = _parse_fields(fields)
+
     # 构建查询条件
     query_filter = [Course.user_id == current_user.id]
     if status:
@@ -140,35 +224,40 @@ async def get_my_courses(
         else:
             query_filter.append(Course.status == status)
 
-    # 获取总数
-    count_query = select(func.count()).select_from(Course).where(*query_filter)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # 获取总数（按过滤条件缓存；estimated 模式使用规划器估算）
+    total = await count_cache.count(
+        db, Course.__tablename__, select(Course.id).where(*query_filter), mode=count
+    )
 
     # 获取列表
-    offset = (page - 1) * page_size
-    query = select(Course).where(*query_filter).order_by(
-        Course.created_at.desc()
-    ).offset(offset).limit(page_size)
+    order_columns = LIST_SORT_COLUMNS["latest"]
+    query = select(Course).options(
+        _list_load_only(selected_fields, order_columns)
+    ).where(*query_filter)
+    query = paginate(query, order_columns, "latest", page_size, cursor=cursor, page=page)
 
     result = await db.execute(query)
-    courses = result.scalars().all()
+    courses, next_cursor = page_results(result.scalars().all(), order_columns, "latest", page_size)
 
     return CourseListResponse(
-        courses=[CourseResponse.model_validate(course) for course in courses],
+        courses=[_to_list_item(course, selected_fields) for course in courses],
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/public/list", response_model=CourseListResponse)
+@router.get("/public/list", response_model=CourseListResponse, response_model_exclude_unset=True)
 async def get_public_courses(
-    page: int = Query(1, ge=1, description="页码"),
+    page: int = Query(1, ge=1, description="页码（兼容模式，传 cursor 时忽略）"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
     category: Optional[str] = Query(None, description="分类筛选"),
-    sort_by: str = Query("latest", description="排序方式: latest/popular/rating"),
+    sort_by: Optional[str] = Query(None, description="排序方式: latest/popular/rating/relevance（有搜索词时默认 relevance）"),
     search: Optional[str] = Query(None, description="搜索关键词"),
+    fields: Optional[str] = Query(None, description="只返回指定字段（逗号分隔）"),
+    count: str = Query("exact", regex="^(exact|estimated)$", description="总数模式: exact（缓存的精确值）/estimated（估算）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -177,9 +266,55 @@ async def get_public_courses(
     支持：
     - 分页
     - 分类筛选
-    - 搜索
+    - 搜索（全文 / 中文子串，默认按相关度排序）
     - 多种排序方式
+    - 字段裁剪（fields=id,title,cover_image）
+
+    列表不包含生成的 HTML（content）
+
+    响应按规范化的查询参数缓存（stale-while-revalidate），
+    课程发布 / 下架 / 修改 / 删除后失效
     """
+    selected_fields = _parse_fields(fields)
+
+    # 规范化查询参数（作为缓存键）
+    if not category or category == "全部":
+        category = None
+    search = search.strip() if search and search.strip() else None
+    params = {
+        "endpoint": "courses",
+        "page": page,
+        "page_size": page_size,
+        "cursor": cursor,
+        "category": category,
+        "sort_by": sort_by,
+        "search": search,
+        "fields": sorted(selected_fields) if selected_fields is not None else None,
+        "count": count,
+    }
+
+    return await response_cache.get_or_compute(
+        SQUARE,
+        params,
+        lambda session: _public_courses_page(
+            session, page, page_size, cursor, category, sort_by, search, selected_fields, count
+        ),
+        db
+    )
+
+
+async def _public_courses_page(
+    db: AsyncSession,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    category: Optional[str],
+    sort_by: Optional[str],
+    search: Optional[str],
+    selected_fields: Optional[Set[str]],
+    count: str,
+) -> CourseListResponse:
+    """查询广场列表的一页（响应缓存的计算函数）"""
     # 构建查询条件
     query_filter = [
         Course.is_public == True,
@@ -187,63 +322,84 @@ async def get_public_courses(
     ]
 
     # 分类筛选
-    if category and category != "全部":
+    if category:
         query_filter.append(Course.category == category)
 
-    # 搜索
+    # 搜索（走全文 / 三元组索引或进程内倒排索引）
+    rank = None
     if search:
-        search_pattern = f"%{search}%"
-        query_filter.append(
-            (Course.title.ilike(search_pattern)) |
-            (Course.description.ilike(search_pattern))
-        )
+        search_condition, rank = course_search.clause(search)
+        query_filter.append(search_condition)
 
-    # 获取总数
-    count_query = select(func.count()).select_from(Course).where(*query_filter)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # 获取总数（按过滤条件缓存；estimated 模式使用规划器估算）
+    total = await count_cache.count(
+        db, Course.__tablename__, select(Course.id).where(*query_filter), mode=count
+    )
 
-    # 构建排序
-    if sort_by == "popular":
-        order_by = Course.views_count.desc()
-    elif sort_by == "rating":
-        order_by = Course.likes_count.desc()
-    else:  # latest
-        order_by = Course.created_at.desc()
+    # 构建排序（latest/popular/rating；有搜索词时默认按相关度，未知值按 latest）
+    if sort_by is None and rank is not None:
+        sort_by = "relevance"
+    if sort_by == "relevance" and rank is None:
+        sort_by = "latest"
+    if sort_by != "relevance" and sort_by not in LIST_SORT_COLUMNS:
+        sort_by = "latest"
+    order_columns = LIST_SORT_COLUMNS["latest" if sort_by == "relevance" else sort_by]
 
     # 获取列表（加载用户关系）
-    offset = (page - 1) * page_size
-    query = (
-        select(Course)
-        .options(selectinload(Course.user))  # 预加载用户信息
-        .where(*query_filter)
-        .order_by(order_by)
-        .offset(offset)
-        .limit(page_size)
-    )
+    query = select(Course).options(_list_load_only(selected_fields, order_columns))
+    if selected_fields is None or "user" in selected_fields:
+        # 预加载用户信息（只取列表展示需要的列）
+        query = query.options(
+            selectinload(Course.user).load_only(User.id, User.username, User.avatar_url)
+        )
+    query = query.where(*query_filter)
 
-    result = await db.execute(query)
-    courses = result.scalars().all()
+    if sort_by == "relevance":
+        query, offset = paginate_ranked(query, rank, Course.id, page_size, cursor=cursor, page=page)
+        result = await db.execute(query)
+        courses, next_cursor = page_ranked_results(result.scalars().all(), page_size, offset)
+    else:
+        query = paginate(query, order_columns, sort_by, page_size, cursor=cursor, page=page)
+        result = await db.execute(query)
+        courses, next_cursor = page_results(result.scalars().all(), order_columns, sort_by, page_size)
 
     return CourseListResponse(
-        courses=[CourseResponse.model_validate(course) for course in courses],
+        courses=[_to_list_item(course, selected_fields) for course in courses],
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{course_id}", response_model=CourseResponse)
 async def get_course(
     course_id: int,
+    include_content: bool = Query(True, description="Inline the generated HTML as content.generated"),
     current_user: Optional[User] = Depends(get_current_user_optional),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get course by ID
 
-    Public courses can be accessed without authentication
+    Public courses can be accessed without authentication.
+    The generated HTML is also served on its own by GET /{course_id}/content;
+    pass include_content=false to skip inlining it here.
+
+    Public course responses are identical for every visitor and are served
+    from the response cache (stale-while-revalidate).
     """
+    payload = await response_cache.get_or_compute(
+        course_namespace(course_id),
+        {"endpoint": "course"},
+        lambda session: _public_course_response(session, course_id),
+        db
+    )
+    if payload is not None:
+        counter_buffer.incr(Course, course_id)
+        return await _with_cached_content(payload, include_content)
+
+    # Private (or missing) course: owner-only, never cached
     result = await db.execute(
         select(Course).where(Course.id == course_id)
     )
@@ -263,13 +419,157 @@ async def get_course(
                 detail="Access denied"
             )
 
-    # Increment views count for public courses
+    # 旧数据惰性迁移到对象存储
+    if await _migrate_course_content(course):
+        await db.commit()
+
+    # Increment views count for public courses（写回缓冲，请求路径上不写库）
     if course.is_public:
-        course.views_count += 1
+        counter_buffer.incr(Course, course.id)
+
+    response = CourseResponse.model_validate(course)
+    response.views_count = counter_buffer.current(Course, course.id, course.views_count)
+    if include_content:
+        html = await _load_course_content(course)
+        response.content = {"generated": html} if html is not None else None
+    else:
+        response.content = None
+    return response
+
+
+@router.get("/{course_id}/content")
+async def get_course_content(
+    course_id: int,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Serve the generated HTML of a course
+
+    内容按哈希寻址、不可变，使用哈希作为 ETag
+    """
+    result = await db.execute(
+        select(Course).where(Course.id == course_id)
+    )
+    course = result.scalar_one_or_none()
+
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+
+    if not course.is_public:
+        if not current_user or course.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+
+    if await _migrate_course_content(course):
         await db.commit()
-        await db.refresh(course)
 
-    return CourseResponse.model_validate(course)
+    if not course.content_hash:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course content not generated yet"
+        )
+
+    etag = f'"{course.content_hash}"'
+    cache_control = "public, max-age=300" if course.is_public else "private, max-age=300"
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    html = await _load_course_content(course)
+    return Response(
+        content=html,
+        media_type=course_content_store.CONTENT_TYPE,
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+async def _public_course_response(db: AsyncSession, course_id: int) -> Optional[CourseResponse]:
+    """
+    公开课程详情（响应缓存的计算函数）
+
+    Returns:
+        不含 HTML 的详情；私有或不存在的课程返回 None（同样会被缓存）
+    """
+    result = await db.execute(
+        select(Course).where(Course.id == course_id)
+    )
+    course = result.scalar_one_or_none()
+    if not course or not course.is_public:
+        return None
+
+    if await _migrate_course_content(course):
+        await db.commit()
+
+    response = CourseResponse.model_validate(course)
+    response.views_count = counter_buffer.current(Course, course.id, course.views_count)
+    return response
+
+
+async def _with_cached_content(payload: dict, include_content: bool) -> dict:
+    """为缓存的详情补上 HTML（按哈希从内容存储读取，存储自带进程内 LRU）"""
+    payload = dict(payload)  # 缓存条目可能被共享，不能原地修改
+    if not include_content:
+        payload["content"] = None
+    elif payload.get("content_hash"):
+        try:
+            html = await course_content_store.get(payload["content_hash"])
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Failed to load course content: {str(e)}"
+            )
+        payload["content"] = {"generated": html}
+    return payload
+
+
+def _generated_html(content: Optional[dict]) -> Optional[str]:
+    """
+    取出请求 content 中的 HTML（{"generated": html}）
+
+    HTML 存放在内容存储中，content 不再原样保存：其他键直接拒绝，而不是静默丢弃
+    """
+    if not content:
+        return None
+
+    unsupported = sorted(set(content) - {"generated"})
+    if unsupported:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unsupported content keys: {', '.join(unsupported)}; only 'generated' is stored"
+        )
+
+    html = content.get("generated")
+    if html is not None and not isinstance(html, str):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="content.generated must be an HTML string"
+        )
+    return html
+
+
+async def _migrate_course_content(course: Course) -> bool:
+    """迁移失败不影响读取（下次访问重试）"""
+    try:
+        return await course_content_store.migrate(course)
+    except Exception as e:
+        logger.warning(f"Failed to migrate content of course {course.id}: {e}")
+        return False
+
+
+async def _load_course_content(course: Course) -> Optional[str]:
+    try:
+        return await course_content_store.load(course)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to load course content: {str(e)}"
+        )
 
 
 @router.put("/{course_id}", response_model=CourseResponse)
@@ -298,6 +598,16 @@ async def update_course(
 
     # Update fields
     update_data = course_data.model_dump(exclude_unset=True)
+    if "content" in update_data:
+        content = update_data.pop("content")
+        if content is None:
+            # 显式传 null 才清空内容
+            await course_content_store.attach(course, None)
+        else:
+            html = _generated_html(content)
+            if html is not None:
+                await course_content_store.attach(course, html)
+
     for field, value in update_data.items():
         setattr(course, field, value)
 
@@ -348,47 +658,18 @@ async def like_course(
     防重复点赞：
     - 如果已点赞，则取消点赞
     - 如果未点赞，则添加点赞
+
+    切换与计数更新在一条语句中原子完成（并发点赞不会丢失更新）
     """
-    # 检查课程是否存在且公开
-    result = await db.execute(
-        select(Course).where(
-            Course.id == course_id,
-            Course.is_public == True
-        )
-    )
-    course = result.scalar_one_or_none()
+    result = await like_service.toggle_course_like(db, current_user.id, course_id)
 
-    if not course:
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="课程不存在或未公开"
         )
 
-    # 检查是否已点赞
-    like_result = await db.execute(
-        select(CourseLike).where(
-            CourseLike.user_id == current_user.id,
-            CourseLike.course_id == course_id
-        )
-    )
-    existing_like = like_result.scalar_one_or_none()
-
-    if existing_like:
-        # 已点赞，取消点赞
-        await db.delete(existing_like)
-        course.likes_count -= 1
-        await db.commit()
-        return {"liked": False, "likes_count": course.likes_count}
-    else:
-        # 未点赞，添加点赞
-        new_like = CourseLike(
-            user_id=current_user.id,
-            course_id=course_id
-        )
-        db.add(new_like)
-        course.likes_count += 1
-        await db.commit()
-        return {"liked": True, "likes_count": course.likes_count}
+    return {"liked": result["liked"], "likes_count": result["likes_count"]}
 
 
 @router.post("/generate/stream")
@@ -408,6 +689,9 @@ async def generate_course_stream(
 
     Supports both text input and file upload (PDF/PPT/Word)
     Returns Server-Sent Events (SSE) stream
+
+    生成在后台进行，客户端断开不会中断；事件带编号（id: N），
+    可通过 GET /generate/stream/{stream_id} 携带 Last-Event-ID 重连
     """
     # 🔥 步骤1：扣除积分（100积分/次）
     try:
@@ -465,12 +749,44 @@ async def generate_course_stream(
             error_data = json.dumps({"event": "error", "message": str(e)}, ensure_ascii=False)
             yield f"data: {error_data}\n\n"
 
+    stream_id = await stream_sessions.start(event_generator(), owner_id=current_user.id)
+
     return StreamingResponse(
-        event_generator(),
+        stream_sessions.subscribe(stream_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-store",
-            "X-Accel-Buffering": "no"
+            "X-Accel-Buffering": "no",
+            "X-Stream-Id": stream_id
+        }
+    )
+
+
+@router.get("/generate/stream/{stream_id}")
+async def resume_course_stream(
+    stream_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Reattach to a generation stream
+
+    从 Last-Event-ID 之后补发事件，然后继续跟随实时生成，不会重复扣费
+    """
+    owner_id = await stream_sessions.owner(stream_id)
+    if owner_id is None or owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stream not found or expired"
+        )
+
+    return StreamingResponse(
+        stream_sessions.subscribe(stream_id, parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+            "X-Stream-Id": stream_id
         }
     )
 
@@ -478,7 +794,6 @@ async def generate_course_stream(
 @router.post("/generate", response_model=CourseResponse, status_code=status.HTTP_202_ACCEPTED)
 async def generate_course_async(
     course_data: CourseGenerationRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -489,10 +804,10 @@ async def generate_course_async(
     1. 扣除积分（100积分/次）
     2. 如果有 document_id，解析文档内容
     3. 创建 Course 记录（状态：pending）
-    4. 添加后台任务
+    4. 写入持久化生成队列（与 Course 同一事务提交）
     5. 立即返回任务信息
     """
-    from app.services.document_parser import document_parser
+    from app.services.document_pipeline import document_pipeline
 
     # 1. 扣除积分（100积分/次）
     try:
@@ -524,7 +839,7 @@ async def generate_course_async(
         if document:
             try:
                 # 解析文档内容
-                content_to_generate = await document_parser.parse_from_storage(document.file_url)
+                content_to_generate = await document_pipeline.get_text(db, document)
             except Exception as e:
                 print(f"文档解析失败: {e}")
                 # 如果解析失败，使用文档标题作为内容
@@ -549,12 +864,11 @@ async def generate_course_async(
     )
 
     db.add(course)
-    await db.commit()
-    await db.refresh(course)
+    await db.flush()
 
-    # 4. 添加后台任务（异步生成）
-    background_tasks.add_task(
-        generate_course_background,
+    # 4. 写入生成队列（worker 领取后执行，进程重启不会丢失）
+    await generation_queue.enqueue(
+        db,
         course_id=course.id,
         user_id=current_user.id,
         content=content_to_generate,
@@ -562,112 +876,11 @@ async def generate_course_async(
         difficulty=course_data.difficulty or "beginner",
         title=course_data.title or "未命名课程"
     )
+    await db.refresh(course)
 
     return CourseResponse.model_validate(course)
 
 
-async def generate_course_background(
-    course_id: int,
-    user_id: int,
-    content: str,
-    style: str,
-    difficulty: str,
-    title: str
-):
-    """
-    后台生成动画任务
-
-    流程：
-    1. 更新状态为 processing
-    2. 调用 AI 服务生成内容
-    3. 成功 -> 更新状态为 completed，发送成功通知
-    4. 失败 -> 更新状态为 failed，退还积分，发送失败通知
-    """
-    from app.core.supabase_db import get_db
-    from app.services.ai_service import ai_service
-
-    # 创建新的数据库会话（后台任务）
-    async for db in get_db():
-        try:
-            # 1. 获取 Course 记录
-            result = await db.execute(
-                select(Course).where(Course.id == course_id)
-            )
-            course = result.scalar_one()
-
-            # 2. 更新状态为 processing
-            course.status = "processing"
-            await db.commit()
-
-            # 3. 执行 AI 生成（耗时操作）
-            # 收集所有生成的内容
-            generated_content = ""
-            async for chunk in ai_service.generate_course_content_stream(
-                content=content,
-                style=style,
-                difficulty=difficulty,
-                title=title
-            ):
-                # 解析 SSE 格式的数据
-                if chunk.startswith("data: "):
-                    data_str = chunk[6:].strip()
-                    if data_str:
-                        try:
-                            data = json.loads(data_str)
-                            # AI 服务发送 {"token": "..."} 格式
-                            if "token" in data:
-                                generated_content += data["token"]
-                            elif data.get("error"):
-                                raise Exception(data["error"])
-                        except json.JSONDecodeError:
-                            continue
-
-            # 4. 成功：更新 Course 内容
-            course.content = {"generated": generated_content}
-            course.status = "completed"
-            await db.commit()
-
-            # 5. 发送成功通知
-            message = Message(
-                user_id=user_id,
-                title="动画生成成功 🎉",
-                content=f"您的课程《{title}》已生成完毕，快去查看吧！",
-                message_type="animation_success",
-                related_course_id=course_id
-            )
-            db.add(message)
-            await db.commit()
-
-        except Exception as e:
-            # 失败处理
-            print(f"生成失败: {e}")
-
-            # 更新状态为 failed
-            course.status = "failed"
-            course.fail_reason = str(e)
-            await db.commit()
-
-            # 退还积分
-            await credit_service.add_credits(
-                db=db,
-                user_id=user_id,
-                amount=100,
-                transaction_type="REFUND",
-                description="动画生成失败，退还积分"
-            )
-
-            # 发送失败通知
-            message = Message(
-                user_id=user_id,
-                title="动画生成失败 ❌",
-                content=f"很抱歉，《{title}》生成失败。100积分已退回您的账户。",
-                message_type="animation_failed",
-                related_course_id=course_id
-            )
-            db.add(message)
-            await db.commit()
-
-
 @router.post("/{course_id}/publish")
 async def publish_course_to_square(
     course_id: int,
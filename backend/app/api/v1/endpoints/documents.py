@@ -3,12 +3,14 @@ Document Management API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from typing import List
 
 from app.core.supabase_db import get_db
 from app.core.dependencies import get_current_user
 from app.services.storage_service import storage_service
+from app.services.auth_cache import user_cache
+from app.services.document_pipeline import document_pipeline
 from app.models.user import User
 from app.models.document import Document
 from app.schemas.document import (
@@ -34,7 +36,9 @@ async def upload_document(
     """
     Upload a new document
 
-    Supports PDF, PPT, Word files
+    Supports PDF, PPT, Word files. Text is extracted once in the
+    background after upload; the document stays in "processing" until
+    extraction finishes ("success") or fails ("failed").
     """
     # Validate file type
     allowed_extensions = {".pdf", ".ppt", ".pptx", ".doc", ".docx"}
@@ -46,10 +50,12 @@ async def upload_document(
             detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
         )
 
-    # Check storage limit
-    file_content = await file.read()
-    file_size = len(file_content)
-    await file.seek(0)  # Reset file pointer
+    # Check storage limit (size recorded by the multipart parser, so the
+    # upload is never read into memory; it is streamed to storage below)
+    file_size = file.size
+    if file_size is None:
+        file_size = file.file.seek(0, 2)
+        file.file.seek(0)
 
     # Simple storage limit check (can be enhanced with subscription tiers)
     storage_limit = 5 * 1024 * 1024 * 1024  # 5GB for free tier
@@ -59,7 +65,7 @@ async def upload_document(
             detail="Storage limit exceeded"
         )
 
-    # Upload to Supabase Storage
+    # Stream to storage
     upload_result = await storage_service.upload_file(
         file=file,
         user_id=current_user.id,
@@ -71,18 +77,43 @@ async def upload_document(
         user_id=current_user.id,
         title=title,
         file_url=upload_result["public_url"],
+        file_path=upload_result["file_path"],
         file_type=file_ext,
         file_size=file_size,
-        status="success"
+        status="processing"
     )
 
     db.add(document)
 
-    # Update user storage usage
-    current_user.storage_used += file_size
+    # Update user storage usage atomically: current_user may be a cached
+    # snapshot, and concurrent uploads must not overwrite each other's usage.
+    # The limit is re-checked in the same statement.
+    result = await db.execute(
+        update(User)
+        .where(
+            User.id == current_user.id,
+            User.storage_used + file_size <= storage_limit
+        )
+        .values(storage_used=User.storage_used + file_size)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        try:
+            await storage_service.delete_file(upload_result["file_path"])
+        except Exception as e:
+            print(f"Error deleting file from storage: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Storage limit exceeded"
+        )
 
     await db.commit()
     await db.refresh(document)
+    # Core UPDATE bypasses the ORM flush hooks
+    user_cache.invalidate(current_user.supabase_user_id)
+
+    # Extract text in the background (generation reads the stored result)
+    document_pipeline.schedule(document.id)
 
     return DocumentUploadResponse(
         document=DocumentResponse.model_validate(document),
@@ -213,18 +244,23 @@ async def delete_document(
 
     # Delete file from storage
     try:
-        await storage_service.delete_file(document.file_path)
+        if document.file_path:
+            await storage_service.delete_file(document.file_path)
     except Exception as e:
         # Log error but continue with database deletion
         print(f"Error deleting file from storage: {e}")
 
-    # Update user storage usage
-    current_user.storage_used -= document.file_size
-    if current_user.storage_used < 0:
-        current_user.storage_used = 0
+    # Update user storage usage atomically (never below zero)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(storage_used=func.greatest(User.storage_used - document.file_size, 0))
+    )
 
     # Delete document record
     await db.delete(document)
     await db.commit()
+    # Core UPDATE bypasses the ORM flush hooks
+    user_cache.invalidate(current_user.supabase_user_id)
 
     return {"message": "Document deleted successfully"}
@@ -11,9 +11,11 @@ from pydantic import BaseModel
 
 from app.core.supabase_db import get_db
 from app.core.dependencies import get_current_user
+from app.core.pagination import paginate, page_results
 from app.models.user import User
 from app.models.course import Course
 from app.models.export_task import ExportTask
+from app.services.count_cache import count_cache
 
 router = APIRouter()
 
@@ -48,13 +50,16 @@ class ExportTaskListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 @router.get("/", response_model=ExportTaskListResponse)
 async def get_export_tasks(
-    page: int = Query(1, ge=1),
+    page: int = Query(1, ge=1, description="页码（兼容模式，传 cursor 时忽略）"),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
     export_type: Optional[str] = Query(None, description="html/pdf/mp4"),
+    count: str = Query("exact", regex="^(exact|estimated)$", description="总数模式: exact/estimated"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -66,24 +71,22 @@ async def get_export_tasks(
     if export_type:
         query_filter.append(ExportTask.export_type == export_type)
 
-    # 获取总数
-    count_query = select(func.count()).select_from(ExportTask).where(*query_filter)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # 获取总数（按过滤条件缓存）
+    total = await count_cache.count(
+        db, ExportTask.__tablename__, select(ExportTask.id).where(*query_filter), mode=count
+    )
 
     # 获取列表（预加载课程信息）
-    offset = (page - 1) * page_size
-    query = (
+    order_columns = (ExportTask.created_at, ExportTask.id)
+    query = paginate(
         select(ExportTask)
         .options(selectinload(ExportTask.course))
-        .where(*query_filter)
-        .order_by(ExportTask.created_at.desc())
-        .offset(offset)
-        .limit(page_size)
+        .where(*query_filter),
+        order_columns, "latest", page_size, cursor=cursor, page=page
     )
 
     result = await db.execute(query)
-    tasks = result.scalars().all()
+    tasks, next_cursor = page_results(result.scalars().all(), order_columns, "latest", page_size)
 
     # 构建响应
     task_responses = []
@@ -107,7 +110,8 @@ async def get_export_tasks(
         tasks=task_responses,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
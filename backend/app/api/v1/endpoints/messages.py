@@ -4,12 +4,14 @@ Messages API - 站内信
 from fastapi import APIRouter, Depends, Query, status, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from typing import List
+from typing import List, Optional
 
 from app.core.supabase_db import get_db
 from app.core.dependencies import get_current_user
+from app.core.pagination import paginate, page_results
 from app.models.user import User
 from app.models.message import Message
+from app.services.count_cache import count_cache
 
 
 router = APIRouter()
@@ -17,9 +19,11 @@ router = APIRouter()
 
 @router.get("/")
 async def get_messages(
-    page: int = Query(1, ge=1),
+    page: int = Query(1, ge=1, description="页码（兼容模式，传 cursor 时忽略）"),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
     unread_only: bool = Query(False, description="只显示未读"),
+    count: str = Query("exact", regex="^(exact|estimated)$", description="总数模式: exact/estimated"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -28,19 +32,20 @@ async def get_messages(
     if unread_only:
         query_filter.append(Message.is_read == False)
 
-    # 获取总数
-    count_query = select(func.count()).select_from(Message).where(*query_filter)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # 获取总数（按过滤条件缓存，已读 / 新消息写入时失效）
+    total = await count_cache.count(
+        db, Message.__tablename__, select(Message.id).where(*query_filter), mode=count
+    )
 
     # 获取列表
-    offset = (page - 1) * page_size
-    query = select(Message).where(*query_filter).order_by(
-        Message.created_at.desc()
-    ).offset(offset).limit(page_size)
+    order_columns = (Message.created_at, Message.id)
+    query = paginate(
+        select(Message).where(*query_filter),
+        order_columns, "latest", page_size, cursor=cursor, page=page
+    )
 
     result = await db.execute(query)
-    messages = result.scalars().all()
+    messages, next_cursor = page_results(result.scalars().all(), order_columns, "latest", page_size)
 
     return {
         "messages": [
@@ -58,7 +63,8 @@ async def get_messages(
         ],
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "next_cursor": next_cursor
     }
 
 
@@ -3,15 +3,20 @@ Posts API endpoints - Fun Square (内容广场)
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import Optional
+from sqlalchemy import select
+from typing import List, Optional
 
 from app.core.supabase_db import get_db
 from app.core.dependencies import get_current_user, get_current_user_optional
+from app.core.pagination import paginate, page_results, paginate_ranked, page_ranked_results
 from app.models.user import User
 from app.models.course import Course
 from app.models.post import Post
 from app.schemas.post import PostCreate, PostUpdate, PostResponse, PostListResponse
+from app.services.count_cache import count_cache
+from app.services.engagement import counter_buffer, like_service
+from app.services.response_cache import response_cache, SQUARE
+from app.services.search_service import course_search
 
 
 router = APIRouter()
@@ -71,25 +76,77 @@ async def create_post(
     await db.commit()
     await db.refresh(post)
 
-    return await get_post_with_details(post.id, db)
+    # Course and author are already loaded: no extra lookups
+    return _to_post_response(post, {
+        "course_title": course.title,
+        "course_description": course.description,
+        "course_cover_image": course.cover_image,
+        "username": current_user.username,
+        "user_avatar": current_user.avatar_url,
+    })
+
+
+# Sort orders for keyset pagination (last column must be unique)
+POST_SORT_COLUMNS = {
+    "latest": (Post.created_at, Post.id),
+    "popular": (Post.views_count, Post.id),
+    "trending": (Post.likes_count, Post.id),
+}
 
 
 @router.get("/", response_model=PostListResponse)
 async def get_posts(
-    page: int = Query(1, ge=1),
+    page: int = Query(1, ge=1, description="Page number (compatibility mode, ignored with cursor)"),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor of the previous page"),
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    sort: str = Query("latest", regex="^(latest|popular|trending)$"),
+    sort: Optional[str] = Query(None, regex="^(latest|popular|trending|relevance)$"),
+    count: str = Query("exact", regex="^(exact|estimated)$", description="Total mode: exact (cached) / estimated"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get posts from Fun Square with filtering and pagination
 
     - category: Filter by category
-    - search: Search in course titles
-    - sort: latest (newest first), popular (most views), trending (most likes)
+    - search: Full-text search in course titles and descriptions
+    - sort: latest (newest first), popular (most views), trending (most likes),
+      relevance (default when searching)
+
+    Responses are cached per normalized query (stale-while-revalidate) and
+    invalidated when posts or courses are published, updated or removed.
     """
+    search = search.strip() if search and search.strip() else None
+    params = {
+        "endpoint": "posts",
+        "page": page,
+        "page_size": page_size,
+        "cursor": cursor,
+        "category": category or None,
+        "search": search,
+        "sort": sort,
+        "count": count,
+    }
+
+    return await response_cache.get_or_compute(
+        SQUARE,
+        params,
+        lambda session: _posts_page(session, page, page_size, cursor, category, search, sort, count),
+        db
+    )
+
+
+async def _posts_page(
+    db: AsyncSession,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    category: Optional[str],
+    search: Optional[str],
+    sort: Optional[str],
+    count: str,
+) -> PostListResponse:
+    """Query one page of Fun Square posts (compute function of the response cache)"""
     # Build query
     query = select(Post).join(Course, Post.course_id == Course.id)
 
@@ -99,44 +156,44 @@ async def get_posts(
     if category:
         filters.append(Post.category == category)
 
+    rank = None
     if search:
-        filters.append(Course.title.ilike(f"%{search}%"))
+        search_condition, rank = course_search.clause(search)
+        filters.append(search_condition)
 
     query = query.where(*filters)
 
-    # Sorting
-    if sort == "popular":
-        query = query.order_by(Post.views_count.desc())
-    elif sort == "trending":
-        query = query.order_by(Post.likes_count.desc())
-    else:  # latest
-        query = query.order_by(Post.created_at.desc())
-
-    # Count total
-    count_query = select(func.count()).select_from(Post).join(
-        Course, Post.course_id == Course.id
-    ).where(*filters)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    # Paginate
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-
-    result = await db.execute(query)
-    posts = result.scalars().all()
-
-    # Get detailed post info
-    posts_with_details = []
-    for post in posts:
-        post_detail = await get_post_with_details(post.id, db)
-        posts_with_details.append(post_detail)
+    # Sorting: latest (created_at), popular (views), trending (likes), relevance (search rank)
+    if sort is None:
+        sort = "relevance" if rank is not None else "latest"
+    elif sort == "relevance" and rank is None:
+        sort = "latest"
+    order_columns = POST_SORT_COLUMNS["latest" if sort == "relevance" else sort]
+
+    # Count total (cached per filter; estimated mode skips COUNT(*))
+    total = await count_cache.count(
+        db,
+        (Post.__tablename__, Course.__tablename__),
+        select(Post.id).join(Course, Post.course_id == Course.id).where(*filters),
+        mode=count
+    )
+
+    # Paginate (keyset with cursor, page numbers as fallback; offset cursors for relevance)
+    if sort == "relevance":
+        query, offset = paginate_ranked(query, rank, Post.id, page_size, cursor=cursor, page=page)
+        result = await db.execute(query)
+        posts, next_cursor = page_ranked_results(result.scalars().all(), page_size, offset)
+    else:
+        query = paginate(query, order_columns, sort, page_size, cursor=cursor, page=page)
+        result = await db.execute(query)
+        posts, next_cursor = page_results(result.scalars().all(), order_columns, sort, page_size)
 
     return PostListResponse(
-        posts=posts_with_details,
+        posts=await hydrate_posts(posts, db),
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
@@ -158,22 +215,23 @@ async def increment_post_view(
 ):
     """
     Increment view count for a post
+
+    增量先累积在内存中，定时批量写回（请求路径上只读）
     """
     result = await db.execute(
-        select(Post).where(Post.id == post_id)
+        select(Post.views_count).where(Post.id == post_id)
     )
-    post = result.scalar_one_or_none()
+    views_count = result.scalar_one_or_none()
 
-    if not post:
+    if views_count is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
-    post.views_count += 1
-    await db.commit()
+    counter_buffer.incr(Post, post_id)
 
-    return {"views_count": post.views_count}
+    return {"views_count": counter_buffer.current(Post, post_id, views_count)}
 
 
 @router.post("/{post_id}/like")
@@ -183,31 +241,18 @@ async def like_post(
 ):
     """
     Like a post (increments like count)
+
+    The count is incremented atomically in a single statement.
     """
-    result = await db.execute(
-        select(Post).where(Post.id == post_id)
-    )
-    post = result.scalar_one_or_none()
+    likes_count = await like_service.increment_post_like(db, post_id)
 
-    if not post:
+    if likes_count is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
-    post.likes_count += 1
-
-    # Also update course likes
-    course_result = await db.execute(
-        select(Course).where(Course.id == post.course_id)
-    )
-    course = course_result.scalar_one_or_none()
-    if course:
-        course.likes_count += 1
-
-    await db.commit()
-
-    return {"likes_count": post.likes_count}
+    return {"likes_count": likes_count}
 
 
 @router.delete("/{post_id}")
@@ -247,37 +292,57 @@ async def delete_post(
     return {"message": "Post deleted successfully"}
 
 
-# Helper function
+# Helper functions
+
+# Course / author columns shown with every post
+POST_DETAIL_COLUMNS = (
+    Course.title.label("course_title"),
+    Course.description.label("course_description"),
+    Course.cover_image.label("course_cover_image"),
+    User.username.label("username"),
+    User.avatar_url.label("user_avatar"),
+)
+
+
+def _with_details(query):
+    """Join the course and author of each post (both optional)"""
+    return query.outerjoin(Course, Course.id == Post.course_id).outerjoin(User, User.id == Post.user_id)
+
+
+def _to_post_response(post: Post, details) -> PostResponse:
+    response = PostResponse(
+        **post.__dict__,
+        **{column.key: details[column.key] if details else None for column in POST_DETAIL_COLUMNS}
+    )
+    response.views_count = counter_buffer.current(Post, post.id, post.views_count)
+    return response
+
+
+async def hydrate_posts(posts, db: AsyncSession) -> List[PostResponse]:
+    """Attach course and author details to a page of posts in a single query"""
+    if not posts:
+        return []
+
+    result = await db.execute(
+        _with_details(
+            select(Post.id, *POST_DETAIL_COLUMNS).select_from(Post)
+        ).where(Post.id.in_([post.id for post in posts]))
+    )
+    details = {row.id: row._mapping for row in result}
+    return [_to_post_response(post, details.get(post.id)) for post in posts]
+
+
 async def get_post_with_details(post_id: int, db: AsyncSession) -> PostResponse:
-    """Get post with course and user details"""
+    """Get post with course and user details (one joined query)"""
     result = await db.execute(
-        select(Post).where(Post.id == post_id)
+        _with_details(select(Post, *POST_DETAIL_COLUMNS)).where(Post.id == post_id)
     )
-    post = result.scalar_one_or_none()
+    row = result.first()
 
-    if not post:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
-    # Get course
-    course_result = await db.execute(
-        select(Course).where(Course.id == post.course_id)
-    )
-    course = course_result.scalar_one_or_none()
-
-    # Get user
-    user_result = await db.execute(
-        select(User).where(User.id == post.user_id)
-    )
-    user = user_result.scalar_one_or_none()
-
-    return PostResponse(
-        **post.__dict__,
-        course_title=course.title if course else None,
-        course_description=course.description if course else None,
-        course_cover_image=course.cover_image if course else None,
-        username=user.username if user else None,
-        user_avatar=user.avatar_url if user else None
-    )
+    return _to_post_response(row.Post, row._mapping)
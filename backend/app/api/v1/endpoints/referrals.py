@@ -107,17 +107,21 @@ async def get_referral_stats(
     )
     recent_referrals = recent_result.scalars().all()
 
-    # 获取被邀请用户信息
+    # 获取被邀请用户信息（一次 IN 查询，只取用户名）
+    referee_ids = {ref.referee_id for ref in recent_referrals if ref.referee_id}
+    referee_names = {}
+    if referee_ids:
+        users_result = await db.execute(
+            select(User.id, User.username).where(User.id.in_(referee_ids))
+        )
+        referee_names = {user_id: username for user_id, username in users_result}
+
     records = []
     for ref in recent_referrals:
         if ref.referee_id:
-            user_result = await db.execute(
-                select(User).where(User.id == ref.referee_id)
-            )
-            referee = user_result.scalar_one_or_none()
             records.append({
                 "id": ref.id,
-                "referee_name": referee.username if referee else "未知用户",
+                "referee_name": referee_names.get(ref.referee_id) or "未知用户",
                 "reward_points": ref.reward_points,
                 "is_completed": ref.is_completed,
                 "reward_status": ref.reward_status,
@@ -57,6 +57,31 @@ class Settings(BaseSettings):
     AWS_S3_BUCKET: str = ""
     AWS_REGION: str = "us-east-1"
 
+    # 文件存储后端（流式读写）：supabase / s3 / r2 / local
+    # 留空时：配置了 SUPABASE_URL + SUPABASE_SERVICE_KEY 用 supabase，否则按 storage_backend 回退
+    STORAGE_BACKEND: str = ""
+    # 超过该大小走分片上传（Supabase TUS / S3 multipart），内存中最多缓冲一个分片
+    STORAGE_MULTIPART_THRESHOLD_MB: int = 6
+    STORAGE_TIMEOUT_SECONDS: float = 60.0
+    STORAGE_MAX_CONNECTIONS: int = 20
+    # local 后端：文件目录与访问 URL 前缀（由 /static 挂载提供）
+    LOCAL_STORAGE_DIR: str = "static/storage"
+    LOCAL_STORAGE_BASE_URL: str = "/static/storage"
+
+    # 文档解析（独立进程执行：并发上限、单任务墙钟超时、单进程内存上限）
+    DOCUMENT_PARSE_WORKERS: int = 2
+    DOCUMENT_PARSE_TIMEOUT_SECONDS: float = 120.0
+    # 默认值按 512MB 的 Fly VM 设置：workers × RSS 上限 ≈ 256MB，其余留给 API 进程
+    DOCUMENT_PARSE_MAX_RSS_MB: int = 128
+    # 解析进程的地址空间上限（RLIMIT_AS，MB）；0 表示机器 / 容器内存 ÷ DOCUMENT_PARSE_WORKERS
+    DOCUMENT_PARSE_MAX_ADDRESS_SPACE_MB: int = 0
+    # PDF 按页分片并行提取：每个 worker 任务处理的页数（超时按分片计算）
+    DOCUMENT_PARSE_PDF_SHARD_PAGES: int = 25
+    # 文本提取的跨进程认领：超过该秒数没有心跳的认领由其他进程接管（同时是失效认领的扫描间隔）
+    DOCUMENT_EXTRACT_CLAIM_SECONDS: float = 300.0
+    # 等待其他进程提取结果时的轮询间隔
+    DOCUMENT_EXTRACT_POLL_SECONDS: float = 2.0
+
     # GCP Vertex AI (Primary - Gemini 3.0)
     GCP_PROJECT_ID: str = ""
     GCP_LOCATION: str = "global"
@@ -73,6 +98,70 @@ class Settings(BaseSettings):
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     OPENROUTER_MODEL: str = "google/gemini-2.5-flash-preview-09-2025"
 
+    # Prompt Caching（静态 system 前缀的 provider 侧缓存）
+    # Vertex cachedContents 资源名（需以 ai_service.SYSTEM_PROMPT 作为 system instruction 创建）
+    GCP_CACHED_CONTENT: str = ""
+    # OpenRouter: 为 system 前缀添加 cache_control 断点
+    OPENROUTER_PROMPT_CACHE: bool = True
+
+    # LLM Router（首 token 对冲 + 熔断）
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_AFTER_SECONDS: float = 15.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 3
+    LLM_BREAKER_RESET_SECONDS: float = 60.0
+
+    # Generation Cache（相同输入直接回放已生成的 HTML）
+    GENERATION_CACHE_ENABLED: bool = True
+    GENERATION_CACHE_TTL_SECONDS: int = 3600
+    GENERATION_CACHE_MAX_ENTRIES: int = 256
+
+    # 长文档压缩（map-reduce 摘要后再生成）
+    CONDENSE_TOKEN_BUDGET: int = 60000
+    CONDENSE_CHUNK_TOKENS: int = 6000
+    CONDENSE_CONCURRENCY: int = 4
+    CONDENSE_MODEL: str = "google/gemini-2.5-flash"
+    CONDENSE_CACHE_MAX_ENTRIES: int = 2048
+
+    # SSE token 合并（按时间窗口 / 字节数批量输出）
+    SSE_COALESCE_WINDOW_MS: int = 50
+    SSE_COALESCE_MAX_BYTES: int = 4096
+
+    # 可重连 SSE（事件编号 + 重放缓冲区，客户端带 Last-Event-ID 重连）
+    SSE_REPLAY_BACKEND: str = "memory"  # memory / redis（多实例部署时使用 redis）
+    SSE_REPLAY_MAX_BYTES: int = 4 * 1024 * 1024
+    SSE_REPLAY_MAX_EVENTS: int = 10000
+    SSE_REPLAY_TTL_SECONDS: int = 900
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Course Content Store（课程 HTML 内容寻址存储，进程内缓存上限）
+    COURSE_CONTENT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # 互动计数器（浏览量先在内存中累积，定时批量写回）
+    COUNTER_FLUSH_SECONDS: float = 5.0
+    # courses.likes_count 与 course_likes 的后台校正间隔
+    LIKE_RECONCILE_SECONDS: float = 600.0
+
+    # 列表总数缓存（按过滤条件缓存 COUNT 结果，本进程写入时失效）
+    COUNT_CACHE_TTL_SECONDS: float = 30.0
+
+    # 广场搜索：postgres（tsvector + pg_trgm 索引）/ memory（进程内中文二元组倒排索引）
+    SEARCH_BACKEND: str = "postgres"
+    SEARCH_MAX_RESULTS: int = 1000
+    SEARCH_REBUILD_SECONDS: float = 300.0
+
+    # 公开接口响应缓存（广场列表 / 帖子列表 / 公开课程详情，stale-while-revalidate）
+    RESPONSE_CACHE_BACKEND: str = "memory"  # memory / redis（使用 REDIS_URL，Upstash 填 rediss:// 连接串）
+    RESPONSE_CACHE_FRESH_SECONDS: float = 10.0
+    RESPONSE_CACHE_STALE_SECONDS: float = 60.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+
+    # 认证缓存：已验证的 JWT claims（到 exp 为止）+ 当前用户行（短 TTL，写入时失效）
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_TOKEN_CACHE_MAX_TTL_SECONDS: float = 300.0
+    AUTH_USER_CACHE_TTL_SECONDS: float = 10.0
+    # Supabase Auth（GoTrue REST）请求超时
+    SUPABASE_AUTH_TIMEOUT_SECONDS: float = 10.0
+
     # OpenAI / Gemini
     OPENAI_API_KEY: str = ""
     OPENAI_BASE_URL: str = ""  # Leave empty for OpenAI, or use custom endpoint
@@ -100,6 +189,18 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
 
+    # Generation Queue（数据库持久化生成队列）
+    # API 进程内是否启动 worker；独立 worker 进程部署时设为 False
+    GENERATION_WORKER_EMBEDDED: bool = True
+    GENERATION_WORKER_CONCURRENCY: int = 2
+    GENERATION_WORKER_POLL_SECONDS: float = 2.0
+    GENERATION_JOB_MAX_ATTEMPTS: int = 3
+    GENERATION_JOB_HEARTBEAT_SECONDS: float = 15.0
+    GENERATION_JOB_STALE_SECONDS: float = 120.0
+    # 部分结果按字节数 / 时间间隔写入 checkpoint，失败重试时续写
+    GENERATION_CHECKPOINT_BYTES: int = 16384
+    GENERATION_CHECKPOINT_SECONDS: float = 10.0
+
     @property
     def use_supabase(self) -> bool:
         """Check if Supabase is configured"""
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.supabase_db import get_db
 from app.services.auth_service import auth_service
+from app.services.auth_cache import user_cache
 from app.models.user import User
 from sqlalchemy import select
 
@@ -43,7 +44,11 @@ async def get_current_user(
             detail="Invalid authentication credentials"
         )
 
-    # Get user from database by supabase_user_id
+    # Cached user row (short TTL, invalidated on writes), else load by supabase_user_id
+    user = await user_cache.load(db, supabase_user["id"])
+    if user is not None:
+        return user
+
     result = await db.execute(
         select(User).where(User.supabase_user_id == supabase_user["id"])
     )
@@ -55,6 +60,7 @@ async def get_current_user(
             detail="User not found in database"
         )
 
+    user_cache.remember(user)
     return user
 
 
@@ -0,0 +1,158 @@
+"""
+Keyset (cursor) pagination
+
+`offset((page - 1) * page_size)` makes Postgres walk and discard every skipped
+row, so deep pages get linearly slower. Keyset pagination continues from the
+sort key of the last row instead: `WHERE (sort_key, id) < (:last_key, :last_id)`,
+which is an index range scan regardless of depth.
+
+- Cursors are opaque (base64url JSON) and bound to the sort order they were
+  issued for
+- Page numbers remain available as a compatibility mode; every response carries
+  `next_cursor` so clients can switch over at any point
+- Relevance-ranked search results have no stable sort key, so their cursors
+  carry an offset instead (`paginate_ranked`)
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+
+RANKED_SORT = "relevance"
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """Encode the sort key values of the last row into an opaque cursor"""
+    encoded = [
+        {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps({"s": sort, "v": encoded}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """
+    Decode a cursor issued for the given sort order
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or belongs to another sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["s"] != sort:
+            raise ValueError("cursor was issued for a different sort order")
+        return [
+            datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) else value
+            for value in payload["v"]
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {e}"
+        )
+
+
+def paginate(
+    query: Select,
+    order_columns: Sequence[Any],
+    sort: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+) -> Select:
+    """
+    Apply descending keyset (or page-number) pagination to a query
+
+    Fetches one extra row so `page_results` can tell whether more rows follow.
+
+    Args:
+        query: Base query with filters applied
+        order_columns: Sort columns, most significant first, ending in a unique
+            column (usually the primary key)
+        sort: Sort order name the cursor is bound to
+        limit: Page size
+        cursor: Cursor from a previous response (takes precedence over page)
+        page: Page number for the compatibility mode
+    """
+    query = query.order_by(*(column.desc() for column in order_columns))
+
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        if len(values) != len(order_columns):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor: wrong number of sort keys"
+            )
+        query = query.where(tuple_(*order_columns) < tuple_(*values))
+    else:
+        query = query.offset((page - 1) * limit)
+
+    return query.limit(limit + 1)
+
+
+def page_results(
+    rows: Sequence[Any],
+    order_columns: Sequence[Any],
+    sort: str,
+    limit: int,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim the extra row fetched by `paginate` and build the next cursor
+
+    Returns:
+        (rows, next_cursor): next_cursor is None on the last page
+    """
+    items = list(rows[:limit])
+    if len(rows) <= limit or not items:
+        return items, None
+
+    last = items[-1]
+    next_cursor = encode_cursor(sort, [getattr(last, column.key) for column in order_columns])
+    return items, next_cursor
+
+
+def paginate_ranked(
+    query: Select,
+    rank: Any,
+    tiebreaker: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+) -> Tuple[Select, int]:
+    """
+    Order by a computed relevance score (highest first) with offset pagination
+
+    Returns:
+        (query, offset): pass the offset on to `page_ranked_results`
+    """
+    if cursor:
+        values = decode_cursor(cursor, RANKED_SORT)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor: bad offset"
+            )
+        offset = values[0]
+    else:
+        offset = (page - 1) * limit
+
+    query = query.order_by(rank.desc(), tiebreaker.desc()).offset(offset).limit(limit + 1)
+    return query, offset
+
+
+def page_ranked_results(
+    rows: Sequence[Any],
+    limit: int,
+    offset: int,
+) -> Tuple[List[Any], Optional[str]]:
+    """Trim the extra row fetched by `paginate_ranked` and build the next cursor"""
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return items, None
+    return items, encode_cursor(RANKED_SORT, [offset + limit])
@@ -0,0 +1,179 @@
+"""
+Service Registry
+
+Creates external clients (Supabase, LLM) lazily instead of at import time.
+
+- get(): builds the client on first access
+- aget(): async variant for request paths; builds in a worker thread so a
+  blocking factory (or waiting on a build already in progress) never stalls
+  the event loop
+- warm_up(): builds clients concurrently in worker threads during app startup,
+  optionally alongside async startup hooks (e.g. storage bucket checks)
+- report(): startup timings and readiness for each service
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Lazy, thread-safe registry of shared service clients"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._timings: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """
+        Register a factory for a named service
+
+        Args:
+            name: Service name
+            factory: Zero-argument callable that builds the client (may block)
+        """
+        self._factories[name] = factory
+        self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """
+        Get a service instance, building it on first access
+
+        Raises:
+            KeyError: If the service is not registered
+            Exception: Whatever the factory raises (retried on next access)
+        """
+        if name in self._instances:
+            return self._instances[name]
+
+        if name not in self._factories:
+            raise KeyError(f"Service '{name}' is not registered")
+
+        with self._locks[name]:
+            if name not in self._instances:
+                started = time.perf_counter()
+                try:
+                    self._instances[name] = self._factories[name]()
+                    self._errors.pop(name, None)
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                finally:
+                    self._timings[name] = time.perf_counter() - started
+
+        return self._instances[name]
+
+    async def aget(self, name: str) -> Any:
+        """
+        Get a service instance from async code
+
+        Returns immediately once built; otherwise runs get() in a worker thread.
+
+        Raises:
+            Same as get()
+        """
+        if name in self._instances:
+            return self._instances[name]
+        return await asyncio.to_thread(self.get, name)
+
+    def is_ready(self, name: str) -> bool:
+        """Check whether a service has been built"""
+        return name in self._instances
+
+    def reset(self, name: str):
+        """Drop a built instance so the next get() rebuilds it"""
+        with self._locks.get(name, threading.Lock()):
+            self._instances.pop(name, None)
+
+    async def warm_up(
+        self,
+        *names: str,
+        hooks: Optional[Dict[str, Callable[[], Awaitable[Any]]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build services concurrently and run async startup hooks
+
+        Failures are logged and recorded, never raised: a service that fails
+        here is retried lazily on first use.
+
+        Args:
+            names: Services to build (defaults to all registered)
+            hooks: Named async callables to run concurrently with the builds
+
+        Returns:
+            Dict mapping service/hook names to their results (None on failure)
+        """
+        names = names or tuple(self._factories)
+        hooks = hooks or {}
+
+        async def run_hook(name: str, hook: Callable[[], Awaitable[Any]]):
+            started = time.perf_counter()
+            try:
+                return await hook()
+            except Exception as e:
+                self._errors[name] = str(e)
+                raise
+            finally:
+                self._timings[name] = time.perf_counter() - started
+
+        labels = list(names) + list(hooks)
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.aget(name) for name in names),
+            *(run_hook(name, hook) for name, hook in hooks.items()),
+            return_exceptions=True,
+        )
+        self._timings["startup_total"] = time.perf_counter() - started
+
+        outcome = {}
+        for label, result in zip(labels, results):
+            if isinstance(result, Exception):
+                logger.error(f"Startup: '{label}' failed after {self._timings.get(label, 0):.2f}s: {result}")
+                outcome[label] = None
+            else:
+                logger.info(f"Startup: '{label}' ready in {self._timings.get(label, 0):.2f}s")
+                outcome[label] = result
+
+        logger.info(f"Startup completed in {self._timings['startup_total']:.2f}s")
+        return outcome
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Startup timings and readiness
+
+        Returns:
+            {"services": {name: {"ready", "seconds", "error"}}, "timings": {...}}
+        """
+        return {
+            "services": {
+                name: {
+                    "ready": self.is_ready(name),
+                    "seconds": round(self._timings[name], 4) if name in self._timings else None,
+                    "error": self._errors.get(name),
+                }
+                for name in self._factories
+            },
+            "timings": {name: round(seconds, 4) for name, seconds in self._timings.items()},
+        }
+
+
+# Global registry instance
+service_registry = ServiceRegistry()
+
+
+def _create_supabase_client():
+    """Shared Supabase client (service key) for auth, storage and uploads"""
+    from supabase import create_client
+    from app.core.config import settings
+
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+
+
+service_registry.register("supabase", _create_supabase_client)
@@ -3,9 +3,10 @@ Supabase Storage Bucket Initialization
 
 Automatically creates required storage buckets on application startup.
 """
+import asyncio
 import logging
 from typing import Dict, List, Optional
-import requests
+import httpx
 from app.core.config import settings
 
 
@@ -45,10 +46,12 @@ class StorageInitializer:
                 "Storage bucket initialization will be skipped."
             )
 
-    def ensure_buckets_exist(self) -> Dict[str, bool]:
+    async def ensure_buckets_exist(self) -> Dict[str, bool]:
         """
         Ensure all required buckets exist, creating them if necessary.
 
+        Buckets are checked concurrently over a single pooled HTTP client.
+
         Returns:
             Dict mapping bucket names to success status (True = exists/created, False = failed)
         """
@@ -57,28 +60,16 @@ class StorageInitializer:
             return {}
 
         logger.info("Checking Supabase Storage buckets...")
-        results = {}
-
-        for config in self.BUCKETS_CONFIG:
-            bucket_name = config["name"]
-            exists = self._check_bucket_exists(bucket_name)
-
-            if exists:
-                logger.info(f"✓ Bucket '{bucket_name}' already exists")
-                results[bucket_name] = True
-            else:
-                logger.info(f"○ Bucket '{bucket_name}' not found, creating...")
-                created = self._create_bucket(
-                    name=bucket_name,
-                    public=config["public"]
-                )
-
-                if created:
-                    logger.info(f"✓ Bucket '{bucket_name}' created successfully")
-                    results[bucket_name] = True
-                else:
-                    logger.error(f"✗ Failed to create bucket '{bucket_name}'")
-                    results[bucket_name] = False
+
+        async with httpx.AsyncClient(timeout=10) as client:
+            statuses = await asyncio.gather(
+                *(self._ensure_bucket(client, config) for config in self.BUCKETS_CONFIG)
+            )
+
+        results = {
+            config["name"]: ok
+            for config, ok in zip(self.BUCKETS_CONFIG, statuses)
+        }
 
         # Print summary
         success_count = sum(1 for v in results.values() if v)
@@ -95,11 +86,43 @@ class StorageInitializer:
 
         return results
 
-    def _check_bucket_exists(self, bucket_name: str) -> bool:
+    async def _ensure_bucket(self, client: httpx.AsyncClient, config: Dict) -> bool:
+        """
+        Check a single bucket and create it if missing.
+
+        Args:
+            client: Shared HTTP client
+            config: Bucket configuration from BUCKETS_CONFIG
+
+        Returns:
+            True if the bucket exists or was created
+        """
+        bucket_name = config["name"]
+        exists = await self._check_bucket_exists(client, bucket_name)
+
+        if exists:
+            logger.info(f"✓ Bucket '{bucket_name}' already exists")
+            return True
+
+        logger.info(f"○ Bucket '{bucket_name}' not found, creating...")
+        created = await self._create_bucket(
+            client,
+            name=bucket_name,
+            public=config["public"]
+        )
+
+        if created:
+            logger.info(f"✓ Bucket '{bucket_name}' created successfully")
+        else:
+            logger.error(f"✗ Failed to create bucket '{bucket_name}'")
+        return created
+
+    async def _check_bucket_exists(self, client: httpx.AsyncClient, bucket_name: str) -> bool:
         """
         Check if a bucket exists.
 
         Args:
+            client: Shared HTTP client
             bucket_name: Name of the bucket to check
 
         Returns:
@@ -112,7 +135,7 @@ class StorageInitializer:
                 "Authorization": f"Bearer {self.service_key}"
             }
 
-            response = requests.get(url, headers=headers, timeout=10)
+            response = await client.get(url, headers=headers)
 
             # 200 = bucket exists, 404 = bucket not found
             return response.status_code == 200
@@ -121,11 +144,12 @@ class StorageInitializer:
             logger.error(f"Error checking bucket '{bucket_name}': {e}")
             return False
 
-    def _create_bucket(self, name: str, public: bool = True) -> bool:
+    async def _create_bucket(self, client: httpx.AsyncClient, name: str, public: bool = True) -> bool:
         """
         Create a new storage bucket using Supabase REST API.
 
         Args:
+            client: Shared HTTP client
             name: Bucket name
             public: Whether bucket should be publicly accessible (default: True)
 
@@ -146,11 +170,10 @@ class StorageInitializer:
                 "allowed_mime_types": None  # Allow all types
             }
 
-            response = requests.post(
+            response = await client.post(
                 url,
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
 
             # 200/201 = created successfully, 409 = already exists (also success)
@@ -203,7 +226,7 @@ class StorageInitializer:
         logger.info("="*60 + "\n")
 
 
-def init_storage() -> Optional[Dict[str, bool]]:
+async def init_storage() -> Optional[Dict[str, bool]]:
     """
     Initialize Supabase Storage buckets on application startup.
 
@@ -214,7 +237,7 @@ def init_storage() -> Optional[Dict[str, bool]]:
     """
     try:
         initializer = StorageInitializer()
-        return initializer.ensure_buckets_exist()
+        return await initializer.ensure_buckets_exist()
     except Exception as e:
         logger.error(f"Storage initialization failed: {e}")
         return None
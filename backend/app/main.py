@@ -8,6 +8,17 @@ import logging
 from app.core.config import settings
 from app.core.supabase_db import engine
 from app.core.storage_init import init_storage
+from app.core.service_registry import service_registry
+from app.services.ai_service import ai_service
+from app.services.generation_queue import generation_queue
+from app.services.stream_sessions import stream_sessions
+from app.services.engagement import counter_buffer, like_service
+from app.services.search_service import course_search
+from app.services.response_cache import response_cache
+from app.services.gotrue_client import gotrue_client
+from app.services.storage_backends import close_storage_backends, storage_backend_name
+from app.services.parse_executor import parse_executor
+from app.services.document_pipeline import document_pipeline
 from app.api.v1 import api_router
 
 
@@ -19,17 +30,47 @@ async def lifespan(app: FastAPI):
     # Startup
     print(f"Connected to PostgreSQL (Supabase): {settings.DATABASE_URL.split('@')[1].split('/')[0]}")
 
-    # Initialize Supabase Storage buckets
-    logger.info("Initializing Supabase Storage Buckets...")
-    storage_results = init_storage()
+    # Build external clients and check storage buckets concurrently
+    # (LLM OAuth refresh runs in a worker thread, bucket checks over async HTTP)
+    logger.info("Initializing services and Supabase Storage Buckets...")
+    startup = await service_registry.warm_up(hooks={"storage": init_storage})
+    storage_results = startup.get("storage")
 
     if storage_results:
         success = sum(1 for v in storage_results.values() if v)
         total = len(storage_results)
         logger.info(f"Storage: {success}/{total} buckets ready")
 
+    # GCP access token 后台刷新（过期前在工作线程中刷新）
+    await ai_service.start_token_refresh()
+
+    # 进程内生成 worker（也可通过 `python -m app.worker` 独立部署）
+    if settings.GENERATION_WORKER_EMBEDDED:
+        generation_queue.start()
+
+    # 浏览量计数器定时写回 + 点赞数后台校正
+    counter_buffer.start()
+    like_service.start()
+
+    # 广场搜索：memory 后端在启动时构建倒排索引
+    await course_search.start()
+
+    # 重新排队上次未完成的文档文本提取
+    await document_pipeline.start()
+
     yield
     # Shutdown
+    await document_pipeline.stop()
+    await parse_executor.stop()
+    await response_cache.stop()
+    await course_search.stop()
+    await like_service.stop()
+    await counter_buffer.stop()
+    await generation_queue.stop()
+    await stream_sessions.stop()
+    await ai_service.stop_token_refresh()
+    await gotrue_client.close()
+    await close_storage_backends()
     await engine.dispose()
     print("Closed PostgreSQL connection")
 
@@ -52,6 +93,9 @@ app.add_middleware(
 
 # Mount static files directory for uploaded images
 static_dir = os.path.join(os.getcwd(), "static")
+if storage_backend_name() == "local":
+    # Local storage backend serves its files from under /static
+    os.makedirs(settings.LOCAL_STORAGE_DIR, exist_ok=True)
 if os.path.exists(static_dir):
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
@@ -71,3 +115,15 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/services")
+async def services_health():
+    """Service readiness, startup timings, LLM and auth latency metrics"""
+    report = service_registry.report()
+    report["auth"] = gotrue_client.metrics()
+    if service_registry.is_ready("llm"):
+        report["llm_backends"] = ai_service.router.metrics()
+    if ai_service.token_manager:
+        report["gcp_token"] = ai_service.token_manager.metrics()
+    return report
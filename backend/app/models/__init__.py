@@ -23,6 +23,9 @@ from app.models.course_like import CourseLike
 # Activation Code Model（激活码模型）
 from app.models.activation_code import ActivationCode
 
+# Generation Queue Model（生成任务队列）
+from app.models.generation_job import GenerationJob
+
 __all__ = [
     "User",
     "Document",
@@ -40,4 +43,6 @@ __all__ = [
     "CourseLike",
     # Activation Code
     "ActivationCode",
+    # Generation Queue
+    "GenerationJob",
 ]
@@ -3,11 +3,19 @@ Course Model - PostgreSQL/SQLAlchemy
 """
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Integer, DateTime, Text, Boolean, ForeignKey, Index, JSON
+from sqlalchemy import String, Integer, DateTime, Text, Boolean, ForeignKey, Index, JSON, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.supabase_db import Base
 
 
+# 全文检索向量：标题权重 A，简介权重 B（'simple' 配置不做词干化，中文由 pg_trgm 索引处理）
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
 class Course(Base):
     """
     Course/Lesson model - 课程/动画模型
@@ -43,7 +51,17 @@ class Course(Base):
 
     # Content
     content: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
-    # Structured course content
+    # 旧数据：{"generated": html}；新生成的 HTML 存放在对象存储中（见 content_hash）
+
+    # Content Blob（内容寻址存储，行上只保留引用）
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    content_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    content_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+
+    # Search（数据库维护的生成列，默认不加载）
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True, deferred=True
+    )
 
     # Statistics
     views_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -94,6 +112,21 @@ class Course(Base):
         Index("idx_course_public", "is_public"),
         Index("idx_course_category", "category"),
         Index("idx_course_created", "created_at"),
+        # Keyset pagination: (sort key, id)
+        Index("idx_course_user_created_id", "user_id", "created_at", "id"),
+        Index("idx_course_public_created_id", "is_public", "status", "created_at", "id"),
+        Index("idx_course_public_views_id", "is_public", "status", "views_count", "id"),
+        Index("idx_course_public_likes_id", "is_public", "status", "likes_count", "id"),
+        # Search: tsvector 全文索引 + pg_trgm 三元组索引（服务 ILIKE '%term%'）
+        Index("idx_course_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "idx_course_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ),
+        Index(
+            "idx_course_description_trgm", "description",
+            postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}
+        ),
     )
 
     def __repr__(self):
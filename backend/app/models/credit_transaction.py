@@ -103,6 +103,7 @@ class CreditTransaction(Base):
         Index("idx_trans_type", "transaction_type"),
         Index("idx_trans_created", "created_at"),
         Index("idx_trans_user_created", "user_id", "created_at"),
+        Index("idx_trans_user_created_id", "user_id", "created_at", "id"),
         {"comment": "积分交易记录表，记录所有积分变动"}
     )
 
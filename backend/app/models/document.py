@@ -3,7 +3,7 @@ Document Model - PostgreSQL/SQLAlchemy
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Integer, DateTime, Text, ForeignKey, Index
+from sqlalchemy import String, Integer, DateTime, Text, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.supabase_db import Base
 
@@ -24,11 +24,21 @@ class Document(Base):
     file_url: Mapped[str] = mapped_column(String(1000), nullable=False)
     file_type: Mapped[str] = mapped_column(String(20), nullable=False)  # pdf, ppt, docx, txt
     file_size: Mapped[int] = mapped_column(Integer, nullable=False)  # in bytes
+    file_path: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)  # path in the storage bucket
+
+    # Extracted Content (parsed once after upload, see services/document_pipeline.py)
+    # zlib-compressed UTF-8 text; deferred so listings never load it
+    extracted_text: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    page_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # pages / slides
+    char_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # SHA-256 of the text
 
     # Processing Status
     status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
     # pending, processing, success, failed
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # When an API process claimed the extraction (refreshed while parsing; stale claims are taken over)
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
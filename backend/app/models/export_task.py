@@ -59,6 +59,7 @@ class ExportTask(Base):
         Index("idx_export_type", "export_type"),
         Index("idx_export_created", "created_at"),
         Index("idx_export_user_status", "user_id", "status"),
+        Index("idx_export_user_created_id", "user_id", "created_at", "id"),
     )
 
     def __repr__(self):
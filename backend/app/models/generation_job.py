@@ -0,0 +1,69 @@
+"""
+Generation Job Model - 动画生成任务队列
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, Text, ForeignKey, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.supabase_db import Base
+
+
+class GenerationJob(Base):
+    """
+    动画生成任务（持久化队列）
+
+    状态说明：
+    - queued: 等待 worker 领取
+    - processing: 已被 worker 领取，worker 定期刷新 heartbeat_at
+    - completed: 生成成功
+    - failed: 重试次数用尽，已退还积分
+
+    worker 通过 SELECT ... FOR UPDATE SKIP LOCKED 领取任务，
+    heartbeat_at 超时的 processing 任务会被 sweeper 重新放回队列。
+    生成过程中部分 HTML 会定期追加到 checkpoint，重试时从断点续写。
+    """
+
+    __tablename__ = "generation_jobs"
+
+    # Primary Key
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    # Foreign Keys
+    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    # Job Payload
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # {"content": ..., "style": ..., "difficulty": ..., "title": ...}
+
+    # Queue State
+    status: Mapped[str] = mapped_column(String(20), default="queued", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3, nullable=False)
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Scheduling
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Checkpoint（已生成的部分 HTML，重试时从这里续写而不是从头生成）
+    checkpoint: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    checkpoint_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Indexes
+    __table_args__ = (
+        Index("idx_generation_job_claim", "status", "available_at"),
+        Index("idx_generation_job_heartbeat", "status", "heartbeat_at"),
+        Index("idx_generation_job_course", "course_id"),
+    )
+
+    def __repr__(self):
+        return f"<GenerationJob(id={self.id}, course_id={self.course_id}, status={self.status})>"
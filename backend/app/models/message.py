@@ -101,6 +101,7 @@ class Message(Base):
         Index("idx_message_type", "message_type"),
         Index("idx_message_created", "created_at"),
         Index("idx_message_user_unread", "user_id", "is_read"),
+        Index("idx_message_user_created_id", "user_id", "created_at", "id"),
         {"comment": "站内信表，用于系统通知和消息推送"}
     )
 
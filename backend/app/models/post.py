@@ -69,6 +69,10 @@ class Post(Base):
         Index("idx_post_type", "post_type"),
         Index("idx_post_created", "created_at"),
         Index("idx_post_published", "published_at"),
+        # Keyset pagination: (sort key, id)
+        Index("idx_post_created_id", "created_at", "id"),
+        Index("idx_post_views_id", "views_count", "id"),
+        Index("idx_post_likes_id", "likes_count", "id"),
     )
 
     def __repr__(self):
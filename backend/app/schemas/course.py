@@ -54,7 +54,10 @@ class CourseResponse(BaseModel):
     status: str
     description: Optional[str] = None
     cover_image: Optional[str] = None
-    content: Optional[Dict[str, Any]] = None
+    content: Optional[Dict[str, Any]] = None  # 仅详情接口填充：{"generated": html}
+    content_hash: Optional[str] = None
+    content_size: Optional[int] = None
+    content_url: Optional[str] = None
     category: Optional[str] = None
     views_count: int
     likes_count: int
@@ -67,12 +70,44 @@ class CourseResponse(BaseModel):
         from_attributes = True
 
 
+class CourseListItem(BaseModel):
+    """
+    Course list item (no content payload)
+
+    All fields are optional so list endpoints can return sparse fieldsets
+    (``fields=id,title,cover_image``); unrequested fields are omitted.
+    """
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    document_id: Optional[int] = None
+    title: Optional[str] = None
+    style: Optional[str] = None
+    difficulty: Optional[str] = None
+    status: Optional[str] = None
+    description: Optional[str] = None
+    cover_image: Optional[str] = None
+    content_hash: Optional[str] = None
+    content_size: Optional[int] = None
+    content_url: Optional[str] = None
+    category: Optional[str] = None
+    views_count: Optional[int] = None
+    likes_count: Optional[int] = None
+    is_public: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    user: Optional[UserBrief] = None  # 用户信息（广场页面需要）
+
+    class Config:
+        from_attributes = True
+
+
 class CourseListResponse(BaseModel):
     """Course list response with pagination"""
-    courses: list[CourseResponse]
+    courses: list[CourseListItem]
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # 传给下一次请求的 cursor，最后一页为 None
 
 
 class CourseGenerationRequest(BaseModel):
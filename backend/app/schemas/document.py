@@ -29,6 +29,8 @@ class DocumentResponse(BaseModel):
     file_type: str
     file_size: int
     status: str
+    page_count: Optional[int] = None
+    char_count: Optional[int] = None
     description: Optional[str] = None
     created_at: datetime
     updated_at: datetime
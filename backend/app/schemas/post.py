@@ -53,3 +53,4 @@ class PostListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # cursor for the next page, None on the last page
@@ -6,7 +6,7 @@ import asyncio
 import json
 import os
 from pathlib import Path
-from typing import AsyncGenerator, List, Optional
+from typing import AsyncGenerator, Awaitable, Callable, List, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage
@@ -15,132 +15,18 @@ import google.auth
 import google.auth.transport.requests
 
 from app.core.config import settings
-
-
-class AIService:
-    """AI service for generating animated course content using Gemini 3.0"""
-
-    def __init__(self):
-        """Initialize Gemini LLM via GCP Vertex AI"""
-        # 从环境变量读取配置
-        self.project_id = os.getenv("GCP_PROJECT_ID", "gen-lang-client-0476802912")
-        self.location = os.getenv("GCP_LOCATION", "global")  # Gemini 3.0 only supports global
-        self.model_name = os.getenv("GCP_MODEL_NAME", "google/gemini-3-pro-preview")
-        self.temperature = float(os.getenv("LLM_TEMPERATURE", "1"))
-
-        # GCP OAuth credentials from env (for deployment)
-        self.gcp_client_id = os.getenv("GCP_CLIENT_ID")
-        self.gcp_client_secret = os.getenv("GCP_CLIENT_SECRET")
-        self.gcp_refresh_token = os.getenv("GCP_REFRESH_TOKEN")
-
-        # Auto-set GCP credentials file if not already set and no OAuth env vars
-        if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS') and not self.gcp_refresh_token:
-            # Try multiple possible paths for local development
-            possible_paths = [
-                Path(__file__).parent.parent.parent.parent.parent.parent / 'gcp' / 'gcp_credentials.json',
-                Path.home() / '.config' / 'gcloud' / 'application_default_credentials.json',
-            ]
-            for cred_path in possible_paths:
-                if cred_path.exists():
-                    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = str(cred_path)
-                    print(f"Using GCP credentials file: {cred_path}")
-                    break
-
-        # Initialize LLM client
-        self._init_llm()
-        print(f"AI Service Initialized: Gemini 3.0 ({self.model_name})")
-
-    def _init_llm(self):
-        """Initialize LLM client with GCP auth or OpenRouter fallback"""
-        try:
-            # Method 1: Use OAuth credentials from environment variables (for deployment)
-            if self.gcp_refresh_token and self.gcp_client_id and self.gcp_client_secret:
-                from google.oauth2.credentials import Credentials
-                credentials = Credentials(
-                    token=None,
-                    refresh_token=self.gcp_refresh_token,
-                    client_id=self.gcp_client_id,
-                    client_secret=self.gcp_client_secret,
-                    token_uri="https://oauth2.googleapis.com/token",
-                    scopes=["https://www.googleapis.com/auth/cloud-platform"]
-                )
-                credentials.refresh(google.auth.transport.requests.Request())
-                print("Using GCP OAuth credentials from environment variables")
-            else:
-                # Method 2: Use default credentials (local development with JSON file)
-                credentials, _ = google.auth.default(
-                    scopes=["https://www.googleapis.com/auth/cloud-platform"]
-                )
-                credentials.refresh(google.auth.transport.requests.Request())
-                print("Using GCP default credentials")
-
-            # Build Vertex AI OpenAI-compatible endpoint for Gemini 3.0 (global region)
-            base_url = (
-                f"https://aiplatform.googleapis.com"
-                f"/v1/projects/{self.project_id}/locations/{self.location}/endpoints/openapi"
-            )
-
-            # Create async client
-            self.client = AsyncOpenAI(
-                api_key=credentials.token,
-                base_url=base_url
-            )
-            self.use_gcp = True
-            print("Using GCP Vertex AI endpoint")
-
-        except Exception as e:
-            # GCP auth failed, use OpenRouter as fallback
-            print(f"Warning: GCP auth failed ({e}), using OpenRouter fallback")
-
-            # 从环境变量读取 OpenRouter 配置
-            openrouter_key = os.getenv("OPENROUTER_API_KEY") or settings.OPENAI_API_KEY
-            openrouter_base = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
-            fallback_model = os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-flash-preview-09-2025")
-
-            if not openrouter_key:
-                raise ValueError("No API key configured. Set OPENROUTER_API_KEY or OPENAI_API_KEY in .env")
-
-            self.client = AsyncOpenAI(
-                api_key=openrouter_key,
-                base_url=openrouter_base
-            )
-            self.model_name = fallback_model
-            self.use_gcp = False
-            print(f"Using OpenRouter fallback with model: {fallback_model}")
-
-    def _build_prompt(
-        self,
-        content: str,
-        style: str = "standard",
-        difficulty: str = "intermediate",
-        title: str = "",
-    ) -> str:
-        """Build the system prompt for content generation using GSAP animation approach"""
-
-        # Style descriptions
-        style_prompts = {
-            "standard": "使用标准的、专业的讲解风格，清晰易懂",
-            "humorous": "使用幽默风趣的方式讲解，让学习变得轻松有趣",
-            "academic": "使用学术性的、严谨的风格，注重理论深度",
-            "storytelling": "使用故事化的叙事方式，通过故事引导学习",
-            "practical": "注重实践应用，结合实际案例和应用场景",
-            "eli5": "用最简单的比喻，连五岁小孩都能听懂",
-            "casual": "像朋友在咖啡厅聊天一样轻松自然",
-            "tech": "深入底层原理，硬核技术流"
-        }
-
-        # Difficulty descriptions
-        difficulty_prompts = {
-            "beginner": "适合初学者，使用简单的语言和基础概念",
-            "intermediate": "适合有一定基础的学习者，平衡深度和广度",
-            "advanced": "适合高级学习者，深入讲解复杂概念和高级应用"
-        }
-
-        style_desc = style_prompts.get(style, style_prompts.get("standard"))
-        difficulty_desc = difficulty_prompts.get(difficulty, difficulty_prompts.get("intermediate"))
-
-        # GSAP-based animation system prompt (based on gsap_animation_demo)
-        system_prompt = f"""# ROLE: 你是一位顶尖的 Motion Graphics 设计师 + 资深教育纪录片导演
+from app.core.service_registry import service_registry
+from app.services.gcp_token_manager import GCPTokenManager
+from app.services.llm_router import CircuitBreaker, LLMBackend, LLMRouter
+from app.services.document_condenser import document_condenser
+from app.services.generation_cache import generation_cache
+from app.services.stream_coalescer import coalesce_tokens
+
+
+# GSAP-based animation system prompt (based on gsap_animation_demo)
+# Static and byte-identical across requests so providers can cache the prefix;
+# never interpolate per-request values into it.
+SYSTEM_PROMPT = """# ROLE: 你是一位顶尖的 Motion Graphics 设计师 + 资深教育纪录片导演
 你不是在写代码 - 你在**拍一部引人入胜的深度教育短片**。
 
 # 🎯 第一原则: CINEMATIC ENGAGEMENT (电影级沉浸感)
@@ -200,17 +86,17 @@ class AIService:
 ```javascript
 // 这是一个长达 3-5 分钟的剧本，storyboard 数组应该包含足够多的场景 (20-50个场景)
 const storyboard = [
-  {{
+  {
     startTime: 0,
     duration: 4, // 这是一个片头，稍长一点
     scene: "intro",
-    subtitle: {{ zh: "欢迎来到...", en: "Welcome to..." }},
-    animation: function(tl) {{ 
+    subtitle: { zh: "欢迎来到...", en: "Welcome to..." },
+    animation: function(tl) { 
         // 清空画布或隐藏前一个场景
         // 创建当前场景元素
         // 动画逻辑 
-    }}
-  }},
+    }
+  },
   // ... 必须生成足够多的场景以填满 180-300 秒
 ];
 ```
@@ -218,30 +104,30 @@ const storyboard = [
 ## 驱动引擎模板
 
 ```javascript
-const mainTimeline = gsap.timeline({{
-  defaults: {{ease: "power2.inOut"}},
-  onUpdate: function() {{
+const mainTimeline = gsap.timeline({
+  defaults: {ease: "power2.inOut"},
+  onUpdate: function() {
     const progress = this.progress() * 100;
-    gsap.set("#progress-bar", {{width: progress + "%"}});
-  }}
-}});
+    gsap.set("#progress-bar", {width: progress + "%"});
+  }
+});
 
-storyboard.forEach((scene, index) => {{
+storyboard.forEach((scene, index) => {
   // 字幕动画
-  mainTimeline.call(() => {{
+  mainTimeline.call(() => {
     const zh = document.getElementById("subtitle-zh");
     const en = document.getElementById("subtitle-en");
     zh.innerText = scene.subtitle.zh;
     en.innerText = scene.subtitle.en;
     
     // 字幕切换特效
-    gsap.fromTo(zh, {{opacity: 0, y: 20, filter: "blur(10px)"}}, {{opacity: 1, y: 0, filter: "blur(0px)", duration: 0.8, ease: "power3.out"}});
-    gsap.fromTo(en, {{opacity: 0, y: 15, filter: "blur(5px)"}}, {{opacity: 1, y: 0, filter: "blur(0px)", duration: 0.8, delay: 0.1, ease: "power3.out"}});
-  }}, null, scene.startTime);
+    gsap.fromTo(zh, {opacity: 0, y: 20, filter: "blur(10px)"}, {opacity: 1, y: 0, filter: "blur(0px)", duration: 0.8, ease: "power3.out"});
+    gsap.fromTo(en, {opacity: 0, y: 15, filter: "blur(5px)"}, {opacity: 1, y: 0, filter: "blur(0px)", duration: 0.8, delay: 0.1, ease: "power3.out"});
+  }, null, scene.startTime);
   
   // 场景动画
   scene.animation(mainTimeline);
-}});
+});
 
 mainTimeline.play();
 ```
@@ -256,19 +142,12 @@ mainTimeline.play();
   <script src="https://cdnjs.cloudflare.com/ajax/libs/gsap/3.12.2/TextPlugin.min.js"></script>
   <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;800&family=Noto+Sans+SC:wght@300;400;700&display=swap" rel="stylesheet">
   <style>
-    body {{ font-family: 'Inter', 'Noto Sans SC', sans-serif; }}
-    .text-shadow-sm {{ text-shadow: 0 2px 4px rgba(0,0,0,0.5); }}
+    body { font-family: 'Inter', 'Noto Sans SC', sans-serif; }
+    .text-shadow-sm { text-shadow: 0 2px 4px rgba(0,0,0,0.5); }
   </style>
 </head>
 ```
 
-# 🎬 用户需求
-
-**主题**: {title or "智能生成讲解"}
-**内容**: {content}
-**讲解风格**: {style_desc}
-**难度级别**: {difficulty_desc}
-
 # 📄 输出要求
 
 请直接输出完整的 HTML 代码，包含:
@@ -290,7 +169,211 @@ mainTimeline.play();
 
 不要包含 markdown 代码块标记(```html)，直接返回代码。"""
 
-        return system_prompt
+
+# Sent after a checkpointed partial answer to resume an interrupted generation
+CONTINUE_PROMPT = """上面的 HTML 输出在中途被中断了。请从中断处**直接续写**剩余部分：
+- 不要重复已经输出的内容，不要从头开始
+- 不要输出任何解释或 markdown 代码块标记
+- 一直写到 </html> 结束"""
+
+
+class AIService:
+    """AI service for generating animated course content using Gemini 3.0"""
+
+    def __init__(self):
+        """Initialize Gemini LLM via GCP Vertex AI"""
+        # 从环境变量读取配置
+        self.project_id = os.getenv("GCP_PROJECT_ID", "gen-lang-client-0476802912")
+        self.location = os.getenv("GCP_LOCATION", "global")  # Gemini 3.0 only supports global
+        self.model_name = os.getenv("GCP_MODEL_NAME", "google/gemini-3-pro-preview")
+        self.temperature = float(os.getenv("LLM_TEMPERATURE", "1"))
+
+        # GCP OAuth credentials from env (for deployment)
+        self.gcp_client_id = os.getenv("GCP_CLIENT_ID")
+        self.gcp_client_secret = os.getenv("GCP_CLIENT_SECRET")
+        self.gcp_refresh_token = os.getenv("GCP_REFRESH_TOKEN")
+
+        # Auto-set GCP credentials file if not already set and no OAuth env vars
+        if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS') and not self.gcp_refresh_token:
+            # Try multiple possible paths for local development
+            possible_paths = [
+                Path(__file__).parent.parent.parent.parent.parent.parent / 'gcp' / 'gcp_credentials.json',
+                Path.home() / '.config' / 'gcloud' / 'application_default_credentials.json',
+            ]
+            for cred_path in possible_paths:
+                if cred_path.exists():
+                    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = str(cred_path)
+                    print(f"Using GCP credentials file: {cred_path}")
+                    break
+
+        # LLM client is created lazily (or during app startup) by the service registry,
+        # so importing this module never performs a blocking OAuth round-trip
+        self.use_gcp = False
+        self.token_manager: Optional[GCPTokenManager] = None
+
+    @property
+    def router(self) -> LLMRouter:
+        """LLM provider router, initialized on first access (blocking; see get_router)"""
+        return service_registry.get("llm")
+
+    async def get_router(self) -> LLMRouter:
+        """LLM provider router for request paths: initialization runs in a worker thread"""
+        return await service_registry.aget("llm")
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Primary LLM client"""
+        return self.router.primary.client
+
+    def _init_llm(self) -> LLMRouter:
+        """
+        Initialize LLM backends: GCP Vertex AI (primary) and OpenRouter (secondary)
+
+        Either backend may be missing; at least one must be configured.
+        """
+        backends = []
+        breaker_kwargs = {
+            "failure_threshold": settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            "reset_timeout": settings.LLM_BREAKER_RESET_SECONDS,
+        }
+
+        try:
+            client = self._init_vertex_client()
+            backends.append(LLMBackend(
+                "vertex", client, self.model_name, CircuitBreaker(**breaker_kwargs),
+                cached_content=settings.GCP_CACHED_CONTENT or None,
+            ))
+            print(f"Using GCP Vertex AI endpoint: Gemini 3.0 ({self.model_name})")
+        except Exception as e:
+            # GCP auth failed, OpenRouter becomes the primary backend
+            print(f"Warning: GCP auth failed ({e}), using OpenRouter fallback")
+
+        # 从环境变量读取 OpenRouter 配置
+        openrouter_key = os.getenv("OPENROUTER_API_KEY") or settings.OPENAI_API_KEY
+        openrouter_base = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+        fallback_model = os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-flash-preview-09-2025")
+
+        if openrouter_key:
+            client = AsyncOpenAI(
+                api_key=openrouter_key,
+                base_url=openrouter_base
+            )
+            backends.append(LLMBackend(
+                "openrouter", client, fallback_model, CircuitBreaker(**breaker_kwargs),
+                cache_control=settings.OPENROUTER_PROMPT_CACHE,
+            ))
+            print(f"OpenRouter backend available with model: {fallback_model}")
+
+        if not backends:
+            raise ValueError("No API key configured. Set OPENROUTER_API_KEY or OPENAI_API_KEY in .env")
+
+        self.use_gcp = backends[0].name == "vertex"
+        self.model_name = backends[0].model_name
+
+        hedge_after = settings.LLM_HEDGE_AFTER_SECONDS if settings.LLM_HEDGE_ENABLED else None
+        return LLMRouter(backends, hedge_after=hedge_after)
+
+    def _init_vertex_client(self) -> AsyncOpenAI:
+        """Create the Vertex AI OpenAI-compatible client with GCP auth"""
+        # Method 1: Use OAuth credentials from environment variables (for deployment)
+        if self.gcp_refresh_token and self.gcp_client_id and self.gcp_client_secret:
+            from google.oauth2.credentials import Credentials
+            credentials = Credentials(
+                token=None,
+                refresh_token=self.gcp_refresh_token,
+                client_id=self.gcp_client_id,
+                client_secret=self.gcp_client_secret,
+                token_uri="https://oauth2.googleapis.com/token",
+                scopes=["https://www.googleapis.com/auth/cloud-platform"]
+            )
+            credentials.refresh(google.auth.transport.requests.Request())
+            print("Using GCP OAuth credentials from environment variables")
+        else:
+            # Method 2: Use default credentials (local development with JSON file)
+            credentials, _ = google.auth.default(
+                scopes=["https://www.googleapis.com/auth/cloud-platform"]
+            )
+            credentials.refresh(google.auth.transport.requests.Request())
+            print("Using GCP default credentials")
+
+        # Build Vertex AI OpenAI-compatible endpoint for Gemini 3.0 (global region)
+        base_url = (
+            f"https://aiplatform.googleapis.com"
+            f"/v1/projects/{self.project_id}/locations/{self.location}/endpoints/openapi"
+        )
+
+        # Create async client
+        client = AsyncOpenAI(
+            api_key=credentials.token,
+            base_url=base_url
+        )
+
+        # Access token expires after ~1h: refresh it in the background and
+        # swap it onto the client (attribute assignment is atomic)
+        self.token_manager = GCPTokenManager(credentials)
+        self.token_manager.add_listener(lambda token: setattr(client, "api_key", token))
+
+        return client
+
+    async def start_token_refresh(self):
+        """Start background GCP token refresh (no-op for OpenRouter)"""
+        if self.token_manager:
+            self.token_manager.start()
+
+    async def stop_token_refresh(self):
+        if self.token_manager:
+            await self.token_manager.stop()
+
+    def _build_prompt(
+        self,
+        content: str,
+        style: str = "standard",
+        difficulty: str = "intermediate",
+        title: str = "",
+    ) -> List[dict]:
+        """
+        Build the prompt messages for content generation using GSAP animation approach
+
+        The GSAP director/DOM/engine instructions are a static, byte-identical
+        system prefix (SYSTEM_PROMPT) so providers can cache it; only the trailing
+        user message carries the per-request content, style and difficulty.
+        """
+
+        # Style descriptions
+        style_prompts = {
+            "standard": "使用标准的、专业的讲解风格，清晰易懂",
+            "humorous": "使用幽默风趣的方式讲解，让学习变得轻松有趣",
+            "academic": "使用学术性的、严谨的风格，注重理论深度",
+            "storytelling": "使用故事化的叙事方式，通过故事引导学习",
+            "practical": "注重实践应用，结合实际案例和应用场景",
+            "eli5": "用最简单的比喻，连五岁小孩都能听懂",
+            "casual": "像朋友在咖啡厅聊天一样轻松自然",
+            "tech": "深入底层原理，硬核技术流"
+        }
+
+        # Difficulty descriptions
+        difficulty_prompts = {
+            "beginner": "适合初学者，使用简单的语言和基础概念",
+            "intermediate": "适合有一定基础的学习者，平衡深度和广度",
+            "advanced": "适合高级学习者，深入讲解复杂概念和高级应用"
+        }
+
+        style_desc = style_prompts.get(style, style_prompts.get("standard"))
+        difficulty_desc = difficulty_prompts.get(difficulty, difficulty_prompts.get("intermediate"))
+
+        user_prompt = f"""# 🎬 用户需求
+
+**主题**: {title or "智能生成讲解"}
+**内容**: {content}
+**讲解风格**: {style_desc}
+**难度级别**: {difficulty_desc}
+
+请按照系统指令中的输出要求，直接输出完整的 HTML 代码。"""
+
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ]
 
     async def generate_course_content_stream(
         self,
@@ -303,6 +386,9 @@ mainTimeline.play();
         """
         Generate course content with streaming response using Gemini 3.0
 
+        Identical requests (without history) are served from the generation
+        cache, or attached to an in-flight generation of the same input.
+
         Args:
             content: Source content (from document or text input)
             style: Presentation style
@@ -311,34 +397,14 @@ mainTimeline.play();
             history: Chat history for context
 
         Yields:
-            JSON chunks with generated HTML tokens
+            SSE frames with coalesced HTML text (``{"token": ...}``)
         """
-        history = history or []
-        system_prompt = self._build_prompt(content, style, difficulty, title)
-
-        # Build messages
-        messages = [
-            {"role": "system", "content": system_prompt},
-        ]
-
-        # Add history if any
-        for msg in history:
-            messages.append({"role": msg.get("role", "user"), "content": msg.get("content", "")})
-
         try:
-            # Stream response from Gemini 3.0
-            response = await self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                stream=True,
-                temperature=self.temperature,
-            )
-
-            async for chunk in response:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    token = chunk.choices[0].delta.content
-                    payload = json.dumps({"token": token}, ensure_ascii=False)
-                    yield f"data: {payload}\n\n"
+            async for text in self.generate_course_text_stream(
+                content, style, difficulty, title, history
+            ):
+                payload = json.dumps({"token": text}, ensure_ascii=False)
+                yield f"data: {payload}\n\n"
 
         except Exception as e:
             import traceback
@@ -349,6 +415,111 @@ mainTimeline.play();
 
         yield 'data: {"event":"[DONE]"}\n\n'
 
+    async def generate_course_text_stream(
+        self,
+        content: str,
+        style: str = "standard",
+        difficulty: str = "intermediate",
+        title: str = "",
+        history: Optional[List[dict]] = None,
+        resume_from: Optional[str] = None,
+        brief: Optional[str] = None,
+        on_brief: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Generate course content as raw, coalesced text chunks
+
+        Intended for internal consumers (background generation, non-streaming
+        calls) that do not need SSE framing.
+
+        Args:
+            resume_from: Partial HTML from an interrupted generation; the model
+                is asked to continue from it and only the continuation is yielded
+            brief: Condensed brief saved by a previous attempt; used instead of
+                condensing the document again (the reduce step is not deterministic,
+                so a resumed generation must keep the brief it started from)
+            on_brief: Called with a newly condensed brief so retries can reuse it
+
+        Yields:
+            Plain text chunks of the generated HTML
+
+        Raises:
+            Exception: Upstream errors are propagated to the caller
+        """
+        # 先确保 LLM 已初始化：回退到 OpenRouter 时 model_name 会变化，影响缓存键
+        await self.get_router()
+
+        if resume_from:
+            # 续写：把已生成部分作为 assistant 回复，再要求模型接着写
+            history = list(history or []) + [
+                {"role": "assistant", "content": resume_from},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ]
+
+        if history or not settings.GENERATION_CACHE_ENABLED:
+            # 带对话历史的重新生成不走缓存
+            tokens = self._stream_tokens(
+                content, style, difficulty, title, history, brief=brief, on_brief=on_brief
+            )
+        else:
+            cache_key = generation_cache.make_key(
+                content, style, difficulty, title, self.model_name
+            )
+            tokens = generation_cache.stream(
+                cache_key,
+                lambda: self._stream_tokens(
+                    content, style, difficulty, title, brief=brief, on_brief=on_brief
+                ),
+            )
+
+        async for text in coalesce_tokens(tokens):
+            yield text
+
+    async def _stream_tokens(
+        self,
+        content: str,
+        style: str,
+        difficulty: str,
+        title: str,
+        history: Optional[List[dict]] = None,
+        brief: Optional[str] = None,
+        on_brief: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream raw text tokens from the upstream LLM
+
+        Raises:
+            Exception: Upstream errors are propagated to the caller
+        """
+        router = await self.get_router()
+
+        if self.token_manager:
+            # Client may have been built lazily after startup: make sure the refresher runs
+            self.token_manager.start()
+            # Safety net if the background refresher fell behind: refresh in a worker
+            # thread so other in-flight streams keep running
+            if self.token_manager.is_expired():
+                await self.token_manager.refresh()
+
+        # Documents over the token budget are condensed into a structured brief
+        # (map-reduce with a fast model) before they reach the prompt
+        if brief is None:
+            brief = await document_condenser.condense(content, router, title=title)
+            if brief is not content and on_brief is not None:
+                await on_brief(brief)
+        content = brief
+
+        # Build messages: static system prefix + per-request user message
+        messages = self._build_prompt(content, style, difficulty, title)
+
+        # Add history if any
+        for msg in history or []:
+            messages.append({"role": msg.get("role", "user"), "content": msg.get("content", "")})
+
+        # Stream via the provider router (hedged first token + circuit breakers)
+        async for token in router.stream(messages, temperature=self.temperature):
+            yield token
+
     async def generate_course_content(
         self,
         content: str,
@@ -362,26 +533,16 @@ mainTimeline.play();
         Returns:
             Complete HTML content as string
         """
-        accumulated = ""
+        chunks = []
 
-        async for chunk in self.generate_course_content_stream(
+        async for text in self.generate_course_text_stream(
             content, style, difficulty, title
         ):
-            if chunk.startswith("data: "):
-                try:
-                    data_str = chunk[6:].strip()
-                    if not data_str: continue
-
-                    data = json.loads(data_str)
-                    if "token" in data:
-                        accumulated += data["token"]
-                    elif "error" in data:
-                        raise Exception(data["error"])
-                except json.JSONDecodeError:
-                    continue
+            chunks.append(text)
 
-        return accumulated
+        return "".join(chunks)
 
 
 # Singleton instance
 ai_service = AIService()
+service_registry.register("llm", ai_service._init_llm)
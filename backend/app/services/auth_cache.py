@@ -0,0 +1,153 @@
+"""
+Auth Cache - 令牌与当前用户缓存
+
+每个需要登录的请求都要完整解码 + 验签一次 JWT，再按 supabase_user_id 查一次 users，
+轮询生成状态的前端会把这两步放大很多倍。这里缓存：
+- TokenClaimsCache: token 的 SHA-256 -> 已验证的 claims，有效到 exp 为止（LRU 有界）
+- UserCache: supabase_user_id -> 用户行的列快照（短 TTL）
+  命中时用快照构造一个 detached 实例再 merge(load=False) 进当前会话，
+  不访问数据库，请求内的修改照常被会话跟踪并提交
+- 用户行在提交写入后失效（资料修改、订阅变更），
+  Core UPSERT（sync_google_user）和存储用量的原子 UPDATE 显式失效；其他进程依赖 TTL
+- 快照可能落后最多一个 TTL：累加类字段不要在实例上读-改-写，用 UPDATE ... SET x = x + n
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class TokenClaimsCache:
+    """已验证 JWT claims 的 LRU 缓存（按 token 哈希，有效期到 exp）"""
+
+    def __init__(self, max_entries: int = 10000, max_ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_entries: 缓存条数上限
+            max_ttl_seconds: 单条缓存的最长有效期（即使 exp 更晚）
+        """
+        self.max_entries = max_entries
+        self.max_ttl_seconds = max_ttl_seconds
+        # token 哈希 -> (过期时间, claims)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if expires_at <= time.time():
+            # 过期后重新验签（由 jwt 抛出 ExpiredSignatureError）
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def set(self, token: str, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        expires_at = time.time() + self.max_ttl_seconds
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= time.time():
+            return
+
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class UserCache:
+    """当前用户行缓存（列快照 + 短 TTL）"""
+
+    def __init__(self, ttl_seconds: float = 10.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # supabase_user_id -> (过期时间, 列快照)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _snapshot(user: User) -> Optional[Dict[str, Any]]:
+        """只读取已加载的列，缺列时不缓存"""
+        loaded = inspect(user).dict
+        columns = [column.key for column in inspect(User).column_attrs]
+        if not all(key in loaded for key in columns):
+            return None
+        return {key: loaded[key] for key in columns}
+
+    def remember(self, user: User):
+        snapshot = self._snapshot(user)
+        if snapshot is None:
+            return
+        key = snapshot["supabase_user_id"]
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def load(self, db: AsyncSession, supabase_user_id: str) -> Optional[User]:
+        """
+        从缓存取出用户并绑定到当前会话（不访问数据库）
+
+        Returns:
+            会话内的 User 实例；未命中返回 None
+        """
+        entry = self._entries.get(supabase_user_id)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at <= time.monotonic():
+            del self._entries[supabase_user_id]
+            return None
+
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    def invalidate(self, supabase_user_id: Optional[str]):
+        if supabase_user_id:
+            self._entries.pop(supabase_user_id, None)
+
+
+# Singleton instances
+token_cache = TokenClaimsCache(
+    max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+    max_ttl_seconds=settings.AUTH_TOKEN_CACHE_MAX_TTL_SECONDS,
+)
+user_cache = UserCache(ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+# ----------------------------------------------------------------------
+# 写入时失效：提交修改过的用户后清除缓存
+# ----------------------------------------------------------------------
+
+@event.listens_for(Session, "after_flush")
+def _record_user_changes(session: Session, flush_context):
+    changed = session.info.setdefault("user_cache_changes", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            changed.add(inspect(obj).dict.get("supabase_user_id"))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_user_changes(session: Session):
+    for supabase_user_id in session.info.pop("user_cache_changes", ()):
+        user_cache.invalidate(supabase_user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session: Session):
+    session.info.pop("user_cache_changes", None)
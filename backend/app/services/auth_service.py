@@ -2,10 +2,13 @@
 Supabase Auth Service
 
 Provides authentication functionality using Supabase Auth.
+
+Sign-up, sign-in and token refresh go through the async GoTrue client
+(pooled httpx) instead of the synchronous supabase-py auth client, so they
+never block the event loop.
 """
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status
-from supabase import create_client, Client
 import jwt
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,16 +17,14 @@ from sqlalchemy.dialects.postgresql import insert
 
 from app.core.config import settings
 from app.models.user import User
+from app.services.auth_cache import token_cache, user_cache
+from app.services.gotrue_client import gotrue_client
 
 
 class AuthService:
     """Supabase Auth service for user authentication"""
 
     def __init__(self):
-        self.supabase: Client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_KEY
-        )
         self.jwt_secret = settings.SUPABASE_JWT_SECRET
 
     async def verify_token(self, token: str) -> Dict[str, Any]:
@@ -39,6 +40,11 @@ class AuthService:
         Raises:
             HTTPException: If token is invalid or expired
         """
+        # Already verified and not yet expired: skip decoding
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+
         try:
             # Decode and verify JWT
             payload = jwt.decode(
@@ -47,6 +53,7 @@ class AuthService:
                 algorithms=["HS256"],
                 audience="authenticated"
             )
+            token_cache.set(token, payload)
             return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(
@@ -101,28 +108,26 @@ class AuthService:
         """
         try:
             # Use sign_up instead of admin.create_user to avoid permission issues
-            response = self.supabase.auth.sign_up({
-                "email": email,
-                "password": password,
-                "options": {
-                    "data": user_metadata or {}
-                }
-            })
+            response = await gotrue_client.sign_up(email, password, user_metadata)
+
+            # Email confirmation disabled: a session with a nested user;
+            # otherwise the user object itself
+            user = response.get("user") or (response if response.get("id") else None)
 
-            if response and response.user:
+            if user:
                 result = {
-                    "id": response.user.id,
-                    "email": response.user.email,
-                    "user_metadata": response.user.user_metadata,
-                    "email_confirmed": response.user.email_confirmed_at is not None
+                    "id": user["id"],
+                    "email": user.get("email"),
+                    "user_metadata": user.get("user_metadata") or {},
+                    "email_confirmed": user.get("email_confirmed_at") is not None
                 }
 
                 # If session exists, user can login immediately (email confirmation disabled)
-                if response.session:
+                if response.get("access_token"):
                     result["session"] = {
-                        "access_token": response.session.access_token,
-                        "refresh_token": response.session.refresh_token,
-                        "expires_in": response.session.expires_in
+                        "access_token": response["access_token"],
+                        "refresh_token": response["refresh_token"],
+                        "expires_in": response.get("expires_in")
                     }
 
                 return result
@@ -155,20 +160,18 @@ class AuthService:
             Session information including access token
         """
         try:
-            response = self.supabase.auth.sign_in_with_password({
-                "email": email,
-                "password": password
-            })
+            response = await gotrue_client.sign_in_with_password(email, password)
 
-            if response and response.session:
+            if response.get("access_token"):
+                user = response.get("user") or {}
                 return {
-                    "access_token": response.session.access_token,
-                    "refresh_token": response.session.refresh_token,
-                    "expires_in": response.session.expires_in,
+                    "access_token": response["access_token"],
+                    "refresh_token": response["refresh_token"],
+                    "expires_in": response.get("expires_in"),
                     "user": {
-                        "id": response.user.id,
-                        "email": response.user.email,
-                        "user_metadata": response.user.user_metadata
+                        "id": user.get("id"),
+                        "email": user.get("email"),
+                        "user_metadata": user.get("user_metadata") or {}
                     }
                 }
             raise HTTPException(
@@ -211,13 +214,13 @@ class AuthService:
             New session information
         """
         try:
-            response = self.supabase.auth.refresh_session(refresh_token)
+            response = await gotrue_client.refresh_session(refresh_token)
 
-            if response and response.session:
+            if response.get("access_token"):
                 return {
-                    "access_token": response.session.access_token,
-                    "refresh_token": response.session.refresh_token,
-                    "expires_in": response.session.expires_in
+                    "access_token": response["access_token"],
+                    "refresh_token": response["refresh_token"],
+                    "expires_in": response.get("expires_in")
                 }
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -291,6 +294,9 @@ class AuthService:
         await db.execute(do_update_stmt)
         await db.commit()
 
+        # Core UPSERT bypasses the ORM: drop the cached user row explicitly
+        user_cache.invalidate(user_id)
+
         # Fetch and return the user
         result = await db.execute(
             select(User).where(User.supabase_user_id == user_id)
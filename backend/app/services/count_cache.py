@@ -0,0 +1,152 @@
+"""
+Count Cache - 列表总数缓存 / 估算
+
+每个分页接口在取一页数据之前都会对同样的过滤条件再跑一次 COUNT(*)，
+广场页每次翻页都是一次完整的过滤计数。这里：
+- exact: 按过滤条件签名（编译后的 SQL）缓存精确总数，带 TTL
+- estimated: 不做 COUNT，未过滤的全表用 pg_class.reltuples，
+  带过滤条件的用 EXPLAIN 的行数估算（适合超大的集合，只需要量级）
+- 失效：ORM 会话提交时，按被写入的表清除对应缓存（其他进程依赖 TTL）
+"""
+import json
+import logging
+import time
+from typing import Dict, FrozenSet, Sequence, Set, Tuple, Union
+
+from sqlalchemy import Select, event, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class CountCache:
+    """按 (涉及的表, 过滤签名, 模式) 缓存列表总数"""
+
+    MODES = ("exact", "estimated")
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (expires_at, count)
+        self._entries: Dict[Tuple[FrozenSet[str], str, str], Tuple[float, int]] = {}
+
+    @staticmethod
+    def signature(query: Select) -> str:
+        """过滤签名：编译后的 SQL + 绑定参数"""
+        compiled = query.compile(dialect=postgresql.dialect())
+        params = sorted((key, repr(value)) for key, value in compiled.params.items())
+        return f"{compiled.string}|{params}"
+
+    async def count(
+        self,
+        db: AsyncSession,
+        tables: Union[str, Sequence[str]],
+        query: Select,
+        mode: str = "exact"
+    ) -> int:
+        """
+        获取查询结果的总行数
+
+        Args:
+            db: 数据库会话
+            tables: 查询涉及的表（第一个为主表；任一表有写入时失效）
+            query: 过滤后的行查询（不含排序与分页）
+            mode: exact（缓存的精确值）/ estimated（规划器估算）
+
+        Returns:
+            int: 总数
+        """
+        if mode not in self.MODES:
+            mode = "exact"
+
+        if isinstance(tables, str):
+            tables = (tables,)
+
+        key = (frozenset(tables), self.signature(query), mode)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        if mode == "estimated":
+            total = await self._estimate(db, tables[0], query)
+        else:
+            result = await db.execute(
+                select(func.count()).select_from(query.order_by(None).subquery())
+            )
+            total = result.scalar() or 0
+
+        if len(self._entries) >= self.max_entries:
+            self._evict()
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, total)
+        return total
+
+    async def _estimate(self, db: AsyncSession, table: str, query: Select) -> int:
+        if query.whereclause is None:
+            # 未过滤：表统计信息中的行数
+            result = await db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": table}
+            )
+            estimate = result.scalar()
+            # 表从未 ANALYZE 时 reltuples 为 -1/0，退回 EXPLAIN
+            if estimate and estimate > 0:
+                return int(estimate)
+
+        # 带过滤：规划器的行数估算（EXPLAIN 不执行查询）
+        sql = str(query.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True}
+        ))
+        # 转义冒号，避免字面量中的 ":xxx" 被 text() 当作绑定参数
+        result = await db.execute(text("EXPLAIN (FORMAT JSON) " + sql.replace(":", "\\:")))
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def invalidate(self, *tables: str):
+        """清除指定表相关的缓存"""
+        targets = set(tables)
+        for key in [key for key in self._entries if key[0] & targets]:
+            del self._entries[key]
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+
+
+# Singleton instance
+count_cache = CountCache(ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+# ----------------------------------------------------------------------
+# 写入时失效：flush 时记录被修改的表，提交后清除缓存
+# ----------------------------------------------------------------------
+
+@event.listens_for(Session, "after_flush")
+def _record_written_tables(session: Session, flush_context):
+    tables: Set[str] = session.info.setdefault("count_cache_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session: Session):
+    tables = session.info.pop("count_cache_tables", None)
+    if tables:
+        count_cache.invalidate(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session: Session):
+    session.info.pop("count_cache_tables", None)
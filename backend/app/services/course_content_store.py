@@ -0,0 +1,164 @@
+"""
+Course Content Store - 课程 HTML 的内容寻址存储
+
+生成的 HTML（几百 KB）原先存放在 Course.content 的 JSON 列中，
+每次 select(Course)（包括列表接口）都要把它拖过 asyncpg 和 Pydantic。
+现在 HTML 按 SHA-256 写入对象存储：
+- 行上只保留 content_hash / content_size / content_url
+- 相同内容只存一份（重复保存是幂等的）
+- 内容不可变，读取时进程内按哈希 LRU 缓存
+- 旧数据（content={"generated": html}）在读取时惰性迁移
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.models.course import Course
+from app.services.storage_backends import StorageBackend, get_storage_backend, iter_bytes
+
+
+logger = logging.getLogger(__name__)
+
+
+class CourseContentStore:
+    """课程 HTML 内容寻址存储（对象存储后端）"""
+
+    CONTENT_TYPE = "text/html; charset=utf-8"
+
+    def __init__(
+        self,
+        bucket_name: str,
+        prefix: str = "course-content",
+        cache_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """
+        Args:
+            bucket_name: 存储桶
+            prefix: 对象路径前缀
+            cache_max_bytes: 进程内缓存的总字节数上限
+        """
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.cache_max_bytes = cache_max_bytes
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_bytes = 0
+
+    @property
+    def backend(self) -> StorageBackend:
+        return get_storage_backend(self.bucket_name)
+
+    @staticmethod
+    def hash_content(html: str) -> str:
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    def path_for(self, content_hash: str) -> str:
+        """对象路径：按哈希前两位分目录"""
+        return f"{self.prefix}/{content_hash[:2]}/{content_hash}.html"
+
+    async def put(self, html: str) -> Dict[str, object]:
+        """
+        写入 HTML（内容相同则覆盖为同一对象）
+
+        Returns:
+            {"hash", "size", "url"}
+        """
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_for(content_hash)
+
+        await self.backend.put(
+            path,
+            iter_bytes(data),
+            content_type=self.CONTENT_TYPE,
+            size=len(data),
+            upsert=True,
+            # 内容按哈希寻址、不可变
+            cache_seconds=31536000,
+        )
+        url = self.backend.public_url(path)
+
+        self._remember(content_hash, html)
+        return {"hash": content_hash, "size": len(data), "url": url}
+
+    async def get(self, content_hash: str) -> str:
+        """
+        按哈希读取 HTML
+
+        Raises:
+            Exception: 对象不存在或下载失败
+        """
+        cached = self._cache.get(content_hash)
+        if cached is not None:
+            self._cache.move_to_end(content_hash)
+            return cached
+
+        chunks = [chunk async for chunk in self.backend.stream(self.path_for(content_hash))]
+        html = b"".join(chunks).decode("utf-8")
+        self._remember(content_hash, html)
+        return html
+
+    async def attach(self, course: Course, html: Optional[str]):
+        """
+        把 HTML 写入存储并更新课程行上的引用（调用方负责提交）
+
+        html 为 None 时清空内容引用
+        """
+        if html is None:
+            course.content_hash = None
+            course.content_size = None
+            course.content_url = None
+        else:
+            stored = await self.put(html)
+            course.content_hash = stored["hash"]
+            course.content_size = stored["size"]
+            course.content_url = stored["url"]
+        course.content = None
+
+    async def load(self, course: Course) -> Optional[str]:
+        """读取课程 HTML（兼容尚未迁移的旧数据）"""
+        if course.content_hash:
+            return await self.get(course.content_hash)
+        if course.content:
+            return course.content.get("generated")
+        return None
+
+    async def migrate(self, course: Course) -> bool:
+        """
+        把旧的 content={"generated": html} 迁移到对象存储（调用方负责提交）
+
+        Returns:
+            bool: 是否发生了迁移
+        """
+        if course.content_hash or not course.content:
+            return False
+
+        html = course.content.get("generated")
+        if html is None:
+            return False
+
+        await self.attach(course, html)
+        logger.info(f"Migrated course {course.id} content to blob storage ({course.content_size} bytes)")
+        return True
+
+    def _remember(self, content_hash: str, html: str):
+        size = len(html)
+        if size > self.cache_max_bytes:
+            return
+        if content_hash in self._cache:
+            self._cache.move_to_end(content_hash)
+            return
+
+        self._cache[content_hash] = html
+        self._cache_bytes += size
+        while self._cache_bytes > self.cache_max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+
+# Singleton instance
+course_content_store = CourseContentStore(
+    bucket_name=settings.SUPABASE_BUCKET_NAME,
+    cache_max_bytes=settings.COURSE_CONTENT_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,221 @@
+"""
+Course Generation Service - 动画生成执行与失败处理
+
+由生成队列 worker 调用：
+- run_course_generation: 执行一次生成并写回 Course（失败时抛出异常，由调用方决定是否重试）
+- fail_course_generation: 最终失败处理（标记失败、退还积分、发送通知）
+
+生成过程中部分 HTML 按字节数 / 时间间隔写入 checkpoint；重试时把 checkpoint
+作为 resume_from 传入，让模型从断点续写，而不是重新付费生成一遍。
+长文档的压缩提纲同样保存在任务上（payload["brief"]），重试时沿用同一份提纲。
+"""
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.course import Course
+from app.models.message import Message
+from app.services.ai_service import ai_service
+from app.services.course_content_store import course_content_store
+from app.services.credit_service import credit_service, ANIMATION_COST
+
+
+logger = logging.getLogger(__name__)
+
+# 续写时用于检测模型重复输出的最大 / 最小重叠长度
+OVERLAP_PROBE_CHARS = 512
+OVERLAP_MIN_CHARS = 8
+
+
+async def run_course_generation(
+    db: AsyncSession,
+    course_id: int,
+    user_id: int,
+    content: str,
+    style: str,
+    difficulty: str,
+    title: str,
+    resume_from: Optional[str] = None,
+    on_checkpoint: Optional[Callable[[str], Awaitable[None]]] = None,
+    brief: Optional[str] = None,
+    on_brief: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Course:
+    """
+    执行动画生成
+
+    流程：
+    1. 更新状态为 processing
+    2. 调用 AI 服务生成内容（有 resume_from 时从断点续写）
+    3. 每 GENERATION_CHECKPOINT_BYTES 字节或 GENERATION_CHECKPOINT_SECONDS 秒
+       把新增部分交给 on_checkpoint 持久化
+    4. 成功 -> 更新状态为 completed，发送成功通知
+
+    Args:
+        resume_from: 上一次尝试保存的部分 HTML
+        on_checkpoint: 持久化回调，参数为自上次 checkpoint 以来新增的文本
+        brief: 上一次尝试保存的长文档压缩提纲（续写时必须沿用同一份提纲）
+        on_brief: 持久化回调，参数为本次新压缩出的提纲
+
+    Raises:
+        Exception: 生成失败时抛出（抛出前会尽量保存最后一段 checkpoint），
+            Course 状态保持 processing
+    """
+    # 1. 获取 Course 记录
+    result = await db.execute(
+        select(Course).where(Course.id == course_id)
+    )
+    course = result.scalar_one()
+
+    # 2. 更新状态为 processing
+    course.status = "processing"
+    await db.commit()
+
+    # 3. 执行 AI 生成（耗时操作），按块累积，避免字符串反复拼接
+    chunks: List[str] = [resume_from] if resume_from else []
+
+    if resume_from and resume_from.rstrip().endswith("</html>"):
+        # 上次已经生成完整，只是在写回数据库时失败
+        logger.info(f"Course {course_id}: checkpoint is already complete, skipping generation")
+    else:
+        if resume_from:
+            logger.info(f"Course {course_id}: resuming generation from {len(resume_from)} chars")
+
+        stream = ai_service.generate_course_text_stream(
+            content=content,
+            style=style,
+            difficulty=difficulty,
+            title=title,
+            resume_from=resume_from,
+            brief=brief,
+            on_brief=on_brief
+        )
+        if resume_from:
+            stream = _skip_overlap(resume_from, stream)
+
+        pending: List[str] = []
+        pending_bytes = 0
+        last_checkpoint = time.monotonic()
+
+        try:
+            async for text in stream:
+                chunks.append(text)
+                if on_checkpoint is None:
+                    continue
+
+                pending.append(text)
+                pending_bytes += len(text.encode("utf-8"))
+                if (
+                    pending_bytes >= settings.GENERATION_CHECKPOINT_BYTES
+                    or time.monotonic() - last_checkpoint >= settings.GENERATION_CHECKPOINT_SECONDS
+                ):
+                    await on_checkpoint("".join(pending))
+                    pending, pending_bytes = [], 0
+                    last_checkpoint = time.monotonic()
+        except BaseException:
+            # 中断（上游断流 / worker 关闭）：尽量保存已收到的部分，重试时续写
+            if on_checkpoint is not None and pending:
+                try:
+                    await on_checkpoint("".join(pending))
+                except Exception as e:
+                    logger.warning(f"Course {course_id}: failed to save final checkpoint: {e}")
+            raise
+
+    # 4. 成功：HTML 写入内容寻址存储，Course 行上只保留引用
+    await course_content_store.attach(course, "".join(chunks))
+    course.status = "completed"
+    course.fail_reason = None
+    await db.commit()
+
+    # 5. 发送成功通知
+    message = Message(
+        user_id=user_id,
+        title="动画生成成功 🎉",
+        content=f"您的课程《{title}》已生成完毕，快去查看吧！",
+        message_type="animation_success",
+        related_course_id=course_id
+    )
+    db.add(message)
+    await db.commit()
+
+    return course
+
+
+def _trim_overlap(previous: str, head: str) -> str:
+    """去掉续写开头与已生成内容末尾重复的部分"""
+    limit = min(len(previous), len(head), OVERLAP_PROBE_CHARS)
+    for size in range(limit, OVERLAP_MIN_CHARS - 1, -1):
+        if previous.endswith(head[:size]):
+            return head[size:]
+    return head
+
+
+async def _skip_overlap(previous: str, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """缓冲续写的开头部分，去掉模型重复输出的已有内容后再放行"""
+    head = ""
+    checked = False
+    async for text in tokens:
+        if checked:
+            yield text
+            continue
+
+        head += text
+        if len(head) >= OVERLAP_PROBE_CHARS:
+            checked = True
+            trimmed = _trim_overlap(previous, head)
+            if trimmed:
+                yield trimmed
+
+    if not checked and head:
+        trimmed = _trim_overlap(previous, head)
+        if trimmed:
+            yield trimmed
+
+
+async def fail_course_generation(
+    db: AsyncSession,
+    course_id: int,
+    user_id: int,
+    title: str,
+    reason: str
+):
+    """
+    最终失败处理：标记失败、退还积分、发送失败通知
+
+    只应在重试次数用尽后调用一次，避免重复退款。
+    全部修改（连同调用方在同一会话中的未提交修改，如任务状态）在一个事务中提交：
+    任何一步失败都不会留下“已失败但未退款”的状态
+    """
+    result = await db.execute(
+        select(Course).where(Course.id == course_id)
+    )
+    course = result.scalar_one_or_none()
+
+    # 更新状态为 failed
+    if course:
+        course.status = "failed"
+        course.fail_reason = reason
+
+    # 退还积分
+    await credit_service.add_credits(
+        db=db,
+        user_id=user_id,
+        amount=ANIMATION_COST,
+        transaction_type="REFUND",
+        description="动画生成失败，退还积分",
+        commit=False
+    )
+
+    # 发送失败通知
+    message = Message(
+        user_id=user_id,
+        title="动画生成失败 ❌",
+        content=f"很抱歉，《{title}》生成失败。{ANIMATION_COST}积分已退回您的账户。",
+        message_type="animation_failed",
+        related_course_id=course_id if course else None
+    )
+    db.add(message)
+    await db.commit()
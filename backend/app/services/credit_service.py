@@ -19,10 +19,12 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
+from app.core.pagination import paginate, page_results
 from app.models.user import User
 from app.models.user_wallet import UserWallet
 from app.models.credit_transaction import CreditTransaction
 from app.models.invitation import Invitation
+from app.services.count_cache import count_cache
 
 
 # 常量配置
@@ -189,7 +191,8 @@ class CreditService:
         user_id: int,
         amount: int,
         transaction_type: str = "REFUND",
-        description: str = "积分退还"
+        description: str = "积分退还",
+        commit: bool = True
     ) -> Dict:
         """
         增加用户积分（用于退款、奖励等）
@@ -200,6 +203,7 @@ class CreditService:
             amount: 增加的积分数量
             transaction_type: 交易类型
             description: 交易描述
+            commit: 是否立即提交；False 时只 flush，由调用方与其他修改一起提交
 
         Returns:
             dict: 增加结果
@@ -231,8 +235,11 @@ class CreditService:
         )
 
         db.add(transaction)
-        await db.commit()
-        await db.refresh(wallet)
+        if commit:
+            await db.commit()
+            await db.refresh(wallet)
+        else:
+            await db.flush()
 
         return {
             "success": True,
@@ -274,7 +281,8 @@ class CreditService:
         db: AsyncSession,
         user_id: int,
         page: int = 1,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> Dict:
         """
         获取积分交易记录
@@ -282,29 +290,31 @@ class CreditService:
         Args:
             db: 数据库会话
             user_id: 用户ID
-            page: 页码
+            page: 页码（兼容模式，传 cursor 时忽略）
             limit: 每页数量
+            cursor: 上一页返回的 next_cursor（keyset 分页）
 
         Returns:
             dict: 交易记录列表
         """
-        # 获取总数
-        count_query = select(func.count()).select_from(CreditTransaction).where(
-            CreditTransaction.user_id == user_id
+        # 获取总数（按用户缓存，新交易提交时失效）
+        total = await count_cache.count(
+            db,
+            CreditTransaction.__tablename__,
+            select(CreditTransaction.id).where(CreditTransaction.user_id == user_id)
         )
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
 
         # 获取交易记录
-        offset = (page - 1) * limit
-        query = select(CreditTransaction).where(
-            CreditTransaction.user_id == user_id
-        ).order_by(
-            CreditTransaction.created_at.desc()
-        ).offset(offset).limit(limit)
+        order_columns = (CreditTransaction.created_at, CreditTransaction.id)
+        query = paginate(
+            select(CreditTransaction).where(CreditTransaction.user_id == user_id),
+            order_columns, "latest", limit, cursor=cursor, page=page
+        )
 
         result = await db.execute(query)
-        transactions = result.scalars().all()
+        transactions, next_cursor = page_results(
+            result.scalars().all(), order_columns, "latest", limit
+        )
 
         return {
             "transactions": [
@@ -323,7 +333,8 @@ class CreditService:
             ],
             "total": total,
             "page": page,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
 
     @staticmethod
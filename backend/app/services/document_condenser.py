@@ -0,0 +1,278 @@
+"""
+Document Condenser - 长文档 map-reduce 压缩
+
+解析出的文档全文会原样拼进生成 prompt，大型教材会撑爆上下文窗口，
+也让生成又慢又贵。超过 token 预算的文本先压缩成结构化摘要：
+- map: 按段落切块，用快速模型并发摘要（信号量限制并发数）
+- reduce: 把各块摘要合并成一份结构化讲解提纲，作为 _build_prompt 的内容
+- 块摘要按 (文档哈希, 块哈希) 缓存，重新生成 / 换风格时不再重复摘要
+"""
+import asyncio
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.llm_router import LLMRouter
+
+
+logger = logging.getLogger(__name__)
+
+
+CHUNK_SUMMARY_PROMPT = """你是一名教材编辑，正在为一部教育动画整理素材。
+下面是文档《{title}》的第 {index}/{total} 部分。请用中文提炼这一部分：
+- 核心概念与定义
+- 关键论点、推导步骤或因果关系
+- 有代表性的例子、数据、公式
+- 重要术语（保留原文术语）
+
+只输出要点列表，不要寒暄，不要编造原文没有的内容，控制在 {limit} 字以内。
+
+---
+{chunk}"""
+
+
+REDUCE_PROMPT = """你是一名教育动画的总编剧。下面是文档《{title}》按顺序排列的分段摘要。
+请把它们整合成一份结构化的讲解提纲，按以下格式输出：
+
+## 主题概述
+（2-3 句话说明文档讲什么、为什么重要）
+
+## 知识结构
+（按讲解顺序列出章节，每节列出核心概念与要点）
+
+## 关键例子与数据
+（最适合可视化的例子、类比、数据、公式）
+
+## 核心术语
+（术语: 一句话解释）
+
+## 总结
+（学习者最应记住的结论）
+
+去除重复内容，保持原文的逻辑顺序，不要编造，控制在 {limit} 字以内。
+
+---
+{summaries}"""
+
+
+class DocumentCondenser:
+    """长文档 map-reduce 压缩器"""
+
+    # 单个段落超过块大小时的硬切分边界
+    _SENTENCE_END = re.compile(r"(?<=[。！？.!?\n])")
+
+    def __init__(
+        self,
+        token_budget: int = 60000,
+        chunk_tokens: int = 6000,
+        concurrency: int = 4,
+        model: str = "",
+        summary_chars: int = 1500,
+        brief_chars: int = 8000,
+        max_rounds: int = 3,
+        cache_max_entries: int = 2048,
+    ):
+        """
+        Args:
+            token_budget: 超过该估算 token 数的文本才会压缩
+            chunk_tokens: 每个块的估算 token 数
+            concurrency: 同时进行的摘要请求数
+            model: 摘要使用的快速模型（为空时使用 backend 默认模型）
+            summary_chars: 每块摘要的目标字数
+            brief_chars: 最终提纲的目标字数
+            max_rounds: 摘要合并后仍超预算时，最多再 map 几轮
+            cache_max_entries: 块摘要缓存条数上限
+        """
+        self.token_budget = token_budget
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+        self.model = model
+        self.summary_chars = summary_chars
+        self.brief_chars = brief_chars
+        self.max_rounds = max_rounds
+        self.cache_max_entries = cache_max_entries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """粗略估算 token 数：CJK 字符约 1 token/字，其他约 4 字符/token"""
+        cjk = sum(1 for ch in text if "㐀" <= ch <= "鿿")
+        return cjk + (len(text) - cjk) // 4
+
+    def needs_condensing(self, text: str) -> bool:
+        return self.estimate_tokens(text) > self.token_budget
+
+    def split(self, text: str) -> List[str]:
+        """按段落切块，尽量不在段落中间断开"""
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+
+        for paragraph in self._paragraphs(text):
+            tokens = self.estimate_tokens(paragraph)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(paragraph)
+            current_tokens += tokens
+
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def _paragraphs(self, text: str) -> List[str]:
+        paragraphs = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if self.estimate_tokens(paragraph) <= self.chunk_tokens:
+                paragraphs.append(paragraph)
+                continue
+
+            # 超长段落：按句子边界再切
+            piece = ""
+            for sentence in self._SENTENCE_END.split(paragraph):
+                if piece and self.estimate_tokens(piece + sentence) > self.chunk_tokens:
+                    paragraphs.append(piece)
+                    piece = ""
+                piece += sentence
+            if piece:
+                paragraphs.append(piece)
+        return paragraphs
+
+    async def condense(
+        self,
+        text: str,
+        router: LLMRouter,
+        title: str = "",
+        document_key: Optional[str] = None,
+    ) -> str:
+        """
+        超过 token 预算时把文本压缩为结构化提纲，否则原样返回
+
+        Args:
+            text: 文档全文
+            router: LLM 路由器
+            title: 文档 / 课程标题
+            document_key: 块摘要缓存的文档标识（默认使用全文哈希）
+
+        Returns:
+            str: 原文或结构化提纲
+
+        Raises:
+            Exception: 摘要请求失败时向上抛出
+        """
+        if not self.needs_condensing(text):
+            return text
+
+        document_key = document_key or self._hash(text)
+        summaries = await self._map(text, router, title, document_key)
+
+        # 摘要合并后仍然过长（超大文档）：把摘要当作新文本再 map 一轮
+        rounds = 1
+        while self.needs_condensing("\n\n".join(summaries)) and rounds < self.max_rounds:
+            summaries = await self._map("\n\n".join(summaries), router, title, document_key)
+            rounds += 1
+
+        brief = await self._reduce(summaries, router, title)
+        logger.info(
+            f"Condensed document {document_key[:12]}: "
+            f"~{self.estimate_tokens(text)} -> ~{self.estimate_tokens(brief)} tokens "
+            f"({len(summaries)} summaries, {rounds} round(s))"
+        )
+        return brief
+
+    async def _map(
+        self,
+        text: str,
+        router: LLMRouter,
+        title: str,
+        document_key: str,
+    ) -> List[str]:
+        chunks = self.split(text)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def summarize(index: int, chunk: str) -> str:
+            cache_key = f"{document_key}:{self._hash(chunk)}"
+            cached = self._get_summary(cache_key)
+            if cached is not None:
+                return cached
+
+            async with semaphore:
+                prompt = CHUNK_SUMMARY_PROMPT.format(
+                    title=title or "未命名文档",
+                    index=index + 1,
+                    total=len(chunks),
+                    limit=self.summary_chars,
+                    chunk=chunk,
+                )
+                summary = await self._complete(router, prompt)
+
+            self._set_summary(cache_key, summary)
+            return summary
+
+        # gather 保持块的原始顺序
+        return list(await asyncio.gather(*(summarize(i, c) for i, c in enumerate(chunks))))
+
+    async def _reduce(self, summaries: List[str], router: LLMRouter, title: str) -> str:
+        sections = "\n\n".join(
+            f"### 第 {index} 部分\n{summary}" for index, summary in enumerate(summaries, 1)
+        )
+        prompt = REDUCE_PROMPT.format(
+            title=title or "未命名文档",
+            limit=self.brief_chars,
+            summaries=sections,
+        )
+        return await self._complete(router, prompt)
+
+    async def _complete(self, router: LLMRouter, prompt: str) -> str:
+        # 只发送 user 消息：不会触发 GSAP system 前缀的 prompt 缓存改写
+        kwargs = {"model": self.model} if self.model else {}
+        text = await router.complete(
+            [{"role": "user", "content": prompt}],
+            temperature=0.2,
+            **kwargs
+        )
+        return text.strip()
+
+    # ------------------------------------------------------------------
+    # 块摘要缓存（进程内 LRU）
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _get_summary(self, key: str) -> Optional[str]:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _set_summary(self, key: str, summary: str):
+        if not summary:
+            return
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.cache_max_entries:
+            self._summaries.popitem(last=False)
+
+    def invalidate(self, document_key: str):
+        """丢弃某个文档的全部块摘要"""
+        prefix = f"{document_key}:"
+        for key in [k for k in self._summaries if k.startswith(prefix)]:
+            del self._summaries[key]
+
+
+# Singleton instance
+document_condenser = DocumentCondenser(
+    token_budget=settings.CONDENSE_TOKEN_BUDGET,
+    chunk_tokens=settings.CONDENSE_CHUNK_TOKENS,
+    concurrency=settings.CONDENSE_CONCURRENCY,
+    model=settings.CONDENSE_MODEL,
+    cache_max_entries=settings.CONDENSE_CACHE_MAX_ENTRIES,
+)
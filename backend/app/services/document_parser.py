@@ -1,10 +1,18 @@
 """
 Document parsing service for extracting text content from PDF, PPT, and Word files
 """
+import asyncio
 import io
-from typing import Optional
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
+from app.core.config import settings
+
 try:
     import pdfplumber
     HAS_PDFPLUMBER = True
@@ -24,49 +32,166 @@ except ImportError:
     HAS_PYTHON_DOCX = False
 
 
+# File content as bytes, or a path to a local file
+DocumentSource = Union[bytes, str]
+
+
+def _open_source(source: DocumentSource):
+    """Parsers accept both file-like objects and paths"""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+@contextmanager
+def _mapped(path: str):
+    """Memory-map a local file read-only (worker processes share its page cache)"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def _docx_page_count(doc) -> Optional[int]:
+    """Page count Word saved in docProps/app.xml (absent for generated files)"""
+    for part in doc.part.package.iter_parts():
+        if part.partname == "/docProps/app.xml":
+            match = re.search(rb"<Pages>(\d+)</Pages>", part.blob)
+            return int(match.group(1)) if match else None
+    return None
+
+
 class DocumentParser:
     """Parse various document formats to extract text content"""
 
     @staticmethod
-    def parse_pdf(file_content: bytes) -> str:
+    def extract_pdf(file_content: DocumentSource) -> Tuple[str, int]:
         """
-        Extract text from PDF file
+        Extract text and page count from PDF file
 
         Args:
-            file_content: PDF file content as bytes
+            file_content: PDF file content as bytes, or a local file path
 
         Returns:
-            Extracted text content
+            (extracted text content, page count)
         """
         if not HAS_PDFPLUMBER:
             raise ImportError("pdfplumber is not installed. Install with: pip install pdfplumber")
 
         text_content = []
 
-        with pdfplumber.open(io.BytesIO(file_content)) as pdf:
+        with pdfplumber.open(_open_source(file_content)) as pdf:
             for page in pdf.pages:
                 text = page.extract_text()
                 if text:
                     text_content.append(text)
+            page_count = len(pdf.pages)
+
+        return "\n\n".join(text_content), page_count
+
+    @staticmethod
+    def count_pdf_pages(path: str) -> int:
+        """Number of pages in a local PDF file"""
+        if not HAS_PDFPLUMBER:
+            raise ImportError("pdfplumber is not installed. Install with: pip install pdfplumber")
+
+        with _mapped(path) as source, pdfplumber.open(source) as pdf:
+            return len(pdf.pages)
+
+    @staticmethod
+    def iter_pdf_pages(path: str, start: int, end: int) -> Iterator[Tuple[int, str]]:
+        """
+        Extract pages [start, end) of a local PDF file, one at a time
 
-        return "\n\n".join(text_content)
+        Runs in a worker process; each worker opens its own view of the
+        memory-mapped file, so shards never copy the document.
+
+        Yields:
+            (page index, extracted text) as each page finishes
+        """
+        if not HAS_PDFPLUMBER:
+            raise ImportError("pdfplumber is not installed. Install with: pip install pdfplumber")
+
+        with _mapped(path) as source, pdfplumber.open(source) as pdf:
+            for index in range(start, min(end, len(pdf.pages))):
+                page = pdf.pages[index]
+                yield index, page.extract_text() or ""
+                # Drop the page's parsed objects before moving on
+                page.close()
 
     @staticmethod
-    def parse_pptx(file_content: bytes) -> str:
+    async def stream_pdf_pages(
+        path: str,
+        shard_pages: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, str]]:
         """
-        Extract text from PowerPoint file
+        Extract a local PDF in parallel, page ranges sharded across worker processes
+
+        Pages are yielded in page order as soon as each page and all pages
+        before it are done. Shards are queued in page order on the parse
+        executor, so the earliest pages are always extracted first.
+
+        extract_from_storage is currently the only consumer and needs the
+        full text. Condensation runs later, at generation time, on the
+        persisted text, so nothing downstream starts early yet.
 
         Args:
-            file_content: PPTX file content as bytes
+            path: Local PDF file path
+            shard_pages: Pages per worker job (default DOCUMENT_PARSE_PDF_SHARD_PAGES)
+
+        Yields:
+            (page index, extracted text)
+        """
+        from app.services.parse_executor import DocumentParseError, parse_executor
+
+        shard_pages = shard_pages or settings.DOCUMENT_PARSE_PDF_SHARD_PAGES
+        page_count = await parse_executor.run(DocumentParser.count_pdf_pages, path)
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run_shard(start: int, end: int):
+            extracted = 0
+            try:
+                pages = parse_executor.stream(DocumentParser.iter_pdf_pages, path, start, end)
+                async for index, text in pages:
+                    queue.put_nowait((index, text, None))
+                    extracted += 1
+                if extracted < end - start:
+                    raise DocumentParseError(f"Pages {start}-{end} returned only {extracted} pages")
+            except Exception as e:
+                queue.put_nowait((start, None, e))
+
+        shards = [
+            asyncio.create_task(run_shard(start, min(start + shard_pages, page_count)))
+            for start in range(0, page_count, shard_pages)
+        ]
+        finished: Dict[int, str] = {}
+        next_index = 0
+        try:
+            while next_index < page_count:
+                index, text, error = await queue.get()
+                if error is not None:
+                    raise error
+                finished[index] = text
+                while next_index in finished:
+                    yield next_index, finished.pop(next_index)
+                    next_index += 1
+        finally:
+            for shard in shards:
+                shard.cancel()
+            await asyncio.gather(*shards, return_exceptions=True)
+
+    @staticmethod
+    def extract_pptx(file_content: DocumentSource) -> Tuple[str, int]:
+        """
+        Extract text and slide count from PowerPoint file
+
+        Args:
+            file_content: PPTX file content as bytes, or a local file path
 
         Returns:
-            Extracted text content
+            (extracted text content, slide count)
         """
         if not HAS_PYTHON_PPTX:
             raise ImportError("python-pptx is not installed. Install with: pip install python-pptx")
 
         text_content = []
-        prs = Presentation(io.BytesIO(file_content))
+        prs = Presentation(_open_source(file_content))
 
         for slide_num, slide in enumerate(prs.slides, 1):
             slide_text = [f"## Slide {slide_num}"]
@@ -77,23 +202,24 @@ class DocumentParser:
 
             text_content.append("\n".join(slide_text))
 
-        return "\n\n".join(text_content)
+        return "\n\n".join(text_content), len(prs.slides)
 
     @staticmethod
-    def parse_docx(file_content: bytes) -> str:
+    def extract_docx(file_content: DocumentSource) -> Tuple[str, Optional[int]]:
         """
         Extract text from Word document
 
         Args:
-            file_content: DOCX file content as bytes
+            file_content: DOCX file content as bytes, or a local file path
 
         Returns:
-            Extracted text content
+            (extracted text content, page count from the document
+            properties if Word recorded one, else None)
         """
         if not HAS_PYTHON_DOCX:
             raise ImportError("python-docx is not installed. Install with: pip install python-docx")
 
-        doc = docx.Document(io.BytesIO(file_content))
+        doc = docx.Document(_open_source(file_content))
         text_content = []
 
         for paragraph in doc.paragraphs:
@@ -107,19 +233,34 @@ class DocumentParser:
                 if row_text:
                     text_content.append(" | ".join(row_text))
 
-        return "\n\n".join(text_content)
+        return "\n\n".join(text_content), _docx_page_count(doc)
+
+    @staticmethod
+    def parse_pdf(file_content: DocumentSource) -> str:
+        """Extract text from PDF file"""
+        return DocumentParser.extract_pdf(file_content)[0]
+
+    @staticmethod
+    def parse_pptx(file_content: DocumentSource) -> str:
+        """Extract text from PowerPoint file"""
+        return DocumentParser.extract_pptx(file_content)[0]
+
+    @staticmethod
+    def parse_docx(file_content: DocumentSource) -> str:
+        """Extract text from Word document"""
+        return DocumentParser.extract_docx(file_content)[0]
 
     @staticmethod
-    def parse_document(file_content: bytes, file_extension: str) -> str:
+    def extract_document(file_content: DocumentSource, file_extension: str) -> Dict[str, Any]:
         """
-        Parse document based on file extension
+        Extract text and page count based on file extension
 
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes, or a local file path
             file_extension: File extension (e.g., '.pdf', '.pptx', '.docx')
 
         Returns:
-            Extracted text content
+            {"text": extracted text content, "page_count": pages/slides or None}
 
         Raises:
             ValueError: If file format is not supported
@@ -128,35 +269,89 @@ class DocumentParser:
         extension = file_extension.lower()
 
         if extension == ".pdf":
-            return DocumentParser.parse_pdf(file_content)
+            text, page_count = DocumentParser.extract_pdf(file_content)
         elif extension in [".ppt", ".pptx"]:
-            return DocumentParser.parse_pptx(file_content)
+            text, page_count = DocumentParser.extract_pptx(file_content)
         elif extension in [".doc", ".docx"]:
-            return DocumentParser.parse_docx(file_content)
+            text, page_count = DocumentParser.extract_docx(file_content)
         else:
             raise ValueError(f"Unsupported file format: {extension}")
 
+        return {"text": text, "page_count": page_count}
+
     @staticmethod
-    async def parse_from_storage(storage_path: str) -> str:
+    def parse_document(file_content: DocumentSource, file_extension: str) -> str:
         """
-        Parse document from storage path
+        Parse document based on file extension
 
         Args:
-            storage_path: Path to file in storage
+            file_content: File content as bytes, or a local file path
+            file_extension: File extension (e.g., '.pdf', '.pptx', '.docx')
 
         Returns:
             Extracted text content
+
+        Raises:
+            ValueError: If file format is not supported
+            ImportError: If required library is not installed
         """
-        from app.services.storage_service import storage_service
+        return DocumentParser.extract_document(file_content, file_extension)["text"]
+
+    @staticmethod
+    async def extract_from_storage(storage_path: str) -> Dict[str, Any]:
+        """
+        Extract text and page count from a file in storage
 
-        # Download file from storage
-        file_content = await storage_service.download_file(storage_path)
+        The file is streamed to a temp file and parsed in a separate
+        process (see app/services/parse_executor.py), so the event loop
+        never blocks on the parser and a pathological file is killed on
+        timeout or memory limit instead of taking down the API worker.
+
+        Args:
+            storage_path: Path to file in storage
+
+        Returns:
+            {"text": extracted text content, "page_count": pages/slides or None}
+        """
+        from app.services.storage_service import storage_service
+        from app.services.parse_executor import parse_executor
 
         # Get file extension
         file_extension = Path(storage_path).suffix
 
-        # Parse document
-        return DocumentParser.parse_document(file_content, file_extension)
+        fd, local_path = tempfile.mkstemp(prefix="document-", suffix=file_extension)
+        try:
+            # Download file from storage
+            with os.fdopen(fd, "wb") as f:
+                await storage_service.download_to(storage_path, f)
+
+            if file_extension.lower() == ".pdf":
+                # Page-sharded across worker processes, merged in page order
+                texts: List[str] = []
+                page_count = 0
+                async for _, text in DocumentParser.stream_pdf_pages(local_path):
+                    page_count += 1
+                    if text:
+                        texts.append(text)
+                return {"text": "\n\n".join(texts), "page_count": page_count}
+
+            # Parse document in a worker process (only the path is sent)
+            return await parse_executor.run(DocumentParser.extract_document, local_path, file_extension)
+        finally:
+            os.unlink(local_path)
+
+    @staticmethod
+    async def parse_from_storage(storage_path: str) -> str:
+        """
+        Parse document from storage path
+
+        Args:
+            storage_path: Path to file in storage
+
+        Returns:
+            Extracted text content
+        """
+        return (await DocumentParser.extract_from_storage(storage_path))["text"]
 
 
 # Singleton instance
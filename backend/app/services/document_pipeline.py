@@ -0,0 +1,263 @@
+"""
+Document Pipeline - 上传后解析一次，持久化提取结果
+
+生成 / 重新生成每次都要从对象存储下载原文件，再花几秒重新解析。
+现在 upload_document 提交后在后台解析一次：
+- 提取文本 zlib 压缩后存入 documents.extracted_text（延迟加载列），
+  同时记录 page_count / char_count / content_hash
+- Document.status: processing -> success / failed（error_message 记录原因）
+- 生成入口 get_text() 只按主键读这一列；尚未解析完成时等待进行中的任务，
+  旧文档（迁移前上传）或解析失败的文档当场解析并回填；
+  只有 file_url 的旧文档从公开 URL 还原 file_path
+- 启动时及之后定期重新排队停留在 pending / processing 的文档（进程重启中断的任务）
+- 多进程 / 多机器：解析前用条件 UPDATE 原子认领（claimed_at），解析期间心跳续期，
+  同一文档只解析一次；认领超过 DOCUMENT_EXTRACT_CLAIM_SECONDS 没有心跳时由其他进程接管
+"""
+import asyncio
+import hashlib
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.supabase_db import AsyncSessionLocal
+from app.models.document import Document
+from app.services.document_parser import document_parser
+from app.services.parse_executor import DocumentParseError
+from app.services.storage_service import storage_service
+
+
+logger = logging.getLogger(__name__)
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+class DocumentPipeline:
+    """上传后的文本提取（每个文档一个后台任务，进程内去重，跨进程按行认领）"""
+
+    def __init__(self, claim_seconds: float = 300.0, poll_interval: float = 2.0):
+        """
+        Args:
+            claim_seconds: 认领超过该时间没有心跳视为失效，其他进程可以接管
+            poll_interval: 等待其他进程提取结果时的轮询间隔（秒）
+        """
+        self.claim_seconds = claim_seconds
+        self.poll_interval = poll_interval
+        # document_id -> 提取任务（结果为文本；未认领到或解析失败为 None）
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def schedule(self, document_id: int) -> asyncio.Task:
+        """排队提取文档文本（已有进行中的任务时复用）"""
+        task = self._inflight.get(document_id)
+        if task is None:
+            task = asyncio.create_task(self.process(document_id), name=f"document-extract-{document_id}")
+            self._inflight[document_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(document_id, None))
+        return task
+
+    async def claim(self, document_id: int) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """
+        原子认领文档的提取任务
+
+        未提取，且没有被其他进程认领（或认领已失效）时才能认领成功，
+        多个 API 进程 / 机器同时排队同一文档只会解析一次
+
+        Returns:
+            (file_path, file_url)；文档不存在、已提取或正被其他进程提取时返回 None
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.claim_seconds)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Document)
+                .where(
+                    Document.id == document_id,
+                    Document.extracted_text.is_(None),
+                    or_(
+                        Document.status != "processing",
+                        Document.claimed_at.is_(None),
+                        Document.claimed_at < stale,
+                    )
+                )
+                .values(status="processing", claimed_at=now)
+                .returning(Document.file_path, Document.file_url)
+            )
+            row = result.one_or_none()
+            await db.commit()
+        return (row.file_path, row.file_url) if row else None
+
+    async def process(self, document_id: int) -> Optional[str]:
+        """
+        认领、下载、解析并保存提取结果
+
+        数据库会话只在认领和写回时短暂使用，不跨越解析过程（可能超过两分钟）
+
+        Returns:
+            提取的文本；未认领到或解析失败时返回 None
+        """
+        claimed = await self.claim(document_id)
+        if claimed is None:
+            return None
+
+        # 旧文档只记录了 file_url：从公开 URL 还原存储路径并回填
+        file_path, file_url = claimed
+        file_path = file_path or storage_service.path_from_url(file_url)
+
+        heartbeat = asyncio.create_task(self._heartbeat(document_id))
+        try:
+            if not file_path:
+                raise DocumentParseError(f"Unknown storage location: {file_url}")
+            extracted = await document_parser.extract_from_storage(file_path)
+        except Exception as e:
+            logger.warning(f"Failed to extract document {document_id}: {e}")
+            await self._save(
+                document_id,
+                status="failed",
+                error_message=str(e)[:1000],
+                claimed_at=None,
+                file_path=file_path,
+            )
+            return None
+        finally:
+            heartbeat.cancel()
+
+        text = extracted["text"]
+        await self._save(
+            document_id,
+            extracted_text=compress_text(text),
+            page_count=extracted["page_count"],
+            char_count=len(text),
+            content_hash=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            status="success",
+            error_message=None,
+            claimed_at=None,
+            file_path=file_path,
+        )
+
+        logger.info(
+            f"Extracted document {document_id}: {extracted['page_count']} pages, {len(text)} chars"
+        )
+        return text
+
+    async def _heartbeat(self, document_id: int):
+        """解析期间定期刷新 claimed_at，避免长时间解析被其他进程接管"""
+        while True:
+            await asyncio.sleep(self.claim_seconds / 4)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(Document)
+                        .where(Document.id == document_id, Document.status == "processing")
+                        .values(claimed_at=datetime.utcnow())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"Heartbeat for document {document_id} extraction failed: {e}")
+
+    async def _save(self, document_id: int, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Document).where(Document.id == document_id).values(**values)
+            )
+            await db.commit()
+
+    async def get_text(self, db: AsyncSession, document: Document) -> str:
+        """
+        生成入口：读取文档的提取文本
+
+        正被其他进程提取时轮询等待其结果（认领失效后由本进程接管）
+
+        Raises:
+            DocumentParseError: 文本提取失败
+        """
+        data = await db.scalar(
+            select(Document.extracted_text).where(Document.id == document.id)
+        )
+        if data is not None:
+            return decompress_text(data)
+
+        while True:
+            # 进行中的任务直接等待；否则（旧文档 / 上次失败 / 认领失效）当场提取并回填
+            text = await asyncio.shield(self.schedule(document.id))
+            if text is not None:
+                return text
+
+            async with AsyncSessionLocal() as poll_db:
+                row = (await poll_db.execute(
+                    select(Document.status, Document.extracted_text, Document.error_message)
+                    .where(Document.id == document.id)
+                )).one_or_none()
+
+            if row is None or row.status == "failed":
+                reason = row.error_message if row else "document not found"
+                raise DocumentParseError(f"Text extraction failed for document {document.id}: {reason}")
+            if row.extracted_text is not None:
+                return decompress_text(row.extracted_text)
+
+            # 其他进程正在提取
+            await asyncio.sleep(self.poll_interval)
+
+    async def requeue(self) -> int:
+        """
+        重新排队未完成且未被有效认领的提取任务（进程重启 / 被杀时中断的）
+
+        Returns:
+            int: 排队的文档数量
+        """
+        stale = datetime.utcnow() - timedelta(seconds=self.claim_seconds)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Document.id).where(
+                    Document.status.in_(("pending", "processing")),
+                    Document.extracted_text.is_(None),
+                    or_(Document.claimed_at.is_(None), Document.claimed_at < stale),
+                )
+            )
+            document_ids = result.scalars().all()
+
+        for document_id in document_ids:
+            self.schedule(document_id)
+        return len(document_ids)
+
+    async def start(self):
+        """启动时重新排队中断的任务，之后定期接管认领失效的文档"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="document-extract-sweeper")
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                requeued = await self.requeue()
+                if requeued:
+                    logger.info(f"Requeued text extraction for {requeued} documents")
+            except Exception as e:
+                logger.error(f"Failed to requeue document extraction: {e}")
+            await asyncio.sleep(self.claim_seconds)
+
+    async def stop(self):
+        """取消进行中的提取任务（应用关闭时调用）；被取消的文档由其他进程在认领失效后接管"""
+        tasks = list(self._inflight.values())
+        if self._sweeper is not None:
+            tasks.append(self._sweeper)
+            self._sweeper = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Singleton instance
+document_pipeline = DocumentPipeline(
+    claim_seconds=settings.DOCUMENT_EXTRACT_CLAIM_SECONDS,
+    poll_interval=settings.DOCUMENT_EXTRACT_POLL_SECONDS,
+)
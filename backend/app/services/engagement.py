@@ -0,0 +1,290 @@
+"""
+Engagement Service - 互动计数（浏览量、点赞）
+
+浏览量：写回缓冲（write-behind）
+每次浏览都 `views_count += 1` + commit，热门课程会变成对同一行的写入风暴。
+这里把增量先累积在内存中，定时按 id 合并成一条
+`UPDATE ... SET views_count = views_count + n` 批量写回：
+- 请求路径上只是一次内存累加，浏览变成纯读
+- 读取时返回 已持久化的值 + 尚未写回的增量
+- 写回失败时增量放回缓冲区，下次重试
+- 进程异常退出最多丢失一个写回周期内的增量
+
+点赞：单条 SQL 完成 INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING
+与计数的原子更新（一次往返、不丢更新），后台定期以 course_likes 为准校正 courses.likes_count。
+帖子点赞是独立的匿名计数（posts.likes_count），单条 UPDATE ... RETURNING 原子累加，不参与校正。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Tuple, Type
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.supabase_db import AsyncSessionLocal, Base
+
+
+logger = logging.getLogger(__name__)
+
+
+# (表名, 计数列) -> {行 id: 增量}
+CounterKey = Tuple[str, str]
+
+
+class CounterBuffer:
+    """内存计数器缓冲 + 定时批量写回"""
+
+    def __init__(self, flush_interval: float = 5.0):
+        """
+        Args:
+            flush_interval: 写回间隔（秒）
+        """
+        self.flush_interval = flush_interval
+        self._deltas: Dict[CounterKey, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._tables: Dict[str, Type[Base]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def incr(self, model: Type[Base], row_id: int, field: str = "views_count", amount: int = 1):
+        """累加增量（不访问数据库）"""
+        table = model.__tablename__
+        self._tables[table] = model
+        self._deltas[(table, field)][row_id] += amount
+
+    def pending(self, model: Type[Base], row_id: int, field: str = "views_count") -> int:
+        """尚未写回的增量"""
+        deltas = self._deltas.get((model.__tablename__, field))
+        return deltas.get(row_id, 0) if deltas else 0
+
+    def current(self, model: Type[Base], row_id: int, persisted: int, field: str = "views_count") -> int:
+        """已持久化的值 + 尚未写回的增量"""
+        return (persisted or 0) + self.pending(model, row_id, field)
+
+    async def flush(self) -> int:
+        """
+        把累积的增量批量写回数据库
+
+        Returns:
+            int: 写回的行数
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not self._deltas:
+                return 0
+
+            # 先交换缓冲区：写回期间的新增量进入新的缓冲区
+            deltas, self._deltas = self._deltas, defaultdict(lambda: defaultdict(int))
+            flushed = 0
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    for (table_name, field), rows in deltas.items():
+                        table = self._tables[table_name].__table__
+                        statement = (
+                            table.update()
+                            .where(table.c.id == bindparam("row_id"))
+                            .values({field: table.c[field] + bindparam("amount")})
+                        )
+                        # 按 id 排序，多进程同时写回时加锁顺序一致，避免死锁
+                        params = [
+                            {"row_id": row_id, "amount": amount}
+                            for row_id, amount in sorted(rows.items())
+                            if amount
+                        ]
+                        if params:
+                            await db.execute(statement, params)
+                            flushed += len(params)
+                    await db.commit()
+            except Exception:
+                # 写回失败：把增量合并回缓冲区，下次重试
+                for key, rows in deltas.items():
+                    for row_id, amount in rows.items():
+                        self._deltas[key][row_id] += amount
+                raise
+
+            return flushed
+
+    def start(self):
+        """启动定时写回任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop(), name="counter-flusher")
+
+    async def stop(self):
+        """停止定时任务，并写回剩余的增量"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final counter flush failed: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Counter flush failed: {e}")
+
+
+# Singleton instance
+counter_buffer = CounterBuffer(flush_interval=settings.COUNTER_FLUSH_SECONDS)
+
+
+# ----------------------------------------------------------------------
+# 点赞
+# ----------------------------------------------------------------------
+
+# 单条语句完成课程点赞切换 + 计数更新（一次往返）：
+# - ins: 未点赞则插入（ON CONFLICT DO NOTHING，并发重复点赞只会成功一次）
+# - del: 插入没有发生（说明已点赞）则删除，DELETE ... RETURNING 保证并发取消只减一次
+# - 计数按 ins/del 的实际行数原子更新，不在 Python 中读改写
+_TOGGLE_COURSE_LIKE_SQL = text("""
+WITH target AS (
+    SELECT id FROM courses WHERE id = :course_id AND is_public = true
+), ins AS (
+    INSERT INTO course_likes (user_id, course_id, created_at)
+    SELECT :user_id, id, now() FROM target
+    ON CONFLICT DO NOTHING
+    RETURNING course_id
+), del AS (
+    DELETE FROM course_likes
+    WHERE user_id = :user_id
+      AND course_id IN (SELECT id FROM target)
+      AND NOT EXISTS (SELECT 1 FROM ins)
+    RETURNING course_id
+), delta AS (
+    SELECT (SELECT count(*) FROM ins) - (SELECT count(*) FROM del) AS value
+), course_update AS (
+    UPDATE courses
+    SET likes_count = GREATEST(likes_count + (SELECT value FROM delta), 0)
+    WHERE id IN (SELECT id FROM target)
+    RETURNING likes_count
+)
+SELECT
+    EXISTS (SELECT 1 FROM ins) AS liked,
+    (SELECT likes_count FROM course_update) AS course_likes_count
+""")
+
+# 帖子点赞：匿名计数，原子累加
+_INCREMENT_POST_LIKES_SQL = text("""
+UPDATE posts SET likes_count = likes_count + 1
+WHERE id = :post_id
+RETURNING likes_count
+""")
+
+# 以 course_likes 为准校正冗余计数（只写入不一致的行）
+_RECONCILE_COURSE_LIKES_SQL = text("""
+UPDATE courses AS c
+SET likes_count = counted.total
+FROM (
+    SELECT courses.id, count(course_likes.course_id) AS total
+    FROM courses
+    LEFT JOIN course_likes ON course_likes.course_id = courses.id
+    GROUP BY courses.id
+) AS counted
+WHERE c.id = counted.id AND c.likes_count <> counted.total
+RETURNING c.id
+""")
+
+
+class LikeService:
+    """原子点赞切换 + 后台计数校正"""
+
+    def __init__(self, reconcile_interval: float = 600.0):
+        """
+        Args:
+            reconcile_interval: 计数校正间隔（秒）
+        """
+        self.reconcile_interval = reconcile_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def toggle_course_like(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        course_id: int
+    ) -> Optional[Dict[str, object]]:
+        """
+        切换课程点赞状态
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            course_id: 课程ID
+
+        Returns:
+            {"liked", "likes_count"}，课程不存在或未公开时返回 None
+        """
+        result = await db.execute(
+            _TOGGLE_COURSE_LIKE_SQL,
+            {"user_id": user_id, "course_id": course_id}
+        )
+        row = result.one()
+        await db.commit()
+
+        if row.course_likes_count is None:
+            return None
+
+        return {
+            "liked": bool(row.liked),
+            "likes_count": row.course_likes_count,
+        }
+
+    async def increment_post_like(self, db: AsyncSession, post_id: int) -> Optional[int]:
+        """
+        帖子点赞数 +1（匿名计数，单条语句原子更新）
+
+        Returns:
+            更新后的点赞数，帖子不存在时返回 None
+        """
+        result = await db.execute(_INCREMENT_POST_LIKES_SQL, {"post_id": post_id})
+        likes_count = result.scalar_one_or_none()
+        await db.commit()
+        return likes_count
+
+    async def reconcile(self) -> int:
+        """
+        以 course_likes 为准校正 courses 的 likes_count
+
+        Returns:
+            int: 被校正的行数
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(_RECONCILE_COURSE_LIKES_SQL)
+            fixed = len(result.all())
+            await db.commit()
+
+        if fixed:
+            logger.warning(f"Reconciled likes_count on {fixed} row(s)")
+        return fixed
+
+    def start(self):
+        """启动后台校正任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._reconcile_loop(), name="like-reconciler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Like reconciliation failed: {e}")
+
+
+# Singleton instance
+like_service = LikeService(reconcile_interval=settings.LIKE_RECONCILE_SECONDS)
@@ -0,0 +1,159 @@
+"""
+GCP Token Manager - 后台刷新 Vertex AI OAuth access token
+
+access token 约 1 小时过期。这里在过期前于后台线程中刷新，
+并通过回调把新 token 原子地替换到 LLM 客户端上：
+- 刷新永远不在事件循环线程中同步执行，不会卡住正在进行的 SSE 流
+- 刷新失败按退避重试，token 仍有效期间不影响请求
+- 暴露 token 年龄、刷新耗时等指标
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import google.auth.transport.requests
+
+
+logger = logging.getLogger(__name__)
+
+
+class GCPTokenManager:
+    """OAuth access token 后台刷新器"""
+
+    def __init__(
+        self,
+        credentials: Any,
+        refresh_margin: float = 300.0,
+        retry_interval: float = 30.0,
+    ):
+        """
+        Args:
+            credentials: 已完成首次刷新的 google.auth 凭据
+            refresh_margin: 提前多少秒刷新
+            retry_interval: 刷新失败后的重试间隔（秒）
+        """
+        self.credentials = credentials
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.issued_at = time.time()
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.last_refresh_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def token(self) -> str:
+        return self.credentials.token
+
+    def expires_in(self) -> Optional[float]:
+        """距离过期的秒数（凭据未提供 expiry 时返回 None）"""
+        expiry = getattr(self.credentials, "expiry", None)
+        if not expiry:
+            return None
+        return (expiry - datetime.utcnow()).total_seconds()
+
+    def needs_refresh(self) -> bool:
+        remaining = self.expires_in()
+        return remaining is not None and remaining <= self.refresh_margin
+
+    def is_expired(self) -> bool:
+        remaining = self.expires_in()
+        return remaining is not None and remaining <= 0
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """注册 token 更新回调（在事件循环线程中调用）"""
+        self._listeners.append(callback)
+
+    async def refresh(self, force: bool = False) -> str:
+        """
+        在工作线程中刷新 token（并发调用只会触发一次刷新）
+
+        Args:
+            force: 即使未接近过期也强制刷新
+
+        Returns:
+            当前有效的 access token
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not force and not self.needs_refresh():
+                return self.token
+
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(
+                    self.credentials.refresh,
+                    google.auth.transport.requests.Request()
+                )
+            except Exception as e:
+                self.failure_count += 1
+                self.last_error = str(e)
+                logger.error(f"GCP token refresh failed: {e}")
+                raise
+            finally:
+                self.last_refresh_latency = time.perf_counter() - started
+
+            self.issued_at = time.time()
+            self.refresh_count += 1
+            self.last_error = None
+
+            token = self.credentials.token
+            for callback in self._listeners:
+                callback(token)
+
+            logger.info(
+                f"GCP token refreshed in {self.last_refresh_latency:.2f}s, "
+                f"expires in {self.expires_in() or 0:.0f}s"
+            )
+            return token
+
+    def start(self):
+        """启动后台刷新任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop(), name="gcp-token-refresher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            remaining = self.expires_in()
+            if remaining is None:
+                delay = 3000.0
+            else:
+                delay = max(0.0, remaining - self.refresh_margin)
+            await asyncio.sleep(delay)
+
+            try:
+                await self.refresh(force=True)
+            except Exception:
+                await asyncio.sleep(self.retry_interval)
+
+    def metrics(self) -> Dict[str, Any]:
+        """token 年龄、剩余有效期与刷新统计"""
+        remaining = self.expires_in()
+        return {
+            "token_age_seconds": round(time.time() - self.issued_at, 1),
+            "expires_in_seconds": round(remaining, 1) if remaining is not None else None,
+            "last_refresh_latency_ms": (
+                round(self.last_refresh_latency * 1000, 1)
+                if self.last_refresh_latency is not None else None
+            ),
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            "last_error": self.last_error,
+            "background_refresh": self._task is not None and not self._task.done(),
+        }
@@ -0,0 +1,188 @@
+"""
+Generation Cache - 课程生成结果缓存
+
+按 (content, style, difficulty, title, model) 的哈希缓存生成完成的 HTML：
+- 命中缓存：直接回放，不再调用 LLM
+- 相同请求正在生成中：挂到同一个上游流上，不发起第二次调用
+- 生成失败：不写入缓存，所有等待方都收到同一个异常
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+class _InflightGeneration:
+    """一次正在进行的上游生成，供多个订阅方共享"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, token: str):
+        async with self._changed:
+            self.tokens.append(token)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """从头回放已生成的 token，然后跟随后续 token 直到结束"""
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.tokens) or self.done)
+                pending = self.tokens[index:]
+                finished = self.done
+                error = self.error
+            index += len(pending)
+            for token in pending:
+                yield token
+            if finished and index >= len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+
+class GenerationCache:
+    """内容寻址的生成缓存（进程内 LRU + TTL）"""
+
+    # 回放时每帧的字符数，保持与上游流相同的 SSE 帧格式
+    REPLAY_CHUNK_SIZE = 4096
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, _InflightGeneration] = {}
+
+    @staticmethod
+    def make_key(
+        content: str,
+        style: str,
+        difficulty: str,
+        title: str,
+        model_name: str,
+    ) -> str:
+        """
+        根据规范化后的输入生成缓存键
+
+        Args:
+            content: 源内容
+            style: 讲解风格
+            difficulty: 难度
+            title: 标题
+            model_name: 模型名称
+
+        Returns:
+            SHA-256 十六进制摘要
+        """
+        normalized = {
+            "content": "\n".join(line.rstrip() for line in (content or "").strip().splitlines()),
+            "style": (style or "").strip().lower(),
+            "difficulty": (difficulty or "").strip().lower(),
+            "title": (title or "").strip(),
+            "model": model_name,
+        }
+        raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """获取未过期的缓存 HTML"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, html = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return html
+
+    def set(self, key: str, html: str):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        self._entries[key] = (time.monotonic(), html)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """删除缓存条目"""
+        self._entries.pop(key, None)
+
+    def replay(self, html: str) -> List[str]:
+        """把缓存的 HTML 切成若干 token，供回放使用"""
+        size = self.REPLAY_CHUNK_SIZE
+        return [html[i:i + size] for i in range(0, len(html), size)]
+
+    async def stream(
+        self,
+        key: str,
+        producer: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """
+        以缓存优先的方式产出 token
+
+        Args:
+            key: 缓存键（make_key 的结果）
+            producer: 无参函数，返回上游 token 异步迭代器
+
+        Yields:
+            生成的文本 token
+        """
+        cached = self.get(key)
+        if cached is not None:
+            for token in self.replay(cached):
+                yield token
+            return
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = _InflightGeneration()
+            self._inflight[key] = inflight
+            # 上游生成在独立任务中运行：首个客户端断开也不会中断，结果仍会写入缓存
+            inflight.task = asyncio.create_task(self._run(key, inflight, producer))
+
+        async for token in inflight.subscribe():
+            yield token
+
+    async def _run(
+        self,
+        key: str,
+        inflight: _InflightGeneration,
+        producer: Callable[[], AsyncIterator[str]],
+    ):
+        try:
+            async for token in producer():
+                await inflight.publish(token)
+        except BaseException as e:
+            await inflight.finish(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            html = "".join(inflight.tokens)
+            if html:
+                self.set(key, html)
+            await inflight.finish()
+        finally:
+            self._inflight.pop(key, None)
+
+
+# Singleton instance
+generation_cache = GenerationCache(
+    max_entries=settings.GENERATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.GENERATION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,388 @@
+"""
+Generation Queue - 基于数据库的持久化动画生成队列
+
+替代 FastAPI BackgroundTasks：任务写入 generation_jobs 表，进程重启不会丢失。
+
+关键特性：
+- SELECT ... FOR UPDATE SKIP LOCKED 领取任务，多个 worker / 多个进程可并行
+- 固定大小的 worker 池（GENERATION_WORKER_CONCURRENCY）
+- 心跳：处理中的任务定期刷新 heartbeat_at
+- sweeper：心跳超时的任务重新入队（worker 被杀、OOM、部署重启）
+- checkpoint：生成中的部分 HTML 定期追加到任务行，重试时从断点续写
+- 长文档的压缩提纲存入 payload，重试时沿用（reduce 结果不确定，续写必须用同一份）
+- 重试上限：用尽后走原有的失败退款流程
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.supabase_db import AsyncSessionLocal
+from app.models.course import Course
+from app.models.generation_job import GenerationJob
+from app.services.count_cache import count_cache
+from app.services.course_generation import run_course_generation, fail_course_generation
+
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationQueue:
+    """持久化生成队列 + worker 池"""
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        max_attempts: int = 3,
+        poll_interval: float = 2.0,
+        heartbeat_interval: float = 15.0,
+        stale_after: float = 120.0,
+    ):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._stopping: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # ------------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------------
+
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        course_id: int,
+        user_id: int,
+        content: str,
+        style: str,
+        difficulty: str,
+        title: str
+    ) -> GenerationJob:
+        """
+        添加生成任务（与调用方未提交的修改在同一事务中提交）
+
+        Args:
+            db: 数据库会话
+            course_id: 课程ID
+            user_id: 用户ID
+            content: 生成内容
+            style: 讲解风格
+            difficulty: 难度
+            title: 标题
+
+        Returns:
+            GenerationJob: 新建的任务
+        """
+        job = GenerationJob(
+            course_id=course_id,
+            user_id=user_id,
+            payload={
+                "content": content,
+                "style": style,
+                "difficulty": difficulty,
+                "title": title,
+            },
+            status="queued",
+            max_attempts=self.max_attempts,
+            available_at=datetime.utcnow(),
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    # ------------------------------------------------------------------
+    # Worker lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """启动 worker 池和 sweeper（需在事件循环中调用）"""
+        if self._tasks:
+            return
+
+        self._stopping = asyncio.Event()
+        for index in range(self.concurrency):
+            self._tasks.append(
+                asyncio.create_task(self._worker_loop(), name=f"generation-worker-{index}")
+            )
+        self._tasks.append(asyncio.create_task(self._sweeper_loop(), name="generation-sweeper"))
+        logger.info(f"Generation queue started: worker={self.worker_id}, concurrency={self.concurrency}")
+
+    async def stop(self):
+        """
+        停止 worker 池
+
+        正在执行的生成会被取消；心跳停止后由其他进程的 sweeper 重新入队。
+        """
+        if not self._tasks:
+            return
+
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"Generation queue stopped: worker={self.worker_id}")
+
+    async def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = await self.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim generation job: {e}")
+                job = None
+
+            if job is None:
+                await self._idle(self.poll_interval)
+                continue
+
+            try:
+                await self._process(job)
+            except Exception:
+                # 状态写入失败（如数据库不可用）：任务停留在 processing，
+                # 心跳停止后由 sweeper 回收；worker 本身继续运行
+                logger.exception(f"Failed to record result of generation job {job.id}")
+
+    async def _sweeper_loop(self):
+        while not self._stopping.is_set():
+            try:
+                requeued = await self.sweep()
+                if requeued:
+                    logger.warning(f"Sweeper recovered {requeued} stale generation job(s)")
+            except Exception as e:
+                logger.error(f"Generation sweeper failed: {e}")
+            await self._idle(self.heartbeat_interval)
+
+    async def _idle(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Job handling
+    # ------------------------------------------------------------------
+
+    async def claim(self) -> Optional[GenerationJob]:
+        """
+        领取一个可执行的任务
+
+        Returns:
+            GenerationJob 或 None（队列为空）
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(GenerationJob)
+                .where(
+                    GenerationJob.status == "queued",
+                    GenerationJob.available_at <= now
+                )
+                .order_by(GenerationJob.available_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = result.scalar_one_or_none()
+
+            if not job:
+                return None
+
+            job.status = "processing"
+            job.attempts += 1
+            job.worker_id = self.worker_id
+            job.heartbeat_at = now
+            await db.commit()
+            return job
+
+    async def _process(self, job: GenerationJob):
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            async with AsyncSessionLocal() as db:
+                await run_course_generation(
+                    db,
+                    course_id=job.course_id,
+                    user_id=job.user_id,
+                    resume_from=job.checkpoint,
+                    on_checkpoint=lambda text: self._save_checkpoint(job.id, text),
+                    on_brief=lambda brief: self._save_brief(job, brief),
+                    **job.payload
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Generation job {job.id} attempt {job.attempts} failed: {e}")
+            await self._handle_failure(job.id, str(e))
+        else:
+            await self._mark_completed(job.id)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(GenerationJob)
+                        .where(
+                            GenerationJob.id == job_id,
+                            GenerationJob.worker_id == self.worker_id
+                        )
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"Heartbeat for generation job {job_id} failed: {e}")
+
+    async def _save_checkpoint(self, job_id: int, text: str):
+        """把新增的部分 HTML 追加到任务的 checkpoint（只写增量）"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(GenerationJob)
+                .where(
+                    GenerationJob.id == job_id,
+                    GenerationJob.worker_id == self.worker_id
+                )
+                .values(
+                    checkpoint=func.coalesce(GenerationJob.checkpoint, "") + text,
+                    checkpoint_at=datetime.utcnow(),
+                    heartbeat_at=datetime.utcnow()
+                )
+            )
+            await db.commit()
+
+    async def _save_brief(self, job: GenerationJob, brief: str):
+        """把长文档的压缩提纲存入任务 payload，重试 / 续写时沿用"""
+        payload = {**job.payload, "brief": brief}
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(GenerationJob)
+                .where(
+                    GenerationJob.id == job.id,
+                    GenerationJob.worker_id == self.worker_id
+                )
+                .values(payload=payload)
+            )
+            await db.commit()
+
+    async def _mark_completed(self, job_id: int):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(GenerationJob)
+                .where(
+                    GenerationJob.id == job_id,
+                    GenerationJob.worker_id == self.worker_id
+                )
+                .values(
+                    status="completed",
+                    finished_at=datetime.utcnow(),
+                    last_error=None,
+                    checkpoint=None
+                )
+            )
+            await db.commit()
+
+    async def _handle_failure(self, job_id: int, error: str):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(GenerationJob)
+                .where(GenerationJob.id == job_id)
+                .with_for_update()
+            )
+            job = result.scalar_one_or_none()
+
+            # 任务已被 sweeper 接管（本 worker 心跳超时），交给新的持有者处理
+            if not job or job.status != "processing" or job.worker_id != self.worker_id:
+                return
+
+            await self._retry_or_fail(db, job, error)
+
+    async def _retry_or_fail(self, db: AsyncSession, job: GenerationJob, error: str):
+        """还有重试次数则延迟重新入队，否则标记失败并走退款流程"""
+        job.last_error = error
+        job.worker_id = None
+
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.available_at = datetime.utcnow() + timedelta(seconds=30 * job.attempts)
+            await db.execute(
+                update(Course).where(Course.id == job.course_id).values(status="pending")
+            )
+            await db.commit()
+            # Core UPDATE 不经过 ORM flush，手动清除课程列表总数缓存
+            count_cache.invalidate(Course.__tablename__)
+            return
+
+        # 任务状态与课程失败、退款、通知在同一事务中提交：
+        # 退款失败时回滚，任务仍是 processing，心跳超时后由 sweeper 再次处理
+        job.status = "failed"
+        job.finished_at = datetime.utcnow()
+        try:
+            await fail_course_generation(
+                db,
+                course_id=job.course_id,
+                user_id=job.user_id,
+                title=job.payload.get("title", ""),
+                reason=error
+            )
+        except Exception:
+            await db.rollback()
+            logger.exception(f"Failed to refund generation job {job.id}; left for the sweeper")
+            # 刷新心跳，sweeper 等 stale_after 后再重试，而不是立刻重复选中
+            await db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job.id)
+                .values(heartbeat_at=datetime.utcnow(), worker_id=None)
+            )
+            await db.commit()
+
+    async def sweep(self) -> int:
+        """
+        回收心跳超时的任务
+
+        Returns:
+            int: 回收的任务数量
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        recovered = 0
+
+        # 每个任务单独一个事务，避免提交后释放其余行锁导致重复处理
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(GenerationJob)
+                    .where(
+                        GenerationJob.status == "processing",
+                        GenerationJob.heartbeat_at < cutoff
+                    )
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )
+                job = result.scalar_one_or_none()
+
+                if not job:
+                    return recovered
+
+                await self._retry_or_fail(db, job, f"worker {job.worker_id} heartbeat timed out")
+                recovered += 1
+
+
+# Singleton instance
+generation_queue = GenerationQueue(
+    concurrency=settings.GENERATION_WORKER_CONCURRENCY,
+    max_attempts=settings.GENERATION_JOB_MAX_ATTEMPTS,
+    poll_interval=settings.GENERATION_WORKER_POLL_SECONDS,
+    heartbeat_interval=settings.GENERATION_JOB_HEARTBEAT_SECONDS,
+    stale_after=settings.GENERATION_JOB_STALE_SECONDS,
+)
@@ -0,0 +1,165 @@
+"""
+GoTrue Client - Supabase Auth REST API 的异步客户端
+
+supabase-py 的 auth 是同步客户端：sign_up / sign_in_with_password / refresh_session
+直接在 async 路由里调用会阻塞整个事件循环一个网络往返，
+同一 worker 上所有进行中的 SSE 生成都会跟着卡住。这里直接调用 GoTrue REST API：
+- 共享的 httpx.AsyncClient 连接池（不阻塞事件循环，复用 TLS 连接）
+- 每种调用记录次数、错误数、平均 / 最大 / 最近耗时
+"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class GoTrueError(Exception):
+    """GoTrue 返回的错误（message 为服务端的错误信息）"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class _CallStats:
+    """单种调用的延迟统计"""
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.ewma: Optional[float] = None
+        self.max: float = 0.0
+        self.last: Optional[float] = None
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.last = seconds
+        self.max = max(self.max, seconds)
+        self.ewma = seconds if self.ewma is None else (
+            self.EWMA_ALPHA * seconds + (1 - self.EWMA_ALPHA) * self.ewma
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "latency_max_ms": round(self.max * 1000, 1),
+            "latency_last_ms": round(self.last * 1000, 1) if self.last is not None else None,
+        }
+
+
+class GoTrueClient:
+    """Supabase Auth（GoTrue）异步客户端"""
+
+    def __init__(self, supabase_url: str, api_key: str, timeout: float = 10.0, max_connections: int = 20):
+        """
+        Args:
+            supabase_url: Supabase 项目 URL
+            api_key: apikey（与同步客户端一致，使用 service key）
+            timeout: 单次请求超时（秒）
+            max_connections: 连接池上限
+        """
+        self.base_url = f"{supabase_url.rstrip('/')}/auth/v1"
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats: Dict[str, _CallStats] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": self.api_key,
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+            )
+        return self._client
+
+    async def _post(self, operation: str, path: str, body: Dict[str, Any], params: Optional[Dict] = None) -> Dict[str, Any]:
+        stats = self._stats.setdefault(operation, _CallStats())
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = await self.client.post(path, json=body, params=params)
+            if response.status_code >= 400:
+                raise GoTrueError(response.status_code, self._error_message(response))
+            ok = True
+            return response.json()
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.record(elapsed, ok)
+            if elapsed > 2.0:
+                logger.warning(f"GoTrue {operation} took {elapsed:.2f}s")
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        try:
+            data = response.json()
+        except ValueError:
+            return response.text or f"HTTP {response.status_code}"
+        for key in ("msg", "error_description", "message", "error"):
+            if data.get(key):
+                return str(data[key])
+        return f"HTTP {response.status_code}"
+
+    async def sign_up(self, email: str, password: str, data: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        注册
+
+        Returns:
+            关闭邮箱确认时为 session（含 user），否则为 user 对象
+        """
+        return await self._post("sign_up", "/signup", {
+            "email": email,
+            "password": password,
+            "data": data or {},
+        })
+
+    async def sign_in_with_password(self, email: str, password: str) -> Dict[str, Any]:
+        """邮箱密码登录，返回 session（含 user）"""
+        return await self._post(
+            "sign_in", "/token",
+            {"email": email, "password": password},
+            params={"grant_type": "password"},
+        )
+
+    async def refresh_session(self, refresh_token: str) -> Dict[str, Any]:
+        """用 refresh token 换取新 session"""
+        return await self._post(
+            "refresh", "/token",
+            {"refresh_token": refresh_token},
+            params={"grant_type": "refresh_token"},
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {operation: stats.metrics() for operation, stats in self._stats.items()}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Singleton instance
+gotrue_client = GoTrueClient(
+    settings.SUPABASE_URL,
+    settings.SUPABASE_SERVICE_KEY,
+    timeout=settings.SUPABASE_AUTH_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,369 @@
+"""
+LLM Router - 多 provider 路由（首 token 对冲请求 + 熔断）
+
+- 按优先级排列的 backend（Vertex AI → OpenRouter）
+- 主 backend 在 hedge_after 秒内没有产出首个 token 时，并行发起对备用 backend 的请求，
+  先产出首 token 的一方胜出，另一方被取消
+- 主 backend 在首 token 之前失败时立即切换到下一个 backend
+- 每个 backend 记录首 token 耗时（EWMA）和错误率，连续失败达到阈值时熔断一段时间；
+  冷却结束后只放行一个试探请求，全部 backend 都熔断时直接失败（CircuitOpenError）
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """backend 处于熔断中（或试探请求进行中），请求被拒绝"""
+
+
+class CircuitBreaker:
+    """
+    简单熔断器
+
+    - closed: 正常放行
+    - open: 连续失败达到阈值，reset_timeout 内拒绝
+    - half_open: 冷却结束，只放行一个试探请求（其余拒绝）；成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """当前是否会放行（只检查，不占用试探名额）"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.probe_in_flight)
+
+    def acquire(self) -> bool:
+        """
+        放行一个请求；half_open 时占用唯一的试探名额，直到记录成功或失败
+
+        Returns:
+            bool: 是否放行
+        """
+        if not self.allow():
+            return False
+        if self.state == "half_open":
+            self.probe_in_flight = True
+        return True
+
+    def release(self):
+        """试探请求没有结论就结束（被取消 / 对冲落败）：让出试探名额"""
+        self.probe_in_flight = False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+
+class LLMBackend:
+    """单个 OpenAI 兼容 backend 及其统计信息"""
+
+    # 首 token 耗时 EWMA 平滑系数
+    TTFT_ALPHA = 0.2
+
+    def __init__(
+        self,
+        name: str,
+        client: AsyncOpenAI,
+        model_name: str,
+        breaker: Optional[CircuitBreaker] = None,
+        cached_content: Optional[str] = None,
+        cache_control: bool = False,
+    ):
+        """
+        Args:
+            name: backend 名称
+            client: OpenAI 兼容客户端
+            model_name: 模型名称
+            breaker: 熔断器
+            cached_content: 显式上下文缓存句柄（Vertex cachedContents 资源名），
+                设置后不再发送 system 前缀
+            cache_control: 为 system 前缀加上 cache_control 断点（OpenRouter）
+        """
+        self.name = name
+        self.client = client
+        self.model_name = model_name
+        self.breaker = breaker or CircuitBreaker()
+        self.cached_content = cached_content
+        self.cache_control = cache_control
+
+        self.requests = 0
+        self.errors = 0
+        self.ttft_ewma: Optional[float] = None
+
+    def prepare(
+        self,
+        messages: List[Dict[str, Any]],
+        kwargs: Dict[str, Any],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """按 backend 的提示缓存能力调整请求"""
+        if not messages or messages[0].get("role") != "system":
+            return messages, kwargs
+
+        if self.cached_content:
+            # system 前缀已在缓存中，只发送后续消息
+            extra_body = {"extra_body": {"google": {"cached_content": self.cached_content}}}
+            return messages[1:], {**kwargs, "extra_body": extra_body}
+
+        if self.cache_control and isinstance(messages[0].get("content"), str):
+            system = {
+                "role": "system",
+                "content": [{
+                    "type": "text",
+                    "text": messages[0]["content"],
+                    "cache_control": {"type": "ephemeral"},
+                }],
+            }
+            return [system] + messages[1:], kwargs
+
+        return messages, kwargs
+
+    def record_ttft(self, seconds: float):
+        if self.ttft_ewma is None:
+            self.ttft_ewma = seconds
+        else:
+            self.ttft_ewma = self.TTFT_ALPHA * seconds + (1 - self.TTFT_ALPHA) * self.ttft_ewma
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self):
+        self.errors += 1
+        self.breaker.record_failure()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "ttft_ewma_ms": round(self.ttft_ewma * 1000, 1) if self.ttft_ewma is not None else None,
+            "circuit": self.breaker.state,
+        }
+
+
+class LLMRouter:
+    """按优先级路由流式请求，支持首 token 对冲与熔断"""
+
+    def __init__(self, backends: List[LLMBackend], hedge_after: Optional[float] = 15.0):
+        """
+        Args:
+            backends: 按优先级排序的 backend 列表
+            hedge_after: 首 token 等待预算（秒），None 表示不对冲，仅在失败时切换
+        """
+        if not backends:
+            raise ValueError("LLMRouter requires at least one backend")
+        self.backends = backends
+        self.hedge_after = hedge_after
+
+    @property
+    def primary(self) -> LLMBackend:
+        return self.backends[0]
+
+    def _candidates(self) -> List[LLMBackend]:
+        available = [b for b in self.backends if b.breaker.allow()]
+        if not available:
+            raise CircuitOpenError("All LLM backends are unavailable (circuit open)")
+        return available
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """
+        流式生成文本 token
+
+        Args:
+            messages: Chat messages
+            temperature: 采样温度
+            kwargs: 透传给 chat.completions.create 的其他参数
+
+        Yields:
+            文本 token
+
+        Raises:
+            CircuitOpenError: 所有 backend 都处于熔断中
+            Exception: 所有 backend 都在首 token 前失败，或胜出的 backend 在流中途失败
+        """
+        backend, first, tokens, probe = await self._race(messages, temperature, kwargs)
+
+        settled = False
+        try:
+            yield first
+            async for token in tokens:
+                yield token
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            settled = True
+            backend.record_failure()
+            raise
+        else:
+            settled = True
+            backend.record_success()
+        finally:
+            if probe and not settled:
+                # 被取消 / 调用方提前停止：试探没有结论，让出名额
+                backend.breaker.release()
+            await tokens.aclose()
+
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        **kwargs: Any,
+    ) -> str:
+        """非流式调用：返回完整文本（同样经过对冲与熔断）"""
+        return "".join([token async for token in self.stream(messages, temperature, **kwargs)])
+
+    async def _race(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        kwargs: Dict[str, Any],
+    ) -> Tuple[LLMBackend, str, AsyncIterator[str], bool]:
+        remaining = self._candidates()
+        pending = {asyncio.create_task(self._open(remaining.pop(0), messages, temperature, kwargs))}
+        errors: List[BaseException] = []
+        winner = None
+
+        try:
+            while pending and winner is None:
+                timeout = self.hedge_after if remaining and self.hedge_after is not None else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # 首 token 超出预算：对冲到下一个 backend
+                    backend = remaining.pop(0)
+                    logger.warning(f"LLM first token exceeded {self.hedge_after}s, hedging to '{backend.name}'")
+                    pending.add(asyncio.create_task(self._open(backend, messages, temperature, kwargs)))
+                    continue
+
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                    elif winner is None:
+                        winner = task.result()
+                    else:
+                        # 同时完成的落败者：关闭其上游流
+                        loser, _, loser_tokens, loser_probe = task.result()
+                        if loser_probe:
+                            loser.breaker.release()
+                        await loser_tokens.aclose()
+
+                if winner is None and not pending and remaining:
+                    # 在首 token 前失败：立即切换
+                    pending.add(asyncio.create_task(
+                        self._open(remaining.pop(0), messages, temperature, kwargs)
+                    ))
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if winner is None:
+            raise errors[-1] if errors else RuntimeError("No LLM backend available")
+        return winner
+
+    async def _open(
+        self,
+        backend: LLMBackend,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        kwargs: Dict[str, Any],
+    ) -> Tuple[LLMBackend, str, AsyncIterator[str], bool]:
+        """
+        发起请求并等待首个 token
+
+        Returns:
+            (backend, 首个 token, 剩余 token, 是否占用了试探名额)
+
+        Raises:
+            CircuitOpenError: 候选 backend 在选中后熔断，或试探名额已被其他请求占用
+        """
+        probe = backend.breaker.state == "half_open"
+        if not backend.breaker.acquire():
+            raise CircuitOpenError(f"LLM backend '{backend.name}' is unavailable (circuit open)")
+
+        backend.requests += 1
+        started = time.monotonic()
+        tokens = None
+
+        messages, kwargs = backend.prepare(messages, kwargs)
+        # 允许调用方按请求覆盖模型（例如用快速模型做文档压缩）
+        kwargs = dict(kwargs)
+        model = kwargs.pop("model", None) or backend.model_name
+
+        try:
+            response = await backend.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                temperature=temperature,
+                **kwargs,
+            )
+            tokens = self._iter_tokens(response)
+            first = await tokens.__anext__()
+        except asyncio.CancelledError:
+            if probe:
+                backend.breaker.release()
+            if tokens is not None:
+                await tokens.aclose()
+            raise
+        except StopAsyncIteration:
+            backend.record_failure()
+            raise RuntimeError(f"LLM backend '{backend.name}' returned an empty response")
+        except Exception as e:
+            backend.record_failure()
+            logger.error(f"LLM backend '{backend.name}' failed before first token: {e}")
+            if tokens is not None:
+                await tokens.aclose()
+            raise
+
+        backend.record_ttft(time.monotonic() - started)
+        return backend, first, tokens, probe
+
+    @staticmethod
+    async def _iter_tokens(response) -> AsyncIterator[str]:
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                await close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {backend.name: backend.metrics() for backend in self.backends}
@@ -0,0 +1,369 @@
+"""
+Parse Executor - 在独立进程中解析文档
+
+pdfplumber / python-pptx / python-docx 都是同步的纯 CPU 解析，
+直接在 async 路由里调用时一个 300 页的 PDF 会把事件循环卡住好几秒，
+一个畸形 PDF 甚至能把整个 API worker 拖到 OOM。这里把解析放到子进程：
+- 并发上限 DOCUMENT_PARSE_WORKERS（信号量限流，超出的任务排队）
+- 每个任务一个进程（forkserver 预加载解析库，启动开销很小），
+  超时或内存超限时只杀掉这一个进程，不影响其他任务
+- 墙钟超时：父进程等待到截止时间后 kill
+- 内存上限：子进程内的看门狗线程按 RSS 采样，超限立即退出；
+  RLIMIT_AS 作为兜底（按机器 / 容器内存平分给各解析进程，而不是按 RSS 上限放大）
+- 输入 / 输出都走临时文件（只传路径，结果以 JSON 写回），不在进程间 pickle 大块 bytes
+- stream(): 生成器任务，每个元素（如一页文本）产出后立即通过管道发回
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# 子进程因内存超限退出时的退出码
+MEMORY_EXIT_CODE = 86
+
+# 解析进程不分配数据时的地址空间（解释器 + 解析库 + 看门狗线程的 malloc arena，实测约 120MB）
+ADDRESS_SPACE_BASELINE = 128 * 1024 * 1024
+
+
+class DocumentParseError(Exception):
+    """文档解析失败"""
+
+
+class ParseTimeoutError(DocumentParseError):
+    """解析超过墙钟时间上限"""
+
+
+class ParseMemoryError(DocumentParseError):
+    """解析进程超过内存上限"""
+
+
+# ----------------------------------------------------------------------
+# 子进程侧
+# ----------------------------------------------------------------------
+
+def _current_rss() -> int:
+    """当前 RSS（字节）；没有 /proc 时退化为峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位是 KB，macOS 是字节
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def machine_memory() -> Optional[int]:
+    """机器内存（字节）；运行在容器中时取 cgroup 的内存上限"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # 未设置上限时为 "max"（v2）或一个接近 2^63 的数（v1）
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError):
+        return None
+
+
+def _limit_memory(max_rss_bytes: int, max_address_space: int, interval: float = 0.05):
+    """启动 RSS 看门狗，并设置地址空间上限作为兜底"""
+    try:
+        import resource
+        # 拦截看门狗来不及采样的一次性大块分配
+        resource.setrlimit(resource.RLIMIT_AS, (max_address_space, max_address_space))
+    except (ImportError, ValueError, OSError):
+        pass
+
+    def watch():
+        while True:
+            if _current_rss() > max_rss_bytes:
+                os._exit(MEMORY_EXIT_CODE)
+            time.sleep(interval)
+
+    threading.Thread(target=watch, name="rss-watchdog", daemon=True).start()
+
+
+def _run_job(
+    target: Callable[..., Any],
+    args: Tuple,
+    output_path: str,
+    max_rss_bytes: int,
+    max_address_space: int,
+    conn
+):
+    """子进程入口：执行 target(*args)，结果以 JSON 写入 output_path，状态通过管道返回"""
+    _limit_memory(max_rss_bytes, max_address_space)
+    try:
+        result = target(*args)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        conn.send(("ok", None, None))
+    except MemoryError:
+        os._exit(MEMORY_EXIT_CODE)
+    except BaseException as e:
+        conn.send(("error", type(e).__name__, str(e)))
+    finally:
+        conn.close()
+
+
+def _run_stream_job(
+    target: Callable[..., Iterator[Any]],
+    args: Tuple,
+    max_rss_bytes: int,
+    max_address_space: int,
+    conn
+):
+    """子进程入口：target(*args) 是生成器，每个元素立即通过管道发回"""
+    _limit_memory(max_rss_bytes, max_address_space)
+    try:
+        for item in target(*args):
+            conn.send(("item", item, None))
+        conn.send(("ok", None, None))
+    except MemoryError:
+        os._exit(MEMORY_EXIT_CODE)
+    except BaseException as e:
+        conn.send(("error", type(e).__name__, str(e)))
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# 父进程侧
+# ----------------------------------------------------------------------
+
+class ParseExecutor:
+    """有界的解析进程池（每个任务一个进程）"""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        timeout_seconds: float = 120.0,
+        max_rss_mb: int = 128,
+        max_address_space_mb: int = 0
+    ):
+        """
+        Args:
+            max_workers: 同时运行的解析进程数上限
+            timeout_seconds: 单个任务的墙钟时间上限（秒）
+            max_rss_mb: 单个解析进程的 RSS 上限（MB）
+            max_address_space_mb: 单个解析进程的 RLIMIT_AS（MB），0 表示按机器内存自动计算
+        """
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.max_address_space = (
+            max_address_space_mb * 1024 * 1024 or self._default_address_space()
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._context = None
+        self._running: Set[multiprocessing.Process] = set()
+
+    def _default_address_space(self) -> int:
+        """
+        机器内存平分给各解析进程（全部同时失控也不会把整台机器拖到 OOM），
+        但至少留出基线地址空间 + RSS 上限，保证正常解析不会被误杀
+        """
+        floor = ADDRESS_SPACE_BASELINE + self.max_rss_bytes
+        total = machine_memory()
+        if total is None:
+            return floor
+        return max(total // self.max_workers, floor)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 在事件循环内首次使用时创建
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    @property
+    def context(self):
+        if self._context is None:
+            # API 进程里有事件循环和各种线程：不能直接 fork
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                self._context = multiprocessing.get_context("forkserver")
+                self._context.set_forkserver_preload(["app.services.document_parser"])
+            else:
+                self._context = multiprocessing.get_context("spawn")
+        return self._context
+
+    async def run(self, target: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        在子进程中执行 target(*args) 并返回其结果
+
+        target 必须是模块级函数（子进程按名称导入），参数应是路径等小对象，
+        返回值须可 JSON 序列化
+
+        Raises:
+            ParseTimeoutError: 超时
+            ParseMemoryError: 内存超限
+            ValueError / ImportError: 解析函数抛出的同类异常
+            DocumentParseError: 其他解析失败
+        """
+        async with self.semaphore:
+            return await self._run(target, args, timeout or self.timeout_seconds)
+
+    async def _run(self, target, args, timeout: float) -> Any:
+        fd, output_path = tempfile.mkstemp(prefix="parse-", suffix=".json")
+        os.close(fd)
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=_run_job,
+            args=(target, args, output_path, self.max_rss_bytes, self.max_address_space, sender),
+            daemon=True,
+        )
+        try:
+            await asyncio.to_thread(process.start)
+            sender.close()
+            self._running.add(process)
+
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                process.kill()
+                await asyncio.to_thread(process.join)
+                raise ParseTimeoutError(f"Document parsing timed out after {timeout:.0f}s")
+
+            status, error_type, message = _receive(receiver)
+            if status == "ok":
+                return await asyncio.to_thread(_read_result, output_path)
+            if status == "error":
+                raise _job_error(error_type, message)
+            raise self._exit_error(process)
+        finally:
+            self._cleanup(process, sender, receiver)
+            try:
+                os.unlink(output_path)
+            except OSError:
+                pass
+
+    async def stream(
+        self,
+        target: Callable[..., Iterator[Any]],
+        *args: Any,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Any]:
+        """
+        在子进程中执行生成器 target(*args)，元素产出后立即返回给调用方
+
+        占用一个并发名额直到生成器结束；调用方提前停止迭代时子进程被杀掉。
+        元素通过管道 pickle 传回，应是页文本这类小对象
+
+        Raises:
+            与 run() 相同
+        """
+        async with self.semaphore:
+            items = self._stream(target, args, timeout or self.timeout_seconds)
+            try:
+                async for item in items:
+                    yield item
+            finally:
+                # 提前停止迭代时立即关闭内层生成器（杀掉子进程），不等垃圾回收
+                await items.aclose()
+
+    async def _stream(self, target, args, timeout: float) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=_run_stream_job,
+            args=(target, args, self.max_rss_bytes, self.max_address_space, sender),
+            daemon=True,
+        )
+        try:
+            await asyncio.to_thread(process.start)
+            sender.close()
+            self._running.add(process)
+
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0 or not await asyncio.to_thread(receiver.poll, remaining):
+                    raise ParseTimeoutError(f"Document parsing timed out after {timeout:.0f}s")
+                try:
+                    status, value, message = await asyncio.to_thread(receiver.recv)
+                except EOFError:
+                    # 子进程没有发送结束消息就退出了（被看门狗杀掉或崩溃）
+                    await asyncio.to_thread(process.join)
+                    raise self._exit_error(process)
+
+                if status == "item":
+                    yield value
+                elif status == "ok":
+                    return
+                else:
+                    raise _job_error(value, message)
+        finally:
+            self._cleanup(process, sender, receiver)
+
+    def _exit_error(self, process: multiprocessing.Process) -> DocumentParseError:
+        """子进程没有返回结果时的错误"""
+        if process.exitcode == MEMORY_EXIT_CODE:
+            return ParseMemoryError(
+                f"Document parsing exceeded {self.max_rss_bytes // (1024 * 1024)}MB of memory"
+            )
+        return DocumentParseError(f"Parser process exited with code {process.exitcode}")
+
+    def _cleanup(self, process: multiprocessing.Process, sender, receiver):
+        if process.is_alive():
+            # 超时或调用方被取消时也不留下孤儿进程
+            process.kill()
+            process.join(1)
+        self._running.discard(process)
+        sender.close()
+        receiver.close()
+
+    async def stop(self):
+        """杀掉仍在运行的解析进程（应用关闭时调用）"""
+        for process in list(self._running):
+            if process.is_alive():
+                process.kill()
+        self._running.clear()
+
+
+def _job_error(error_type: Optional[str], message: Optional[str]) -> Exception:
+    """把子进程报告的异常还原为父进程中的异常"""
+    if error_type == "ValueError":
+        return ValueError(message)
+    if error_type == "ImportError":
+        return ImportError(message)
+    return DocumentParseError(f"{error_type}: {message}")
+
+
+def _receive(receiver) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """读取子进程的状态消息（进程异常退出时没有消息）"""
+    try:
+        if receiver.poll():
+            return receiver.recv()
+    except (EOFError, OSError):
+        pass
+    return None, None, None
+
+
+def _read_result(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Singleton instance
+parse_executor = ParseExecutor(
+    max_workers=settings.DOCUMENT_PARSE_WORKERS,
+    timeout_seconds=settings.DOCUMENT_PARSE_TIMEOUT_SECONDS,
+    max_rss_mb=settings.DOCUMENT_PARSE_MAX_RSS_MB,
+    max_address_space_mb=settings.DOCUMENT_PARSE_MAX_ADDRESS_SPACE_MB,
+)
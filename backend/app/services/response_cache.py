@@ -0,0 +1,327 @@
+"""
+Response Cache - 公开接口的响应缓存（stale-while-revalidate）
+
+广场列表、帖子列表和公开课程详情对所有访客都一样，却占了大部分读流量，
+每次请求都要查 Postgres。这里按规范化后的查询参数缓存响应：
+- fresh_ttl 内直接返回
+- 过期但未超过 stale_ttl：先返回旧结果，后台刷新一次（single-flight，
+  进程内按 key 去重，Redis 后端再用 SET NX 锁跨进程去重）
+- 缓存未命中：同一个 key 的并发请求只查一次库
+- 失效：按命名空间递增版本号（square / course:{id}），旧版本条目自然过期；
+  Course / Post 的写入提交后自动失效
+
+后端：
+- MemoryResponseBackend: 进程内 LRU（单实例部署）
+- RedisResponseBackend: REDIS_URL（Upstash 填 rediss:// 连接串），多实例共享
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.supabase_db import AsyncSessionLocal
+from app.models.course import Course
+from app.models.post import Post
+
+
+logger = logging.getLogger(__name__)
+
+
+# 广场列表（课程 + 帖子）的命名空间
+SQUARE = "square"
+
+# 计算函数：用给定的数据库会话生成响应（None 表示不可缓存的结果，也会被缓存为 None）
+Compute = Callable[[AsyncSession], Awaitable[Any]]
+
+# (stored_at, payload)
+CacheEntry = Tuple[float, Any]
+
+
+def course_namespace(course_id: int) -> str:
+    return f"course:{course_id}"
+
+
+class ResponseCacheBackend:
+    """响应缓存后端接口"""
+
+    async def version(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    async def bump(self, namespace: str):
+        raise NotImplementedError
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CacheEntry, ttl_seconds: float):
+        raise NotImplementedError
+
+    async def acquire_refresh(self, key: str, ttl_seconds: float) -> bool:
+        """跨进程的刷新锁（进程内已由 single-flight 去重）"""
+        return True
+
+
+class MemoryResponseBackend(ResponseCacheBackend):
+    """进程内 LRU"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    async def bump(self, namespace: str):
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, ttl_seconds: float):
+        self._entries[key] = (time.time() + ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisResponseBackend(ResponseCacheBackend):
+    """Redis 共享缓存"""
+
+    def __init__(self, url: str, prefix: str = "rc"):
+        self.url = url
+        self.prefix = prefix
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    async def version(self, namespace: str) -> int:
+        value = await self.redis.get(f"{self.prefix}:ver:{namespace}")
+        return int(value) if value is not None else 0
+
+    async def bump(self, namespace: str):
+        await self.redis.incr(f"{self.prefix}:ver:{namespace}")
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raw = await self.redis.get(f"{self.prefix}:{key}")
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return data["t"], data["p"]
+
+    async def set(self, key: str, entry: CacheEntry, ttl_seconds: float):
+        stored_at, payload = entry
+        await self.redis.set(
+            f"{self.prefix}:{key}",
+            json.dumps({"t": stored_at, "p": payload}, ensure_ascii=False, separators=(",", ":")),
+            ex=max(1, int(ttl_seconds))
+        )
+
+    async def acquire_refresh(self, key: str, ttl_seconds: float) -> bool:
+        return bool(await self.redis.set(
+            f"{self.prefix}:lock:{key}", "1", nx=True, ex=max(1, int(ttl_seconds))
+        ))
+
+
+class ResponseCache:
+    """按命名空间 + 规范化查询参数缓存 JSON 响应"""
+
+    # 后台刷新锁的有效期（秒）
+    REFRESH_LOCK_SECONDS = 30
+
+    def __init__(self, backend: ResponseCacheBackend, fresh_ttl: float = 10.0, stale_ttl: float = 60.0):
+        """
+        Args:
+            backend: 缓存后端
+            fresh_ttl: 新鲜期（秒），期内直接返回
+            stale_ttl: 最长保留时间（秒），新鲜期之后、此时间之前返回旧结果并后台刷新
+        """
+        self.backend = backend
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = max(stale_ttl, fresh_ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _key(namespace: str, version: int, params: Dict[str, Any]) -> str:
+        normalized = json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+        return f"{namespace}:v{version}:{digest}"
+
+    @staticmethod
+    def _serialize(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode="json", exclude_unset=True)
+        return value
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        compute: Compute,
+        db: AsyncSession,
+    ) -> Any:
+        """
+        返回缓存的响应（JSON 数据），未命中时用当前请求的会话计算
+
+        Args:
+            namespace: 失效命名空间（SQUARE / course_namespace(id)）
+            params: 规范化后的查询参数
+            compute: 生成响应的函数；抛出的异常（如 HTTPException）不会被缓存
+            db: 当前请求的数据库会话
+
+        Returns:
+            JSON 数据（BaseModel 已转为 dict），或 compute 返回的 None
+        """
+        try:
+            version = await self.backend.version(namespace)
+            key = self._key(namespace, version, params)
+            entry = await self.backend.get(key)
+        except Exception as e:
+            # 缓存不可用时直接查库
+            logger.warning(f"Response cache unavailable: {e}")
+            return self._serialize(await compute(db))
+
+        if entry is not None:
+            stored_at, payload = entry
+            if time.time() - stored_at > self.fresh_ttl:
+                self._refresh_in_background(key, compute)
+            return payload
+
+        return await self._single_flight(key, lambda: compute(db))
+
+    async def _single_flight(self, key: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = self._serialize(await run())
+            await self._store(key, payload)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待方时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _store(self, key: str, payload: Any):
+        try:
+            await self.backend.set(key, (time.time(), payload), self.stale_ttl)
+        except Exception as e:
+            logger.warning(f"Failed to store cached response {key}: {e}")
+
+    def _refresh_in_background(self, key: str, compute: Compute):
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                if not await self.backend.acquire_refresh(key, self.REFRESH_LOCK_SECONDS):
+                    return
+                # 请求的会话在响应返回后就会关闭：后台刷新使用独立会话
+                async with AsyncSessionLocal() as db:
+                    await self._single_flight(key, lambda: compute(db))
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+
+        task = asyncio.create_task(refresh(), name=f"response-cache-refresh-{key}")
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def invalidate(self, *namespaces: str):
+        """递增命名空间版本号，使其下的全部条目失效"""
+        for namespace in namespaces:
+            try:
+                await self.backend.bump(namespace)
+            except Exception as e:
+                logger.error(f"Failed to invalidate response cache {namespace}: {e}")
+
+    async def stop(self):
+        """取消进行中的后台刷新，等待已提交写入的失效完成（应用关闭时调用）"""
+        for task in list(self._refreshing):
+            task.cancel()
+        await asyncio.gather(*self._refreshing, *_invalidations, return_exceptions=True)
+
+
+def _create_backend() -> ResponseCacheBackend:
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisResponseBackend(settings.REDIS_URL)
+    return MemoryResponseBackend(max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+# Singleton instance
+response_cache = ResponseCache(
+    _create_backend(),
+    fresh_ttl=settings.RESPONSE_CACHE_FRESH_SECONDS,
+    stale_ttl=settings.RESPONSE_CACHE_STALE_SECONDS,
+)
+
+
+# ----------------------------------------------------------------------
+# 写入时失效：课程 / 帖子的发布、下架、修改、删除提交后清除相关缓存
+# ----------------------------------------------------------------------
+
+# 进行中的失效任务（持有引用，避免任务在完成前被垃圾回收）
+_invalidations: Set[asyncio.Task] = set()
+
+@event.listens_for(Session, "after_flush")
+def _record_invalidations(session: Session, flush_context):
+    namespaces: Set[str] = session.info.setdefault("response_cache_namespaces", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Course):
+            namespaces.add(SQUARE)
+            if obj.id is not None:
+                namespaces.add(course_namespace(obj.id))
+        elif isinstance(obj, Post):
+            namespaces.add(SQUARE)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session):
+    namespaces = session.info.pop("response_cache_namespaces", None)
+    if not namespaces:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # 不在事件循环中（同步脚本）：依赖 TTL 过期
+        return
+    task = loop.create_task(response_cache.invalidate(*namespaces))
+    _invalidations.add(task)
+    task.add_done_callback(_invalidations.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session):
+    session.info.pop("response_cache_namespaces", None)
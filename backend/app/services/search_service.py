@@ -0,0 +1,320 @@
+"""
+Search Service - 广场课程搜索
+
+原先的 `title ILIKE '%term%' OR description ILIKE '%term%'` 无法使用 B-tree 索引，
+每次搜索都是全表扫描，中文也没有任何分词。这里提供两种后端：
+- postgres: courses.search_vector（title 权重 A + description 权重 B 的生成列，GIN 索引）
+  匹配英文词，pg_trgm GIN 索引服务 ILIKE 子串匹配（中文），按 ts_rank + word_similarity 排序
+- memory: 进程内倒排索引，中文按二元组（bigram）切分，BM25 打分；
+  适用于数据库没有 pg_trgm 的部署
+
+两种后端都返回 (过滤条件, 相关度表达式)，分类筛选、其他排序和分页照常叠加。
+memory 后端在会话提交时按被写入的课程增量更新（发布 / 修改 / 下架 / 删除），
+并定期全量重建以同步其他进程的写入。
+"""
+import asyncio
+import logging
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, event, false, func, inspect, literal, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.core.supabase_db import AsyncSessionLocal
+from app.models.course import Course
+
+
+logger = logging.getLogger(__name__)
+
+
+# CJK 统一表意文字（含扩展 A）与兼容表意文字
+_CJK = "㐀-鿿豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W{_CJK}_]+")
+
+
+def _is_cjk(ch: str) -> bool:
+    return "㐀" <= ch <= "鿿" or "豈" <= ch <= "﫿"
+
+
+def tokenize(text: Optional[str], query: bool = False) -> List[str]:
+    """
+    切分为检索词：连续的中文按二元组切分，其他文字按词切分（小写）
+
+    建索引时中文额外保留单字，以便单字查询也能命中；
+    查询时（query=True）两字以上的中文只使用二元组。
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_RE.findall((text or "").lower()):
+        if not _is_cjk(run[0]):
+            tokens.append(run)
+            continue
+        if len(run) == 1:
+            tokens.append(run)
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        if not query:
+            tokens.extend(run)
+    return tokens
+
+
+class InvertedIndex:
+    """带字段权重的倒排索引（BM25 打分）"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # token -> {doc_id: 加权词频}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        # doc_id -> 该文档的 token 列表（删除时用）
+        self._doc_tokens: Dict[int, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def upsert(self, doc_id: int, fields: Sequence[Tuple[Optional[str], float]]):
+        """
+        写入（或替换）一个文档
+
+        Args:
+            doc_id: 文档ID
+            fields: [(文本, 权重)]，如 [(title, 2.0), (description, 1.0)]
+        """
+        self.remove(doc_id)
+
+        frequencies: Dict[str, float] = defaultdict(float)
+        length = 0.0
+        for text, weight in fields:
+            for token in tokenize(text):
+                frequencies[token] += weight
+                length += weight
+
+        for token, frequency in frequencies.items():
+            self._postings[token][doc_id] = frequency
+        self._doc_tokens[doc_id] = tuple(frequencies)
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int):
+        tokens = self._doc_tokens.pop(doc_id, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        返回包含全部查询词的文档，按 BM25 得分降序
+
+        Returns:
+            [(doc_id, score)]
+        """
+        terms = list(dict.fromkeys(tokenize(query, query=True)))
+        if not terms or not self._doc_lengths:
+            return []
+
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+
+        # 从最短的倒排表开始求交集
+        candidates = set(min(postings, key=len))
+        for entry in postings:
+            candidates.intersection_update(entry)
+            if not candidates:
+                return []
+
+        total_docs = len(self._doc_lengths)
+        average_length = self._total_length / total_docs or 1.0
+        scores = []
+        for doc_id in candidates:
+            norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+            score = 0.0
+            for entry in postings:
+                idf = math.log(1 + (total_docs - len(entry) + 0.5) / (len(entry) + 0.5))
+                frequency = entry[doc_id]
+                score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append((doc_id, score))
+
+        scores.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        return scores[:limit] if limit else scores
+
+
+class CourseSearch:
+    """广场课程搜索（postgres 全文 / 三元组索引，或进程内倒排索引）"""
+
+    TITLE_WEIGHT = 2.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    def __init__(self, backend: str = "postgres", max_results: int = 1000, rebuild_interval: float = 300.0):
+        """
+        Args:
+            backend: postgres / memory
+            max_results: memory 后端单次搜索返回的最大结果数
+            rebuild_interval: memory 后端全量重建间隔（秒）
+        """
+        self.backend = backend
+        self.max_results = max_results
+        self.rebuild_interval = rebuild_interval
+        self._index: Optional[InvertedIndex] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def uses_memory_index(self) -> bool:
+        return self.backend == "memory" and self._index is not None
+
+    def clause(self, term: str) -> Tuple[ColumnElement, ColumnElement]:
+        """
+        构建搜索条件与相关度表达式（查询需包含 Course 表）
+
+        Returns:
+            (where 条件, 相关度表达式)
+        """
+        term = term.strip()
+        if self.uses_memory_index:
+            return self._memory_clause(term)
+        return self._postgres_clause(term)
+
+    @staticmethod
+    def _postgres_clause(term: str) -> Tuple[ColumnElement, ColumnElement]:
+        query = func.plainto_tsquery("simple", term)
+        pattern = f"%{term}%"
+        condition = or_(
+            Course.search_vector.op("@@")(query),
+            Course.title.ilike(pattern),
+            Course.description.ilike(pattern),
+        )
+        rank = (
+            func.ts_rank(Course.search_vector, query)
+            + func.word_similarity(term, Course.title) * 2
+            + func.word_similarity(term, func.coalesce(Course.description, ""))
+        )
+        return condition, rank
+
+    def _memory_clause(self, term: str) -> Tuple[ColumnElement, ColumnElement]:
+        scores = dict(self._index.search(term, limit=self.max_results))
+        if not scores:
+            return false(), literal(0.0)
+        return Course.id.in_(list(scores)), case(scores, value=Course.id, else_=0.0)
+
+    # ------------------------------------------------------------------
+    # memory 后端：索引维护
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def is_searchable(is_public: bool, status: str) -> bool:
+        return bool(is_public) and status == "completed"
+
+    def apply(self, course_id: int, snapshot: Optional[Dict]):
+        """按课程快照增量更新索引（snapshot 为 None 或不可搜索时移除）"""
+        if self._index is None:
+            return
+        if snapshot is None or not self.is_searchable(snapshot["is_public"], snapshot["status"]):
+            self._index.remove(course_id)
+            return
+        self._index.upsert(course_id, [
+            (snapshot["title"], self.TITLE_WEIGHT),
+            (snapshot["description"], self.DESCRIPTION_WEIGHT),
+        ])
+
+    async def rebuild(self) -> int:
+        """从数据库全量重建索引（构建完成后整体替换）"""
+        index = InvertedIndex()
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(Course.id, Course.title, Course.description).where(
+                    Course.is_public == True,
+                    Course.status == "completed"
+                )
+            )
+            async for course_id, title, description in result:
+                index.upsert(course_id, [
+                    (title, self.TITLE_WEIGHT),
+                    (description, self.DESCRIPTION_WEIGHT),
+                ])
+
+        self._index = index
+        logger.info(f"Search index rebuilt: {len(index)} course(s)")
+        return len(index)
+
+    async def start(self):
+        """memory 后端：构建索引并启动定期重建（需在事件循环中调用）"""
+        if self.backend != "memory":
+            return
+        try:
+            await self.rebuild()
+        except Exception as e:
+            # 索引不可用时 clause() 退回 postgres 查询
+            logger.error(f"Search index build failed: {e}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._rebuild_loop(), name="search-index-rebuilder")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _rebuild_loop(self):
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Search index rebuild failed: {e}")
+
+
+# Singleton instance
+course_search = CourseSearch(
+    backend=settings.SEARCH_BACKEND,
+    max_results=settings.SEARCH_MAX_RESULTS,
+    rebuild_interval=settings.SEARCH_REBUILD_SECONDS,
+)
+
+
+# ----------------------------------------------------------------------
+# 增量更新：flush 时记录课程快照，提交后写入索引
+# ----------------------------------------------------------------------
+
+_SNAPSHOT_FIELDS = ("title", "description", "is_public", "status")
+
+
+@event.listens_for(Session, "after_flush")
+def _record_course_changes(session: Session, flush_context):
+    if not course_search.uses_memory_index:
+        return
+    changes: Dict[int, Optional[Dict]] = session.info.setdefault("search_index_changes", {})
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, Course):
+            continue
+        # 只读取已加载的属性，避免在同步事件中触发延迟加载
+        loaded = inspect(obj).dict
+        if loaded.get("id") is None or not all(field in loaded for field in _SNAPSHOT_FIELDS):
+            continue
+        changes[loaded["id"]] = {field: loaded[field] for field in _SNAPSHOT_FIELDS}
+    for obj in session.deleted:
+        if isinstance(obj, Course):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_course_changes(session: Session):
+    changes = session.info.pop("search_index_changes", None)
+    if changes:
+        for course_id, snapshot in changes.items():
+            course_search.apply(course_id, snapshot)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_course_changes(session: Session):
+    session.info.pop("search_index_changes", None)
@@ -0,0 +1,625 @@
+"""
+Storage Backends - 异步流式对象存储
+
+原先的上传 / 下载都直接调用同步的 supabase-py storage 客户端，并把整个文件读进内存：
+每次调用都阻塞事件循环，几个并发的 50MB PDF 就能把 512MB 的机器撑爆。
+这里定义统一的异步接口，数据按块流动：
+- put(): 从异步块迭代器写入；大文件走分片上传（Supabase TUS / S3 multipart），
+  内存中最多只有一个分片
+- stream(): 按块读取
+- 共享连接池（httpx.AsyncClient / boto3 连接池）
+
+实现：
+- supabase: Storage REST API（httpx）
+- s3 / r2: boto3（调用放到工作线程）；逻辑 bucket 作为对象键前缀
+- local: 本地文件系统（aiofiles），由 /static 提供访问
+"""
+import asyncio
+import base64
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional
+
+import aiofiles
+import httpx
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# 流式读写的块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageError(Exception):
+    """存储操作失败（status_code 沿用 HTTP 语义：404 不存在、413 过大等）"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# ----------------------------------------------------------------------
+# 块迭代工具
+# ----------------------------------------------------------------------
+
+async def iter_bytes(data: bytes, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+async def iter_upload(
+    file: UploadFile,
+    chunk_size: int = CHUNK_SIZE,
+    limit: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    按块读取上传文件（Starlette 已把大文件缓存在临时文件中）
+
+    Raises:
+        StorageError: 超过 limit 字节时（413）
+    """
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if limit is not None and total > limit:
+            raise StorageError(f"File exceeds {limit} bytes", status_code=413)
+        yield chunk
+
+
+async def iter_file(file: BinaryIO, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """按块读取本地文件对象（读取放到工作线程）"""
+    while True:
+        chunk = await asyncio.to_thread(file.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def rechunk(chunks: AsyncIterator[bytes], size: int) -> AsyncIterator[bytes]:
+    """把任意大小的块重新切成固定大小（最后一块可以更小）"""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def spool(chunks: AsyncIterator[bytes]) -> "tuple[BinaryIO, int]":
+    """
+    把未知长度的流写入临时文件（用于需要预先知道长度的上传协议）
+
+    Returns:
+        (已回到开头的临时文件, 总字节数)；调用方负责关闭
+    """
+    spooled = tempfile.TemporaryFile()
+    size = 0
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(spooled.write, chunk)
+            size += len(chunk)
+        spooled.seek(0)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled, size
+
+
+# ----------------------------------------------------------------------
+# 接口
+# ----------------------------------------------------------------------
+
+class StorageBackend:
+    """异步对象存储接口（路径相对于逻辑 bucket）"""
+
+    async def put(
+        self,
+        path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str = "application/octet-stream",
+        size: Optional[int] = None,
+        upsert: bool = False,
+        cache_seconds: int = 3600,
+    ) -> int:
+        """
+        写入对象
+
+        Args:
+            path: 对象路径
+            chunks: 内容块
+            content_type: MIME 类型
+            size: 总字节数（未知时传 None）
+            upsert: 已存在时是否覆盖
+            cache_seconds: 公开访问时的 Cache-Control max-age
+
+        Returns:
+            int: 写入的字节数
+        """
+        raise NotImplementedError
+
+    def stream(self, path: str) -> AsyncIterator[bytes]:
+        """按块读取对象（StorageError 404 表示不存在）"""
+        raise NotImplementedError
+
+    async def delete(self, paths: List[str]):
+        raise NotImplementedError
+
+    async def list(self, prefix: str) -> List[Dict]:
+        """列出前缀下的对象：[{"name": 相对前缀的名称, ...}]"""
+        raise NotImplementedError
+
+    def public_url(self, path: str) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# ----------------------------------------------------------------------
+# Supabase Storage（REST API）
+# ----------------------------------------------------------------------
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _shared_http_client() -> httpx.AsyncClient:
+    """所有 Supabase bucket 共用的连接池"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.STORAGE_TIMEOUT_SECONDS, connect=10.0),
+            limits=httpx.Limits(max_connections=settings.STORAGE_MAX_CONNECTIONS),
+        )
+    return _http_client
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage REST API"""
+
+    # Supabase 的 TUS 断点续传要求除最后一块外每块恰好 6MB
+    TUS_CHUNK_SIZE = 6 * 1024 * 1024
+
+    def __init__(self, url: str, service_key: str, bucket: str, multipart_threshold: int):
+        self.base_url = f"{url.rstrip('/')}/storage/v1"
+        self.bucket = bucket
+        self.multipart_threshold = multipart_threshold
+        self.headers = {
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return _shared_http_client()
+
+    @staticmethod
+    def _check(response: httpx.Response, action: str):
+        if response.status_code < 400:
+            return
+        try:
+            detail = response.json().get("message") or response.text
+        except ValueError:
+            detail = response.text
+        # Supabase 对不存在的对象返回 400 + "not found"
+        status_code = 404 if response.status_code == 404 or "not found" in detail.lower() else response.status_code
+        raise StorageError(f"{action} failed: {detail}", status_code=status_code)
+
+    async def put(
+        self, path, chunks, content_type="application/octet-stream",
+        size=None, upsert=False, cache_seconds=3600
+    ):
+        if size is not None and size <= self.multipart_threshold:
+            # 小文件：单次请求（内存中最多 multipart_threshold 字节）
+            data = b"".join([chunk async for chunk in chunks])
+            response = await self.client.post(
+                f"{self.base_url}/object/{self.bucket}/{path}",
+                content=data,
+                headers={
+                    **self.headers,
+                    "content-type": content_type,
+                    "cache-control": f"max-age={cache_seconds}",
+                    "x-upsert": "true" if upsert else "false",
+                },
+            )
+            self._check(response, "Upload")
+            return len(data)
+
+        spooled = None
+        if size is None:
+            # TUS 需要预先声明长度：先落到临时文件
+            spooled, size = await spool(chunks)
+            chunks = iter_file(spooled)
+        try:
+            return await self._put_resumable(path, chunks, content_type, size, upsert, cache_seconds)
+        finally:
+            if spooled is not None:
+                spooled.close()
+
+    async def _put_resumable(self, path, chunks, content_type, size, upsert, cache_seconds) -> int:
+        metadata = {
+            "bucketName": self.bucket,
+            "objectName": path,
+            "contentType": content_type,
+            "cacheControl": str(cache_seconds),
+        }
+        encoded = ",".join(
+            f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+            for key, value in metadata.items()
+        )
+        response = await self.client.post(
+            f"{self.base_url}/upload/resumable",
+            headers={
+                **self.headers,
+                "Tus-Resumable": "1.0.0",
+                "Upload-Length": str(size),
+                "Upload-Metadata": encoded,
+                "x-upsert": "true" if upsert else "false",
+            },
+        )
+        self._check(response, "Create upload")
+        location = response.headers["Location"]
+
+        offset = 0
+        async for block in rechunk(chunks, self.TUS_CHUNK_SIZE):
+            response = await self.client.patch(
+                location,
+                content=block,
+                headers={
+                    **self.headers,
+                    "Tus-Resumable": "1.0.0",
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                },
+            )
+            self._check(response, "Upload chunk")
+            offset += len(block)
+        return offset
+
+    async def stream(self, path: str) -> AsyncIterator[bytes]:
+        async with self.client.stream(
+            "GET", f"{self.base_url}/object/{self.bucket}/{path}", headers=self.headers
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                self._check(response, "Download")
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                yield chunk
+
+    async def delete(self, paths: List[str]):
+        response = await self.client.request(
+            "DELETE",
+            f"{self.base_url}/object/{self.bucket}",
+            json={"prefixes": paths},
+            headers=self.headers,
+        )
+        self._check(response, "Delete")
+
+    async def list(self, prefix: str) -> List[Dict]:
+        response = await self.client.post(
+            f"{self.base_url}/object/list/{self.bucket}",
+            json={"prefix": prefix, "limit": 1000, "offset": 0},
+            headers=self.headers,
+        )
+        self._check(response, "List")
+        return response.json()
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/object/public/{self.bucket}/{path}"
+
+
+# ----------------------------------------------------------------------
+# S3 / Cloudflare R2（boto3）
+# ----------------------------------------------------------------------
+
+class S3StorageBackend(StorageBackend):
+    """S3 兼容存储（逻辑 bucket 作为键前缀）"""
+
+    # S3 分片最小 5MB（最后一片除外）
+    PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str,
+        multipart_threshold: int,
+        endpoint_url: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.multipart_threshold = max(multipart_threshold, self.PART_SIZE)
+        self.public_base_url = (
+            public_base_url.rstrip("/") if public_base_url
+            else f"https://{bucket}.s3.{region}.amazonaws.com"
+        )
+        self._client_kwargs = {
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+            "region_name": region,
+            "endpoint_url": endpoint_url,
+        }
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+            self._client = boto3.client(
+                "s3",
+                config=Config(max_pool_connections=settings.STORAGE_MAX_CONNECTIONS),
+                **self._client_kwargs
+            )
+        return self._client
+
+    def _key(self, path: str) -> str:
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    async def put(
+        self, path, chunks, content_type="application/octet-stream",
+        size=None, upsert=False, cache_seconds=3600
+    ):
+        key = self._key(path)
+        if not upsert:
+            exists = await asyncio.to_thread(self._exists, key)
+            if exists:
+                raise StorageError(f"Object already exists: {path}", status_code=409)
+
+        if size is not None and size <= self.multipart_threshold:
+            data = b"".join([chunk async for chunk in chunks])
+            await asyncio.to_thread(
+                self.client.put_object,
+                Bucket=self.bucket, Key=key, Body=data, ContentType=content_type,
+                CacheControl=f"max-age={cache_seconds}"
+            )
+            return len(data)
+
+        upload = await asyncio.to_thread(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket, Key=key, ContentType=content_type,
+            CacheControl=f"max-age={cache_seconds}"
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+        total = 0
+        try:
+            async for number, block in _numbered(rechunk(chunks, self.PART_SIZE)):
+                result = await asyncio.to_thread(
+                    self.client.upload_part,
+                    Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=number, Body=block
+                )
+                parts.append({"PartNumber": number, "ETag": result["ETag"]})
+                total += len(block)
+            await asyncio.to_thread(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            try:
+                await asyncio.to_thread(
+                    self.client.abort_multipart_upload,
+                    Bucket=self.bucket, Key=key, UploadId=upload_id
+                )
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload {upload_id}: {e}")
+            raise
+        return total
+
+    def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    async def stream(self, path: str) -> AsyncIterator[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            response = await asyncio.to_thread(
+                self.client.get_object, Bucket=self.bucket, Key=self._key(path)
+            )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            raise StorageError(f"Download failed: {e}", status_code=404 if code in ("NoSuchKey", "404") else 500)
+
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, paths: List[str]):
+        if not paths:
+            return
+        await asyncio.to_thread(
+            self.client.delete_objects,
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": self._key(path)} for path in paths]}
+        )
+
+    async def list(self, prefix: str) -> List[Dict]:
+        key_prefix = self._key(prefix.strip("/")) + "/"
+        response = await asyncio.to_thread(
+            self.client.list_objects_v2, Bucket=self.bucket, Prefix=key_prefix
+        )
+        return [
+            {
+                "name": item["Key"][len(key_prefix):],
+                "size": item["Size"],
+                "updated_at": item["LastModified"].isoformat(),
+            }
+            for item in response.get("Contents", [])
+        ]
+
+    def public_url(self, path: str) -> str:
+        return f"{self.public_base_url}/{self._key(path)}"
+
+
+async def _numbered(chunks: AsyncIterator[bytes]):
+    number = 0
+    async for chunk in chunks:
+        number += 1
+        yield number, chunk
+
+
+# ----------------------------------------------------------------------
+# 本地文件系统
+# ----------------------------------------------------------------------
+
+class LocalStorageBackend(StorageBackend):
+    """本地文件系统（开发 / 单机部署），文件通过 /static 挂载访问"""
+
+    def __init__(self, root: str, bucket: str, base_url: str):
+        self.root = (Path(root) / bucket).resolve()
+        self.bucket = bucket
+        self.base_url = base_url.rstrip("/")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _resolve(self, path: str) -> Path:
+        full = (self.root / path).resolve()
+        if self.root not in full.parents:
+            raise StorageError(f"Invalid path: {path}", status_code=400)
+        return full
+
+    async def put(
+        self, path, chunks, content_type="application/octet-stream",
+        size=None, upsert=False, cache_seconds=3600
+    ):
+        target = self._resolve(path)
+        if not upsert and target.exists():
+            raise StorageError(f"Object already exists: {path}", status_code=409)
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+
+        # 先写临时文件再原子替换，读取方不会看到半个文件
+        partial = target.with_name(f".{target.name}.part")
+        total = 0
+        try:
+            async with aiofiles.open(partial, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    total += len(chunk)
+            await asyncio.to_thread(os.replace, partial, target)
+        except BaseException:
+            await asyncio.to_thread(partial.unlink, missing_ok=True)
+            raise
+        return total
+
+    async def stream(self, path: str) -> AsyncIterator[bytes]:
+        target = self._resolve(path)
+        if not target.is_file():
+            raise StorageError(f"File not found: {path}", status_code=404)
+        async with aiofiles.open(target, "rb") as f:
+            while True:
+                chunk = await f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    async def delete(self, paths: List[str]):
+        for path in paths:
+            await asyncio.to_thread(self._resolve(path).unlink, missing_ok=True)
+
+    async def list(self, prefix: str) -> List[Dict]:
+        folder = self._resolve(prefix.strip("/")) if prefix.strip("/") else self.root
+
+        def scan():
+            if not folder.is_dir():
+                return []
+            return [
+                {"name": entry.name, "size": entry.stat().st_size}
+                for entry in folder.iterdir()
+                if entry.is_file() and not entry.name.startswith(".")
+            ]
+
+        return await asyncio.to_thread(scan)
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{self.bucket}/{path}"
+
+
+# ----------------------------------------------------------------------
+# 工厂
+# ----------------------------------------------------------------------
+
+def storage_backend_name() -> str:
+    """STORAGE_BACKEND 显式指定，否则配置了 Supabase 即用 supabase，再按 R2 / S3 / 本地回退"""
+    if settings.STORAGE_BACKEND:
+        return settings.STORAGE_BACKEND
+    if settings.SUPABASE_URL and settings.SUPABASE_SERVICE_KEY:
+        return "supabase"
+    return settings.storage_backend
+
+
+_backends: Dict[str, StorageBackend] = {}
+
+
+def get_storage_backend(bucket: str) -> StorageBackend:
+    """按逻辑 bucket 获取存储后端（同一 bucket 共享实例）"""
+    backend = _backends.get(bucket)
+    if backend is not None:
+        return backend
+
+    name = storage_backend_name()
+    threshold = settings.STORAGE_MULTIPART_THRESHOLD_MB * 1024 * 1024
+    if name == "supabase":
+        backend = SupabaseStorageBackend(
+            settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY, bucket, threshold
+        )
+    elif name == "r2":
+        backend = S3StorageBackend(
+            bucket=settings.R2_BUCKET_NAME,
+            prefix=bucket,
+            access_key_id=settings.R2_ACCESS_KEY_ID,
+            secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+            region="auto",
+            multipart_threshold=threshold,
+            endpoint_url=f"https://{settings.R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
+            public_base_url=settings.R2_PUBLIC_URL or None,
+        )
+    elif name == "s3":
+        backend = S3StorageBackend(
+            bucket=settings.AWS_S3_BUCKET,
+            prefix=bucket,
+            access_key_id=settings.AWS_ACCESS_KEY_ID,
+            secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region=settings.AWS_REGION,
+            multipart_threshold=threshold,
+        )
+    else:
+        backend = LocalStorageBackend(
+            settings.LOCAL_STORAGE_DIR, bucket, settings.LOCAL_STORAGE_BASE_URL
+        )
+
+    _backends[bucket] = backend
+    return backend
+
+
+async def close_storage_backends():
+    """关闭连接池（应用关闭时调用）"""
+    global _http_client
+    for backend in _backends.values():
+        await backend.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -1,28 +1,43 @@
 """
-Supabase Storage Service
+Storage Service
 
-Provides file upload/download functionality using Supabase Storage.
+Provides file upload/download functionality on top of the configured
+storage backend (Supabase Storage, S3/R2 or local disk). Content is
+streamed in chunks in both directions; see app/services/storage_backends.py.
 """
-from typing import BinaryIO, Optional, Dict, List
+from typing import AsyncIterator, BinaryIO, Optional, Dict, List
 from fastapi import HTTPException, status, UploadFile
-from supabase import create_client, Client
 from pathlib import Path
+import asyncio
 import uuid
-from datetime import datetime
+from urllib.parse import unquote
 
 from app.core.config import settings
+from app.services.storage_backends import (
+    StorageBackend,
+    StorageError,
+    get_storage_backend,
+    iter_bytes,
+    iter_upload,
+)
 
 
 class StorageService:
-    """Supabase Storage service for file management"""
+    """Storage service for file management"""
 
     def __init__(self):
-        self.supabase: Client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_KEY
-        )
         self.bucket_name = settings.SUPABASE_BUCKET_NAME
 
+    @property
+    def backend(self) -> StorageBackend:
+        """Storage backend for this bucket, created on first use"""
+        return get_storage_backend(self.bucket_name)
+
+    @staticmethod
+    def _generate_path(filename: str, user_id: int, folder: str) -> str:
+        file_ext = Path(filename).suffix
+        return f"{folder}/user_{user_id}/{uuid.uuid4()}{file_ext}"
+
     async def upload_file(
         self,
         file: UploadFile,
@@ -30,7 +45,7 @@ class StorageService:
         folder: str = "documents"
     ) -> Dict[str, str]:
         """
-        Upload file to Supabase Storage
+        Upload file to storage, streaming it in chunks
 
         Args:
             file: File to upload
@@ -40,39 +55,20 @@ class StorageService:
         Returns:
             Dictionary with file_path and public_url
         """
-        try:
-            # Generate unique filename
-            file_ext = Path(file.filename).suffix
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            file_path = f"{folder}/user_{user_id}/{unique_filename}"
-
-            # Read file content
-            content = await file.read()
-
-            # Upload to Supabase Storage
-            response = self.supabase.storage.from_(self.bucket_name).upload(
-                file_path,
-                content,
-                file_options={
-                    "content-type": file.content_type or "application/octet-stream"
-                }
-            )
-
-            # Get public URL
-            public_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
-
-            return {
-                "file_path": file_path,
-                "public_url": public_url,
-                "filename": file.filename,
-                "size": len(content)
-            }
+        file_path = self._generate_path(file.filename, user_id, folder)
+        size = await self.upload_stream(
+            file_path,
+            iter_upload(file),
+            content_type=file.content_type or "application/octet-stream",
+            size=file.size
+        )
 
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"File upload failed: {str(e)}"
-            )
+        return {
+            "file_path": file_path,
+            "public_url": self.get_public_url(file_path),
+            "filename": file.filename,
+            "size": size
+        }
 
     async def upload_bytes(
         self,
@@ -95,38 +91,71 @@ class StorageService:
         Returns:
             Dictionary with file_path and public_url
         """
-        try:
-            # Generate unique filename
-            file_ext = Path(filename).suffix
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            file_path = f"{folder}/user_{user_id}/{unique_filename}"
-
-            # Upload to Supabase Storage
-            response = self.supabase.storage.from_(self.bucket_name).upload(
-                file_path,
-                content,
-                file_options={"content-type": content_type}
-            )
+        file_path = self._generate_path(filename, user_id, folder)
+        await self.upload_stream(file_path, iter_bytes(content), content_type, size=len(content))
 
-            # Get public URL
-            public_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
+        return {
+            "file_path": file_path,
+            "public_url": self.get_public_url(file_path),
+            "filename": filename,
+            "size": len(content)
+        }
 
-            return {
-                "file_path": file_path,
-                "public_url": public_url,
-                "filename": filename,
-                "size": len(content)
-            }
+    async def upload_stream(
+        self,
+        file_path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str = "application/octet-stream",
+        size: Optional[int] = None
+    ) -> int:
+        """
+        Upload a stream of chunks to the given path
 
+        Args:
+            file_path: Destination path in storage
+            chunks: Content chunks
+            content_type: MIME type
+            size: Total size in bytes if known (None spools large uploads)
+
+        Returns:
+            Number of bytes written
+        """
+        try:
+            return await self.backend.put(file_path, chunks, content_type, size=size)
+        except StorageError as e:
+            raise HTTPException(
+                status_code=e.status_code if e.status_code < 500 else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"File upload failed: {str(e)}"
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"File upload failed: {str(e)}"
             )
 
+    async def stream_file(self, file_path: str) -> AsyncIterator[bytes]:
+        """
+        Stream file content from storage in chunks
+
+        Args:
+            file_path: Path to file in storage
+
+        Yields:
+            Content chunks
+        """
+        try:
+            async for chunk in self.backend.stream(file_path):
+                yield chunk
+        except StorageError as e:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND if e.status_code == 404 else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"File download failed: {str(e)}"
+            )
+
     async def download_file(self, file_path: str) -> bytes:
         """
-        Download file from Supabase Storage
+        Download file from storage into memory (small files only;
+        use stream_file / download_to for large ones)
 
         Args:
             file_path: Path to file in storage
@@ -134,19 +163,30 @@ class StorageService:
         Returns:
             File content as bytes
         """
-        try:
-            content = self.supabase.storage.from_(self.bucket_name).download(file_path)
-            return content
+        chunks = [chunk async for chunk in self.stream_file(file_path)]
+        return b"".join(chunks)
 
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"File not found: {str(e)}"
-            )
+    async def download_to(self, file_path: str, destination: BinaryIO) -> int:
+        """
+        Stream a file from storage into a local file object
+
+        Args:
+            file_path: Path to file in storage
+            destination: Writable binary file object
+
+        Returns:
+            Number of bytes written
+        """
+        size = 0
+        async for chunk in self.stream_file(file_path):
+            await asyncio.to_thread(destination.write, chunk)
+            size += len(chunk)
+        await asyncio.to_thread(destination.flush)
+        return size
 
     async def delete_file(self, file_path: str) -> bool:
         """
-        Delete file from Supabase Storage
+        Delete file from storage
 
         Args:
             file_path: Path to file in storage
@@ -155,7 +195,7 @@ class StorageService:
             True if successful
         """
         try:
-            self.supabase.storage.from_(self.bucket_name).remove([file_path])
+            await self.backend.delete([file_path])
             return True
 
         except Exception as e:
@@ -176,12 +216,12 @@ class StorageService:
         """
         try:
             # List all files in folder
-            files = self.supabase.storage.from_(self.bucket_name).list(folder_path)
+            files = await self.backend.list(folder_path)
 
             if files:
                 # Delete all files
                 file_paths = [f"{folder_path}/{file['name']}" for file in files]
-                self.supabase.storage.from_(self.bucket_name).remove(file_paths)
+                await self.backend.delete(file_paths)
 
             return True
 
@@ -202,8 +242,7 @@ class StorageService:
             List of file metadata
         """
         try:
-            files = self.supabase.storage.from_(self.bucket_name).list(folder_path)
-            return files
+            return await self.backend.list(folder_path)
 
         except Exception as e:
             raise HTTPException(
@@ -221,7 +260,28 @@ class StorageService:
         Returns:
             Public URL
         """
-        return self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
+        return self.backend.public_url(file_path)
+
+    def path_from_url(self, public_url: Optional[str]) -> Optional[str]:
+        """
+        Recover the storage path from a public URL
+
+        Documents uploaded before file_path was recorded only have file_url.
+
+        Args:
+            public_url: Public URL produced by get_public_url()
+
+        Returns:
+            Path in storage, or None if the URL does not belong to this bucket
+        """
+        if not public_url:
+            return None
+        prefix = self.get_public_url("")
+        # Older Supabase client URLs may carry an empty/download query string
+        url = public_url.split("?", 1)[0]
+        if not url.startswith(prefix) or len(url) == len(prefix):
+            return None
+        return unquote(url[len(prefix):])
 
 
 # Global storage service instance
@@ -0,0 +1,88 @@
+"""
+Stream Coalescer - 合并上游 token 流
+
+上游每个 delta 只有几个字符，逐个 JSON 编码并发送 SSE 帧会产生数万个小帧。
+这里按时间窗口和字节数把 token 合并成较大的文本块再交给下游。
+"""
+import asyncio
+from typing import AsyncIterator
+
+from app.core.config import settings
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterator[str],
+    window_ms: int = settings.SSE_COALESCE_WINDOW_MS,
+    max_bytes: int = settings.SSE_COALESCE_MAX_BYTES,
+) -> AsyncIterator[str]:
+    """
+    合并 token 流
+
+    满足任一条件即输出一个文本块：
+    - 缓冲区第一个 token 到达后已超过 window_ms
+    - 缓冲区累计超过 max_bytes（UTF-8 字节）
+    - 上游结束或出错（出错时先输出已缓冲内容再抛出异常）
+
+    Args:
+        tokens: 上游 token 异步迭代器
+        window_ms: 时间窗口（毫秒），<= 0 时不合并
+        max_bytes: 单块最大字节数
+
+    Yields:
+        合并后的文本块
+    """
+    if window_ms <= 0:
+        async for token in tokens:
+            yield token
+        return
+
+    loop = asyncio.get_running_loop()
+    window = window_ms / 1000
+    iterator = tokens.__aiter__()
+
+    buffer = []
+    buffered_bytes = 0
+    deadline = 0.0
+    pending = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if not done:
+                # 时间窗口到期，先把已缓冲的内容发出去
+                yield "".join(buffer)
+                buffer = []
+                buffered_bytes = 0
+                continue
+
+            future, pending = pending, None
+            try:
+                token = future.result()
+            except StopAsyncIteration:
+                break
+            except Exception:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer = []
+                raise
+
+            if not buffer:
+                deadline = loop.time() + window
+            buffer.append(token)
+            buffered_bytes += len(token.encode("utf-8"))
+
+            if buffered_bytes >= max_bytes:
+                yield "".join(buffer)
+                buffer = []
+                buffered_bytes = 0
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+    if buffer:
+        yield "".join(buffer)
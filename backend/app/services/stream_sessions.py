@@ -0,0 +1,330 @@
+"""
+Stream Sessions - 可断点重连的 SSE 生成流
+
+客户端断开（移动网络切换、标签页休眠）后生成流就丢了，积分却已经扣除，
+用户只能刷新页面再付费生成一次。这里把生成和客户端连接解耦：
+- 每次生成分配一个 stream_id，生成在后台任务中进行，客户端断开不影响生成
+- 每个 SSE 事件按顺序编号（id: N），写入有界的重放缓冲区
+- 客户端带 Last-Event-ID 重连时，从缓冲区补发之后的事件，再跟随实时事件
+
+缓冲区后端可替换：
+- MemoryReplayBackend: 进程内（单实例部署）
+- RedisReplayBackend: Redis Streams（多实例部署，任意实例都能接管重连）
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# (event_id, SSE frame)
+ReplayEvent = Tuple[int, str]
+
+
+class ReplayBackend:
+    """重放缓冲区后端接口"""
+
+    async def create(self, stream_id: str, owner_id: int):
+        raise NotImplementedError
+
+    async def owner(self, stream_id: str) -> Optional[int]:
+        """返回流的所有者，流不存在（或已过期）时返回 None"""
+        raise NotImplementedError
+
+    async def append(self, stream_id: str, event_id: int, frame: str):
+        raise NotImplementedError
+
+    async def finish(self, stream_id: str):
+        raise NotImplementedError
+
+    async def read(
+        self,
+        stream_id: str,
+        after: int,
+        timeout: float
+    ) -> Tuple[List[ReplayEvent], bool]:
+        """
+        读取 event_id > after 的事件，没有新事件时最多等待 timeout 秒
+
+        Returns:
+            (events, finished): finished 表示生成已结束
+        """
+        raise NotImplementedError
+
+
+class _MemoryStream:
+    def __init__(self, owner_id: int):
+        self.owner_id = owner_id
+        self.events: Deque[ReplayEvent] = deque()
+        self.size = 0
+        self.last_id = 0
+        self.finished_at: Optional[float] = None
+        self.changed = asyncio.Condition()
+
+
+class MemoryReplayBackend(ReplayBackend):
+    """进程内重放缓冲区（按字节数限制每个流，按 TTL 回收已结束的流）"""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, max_streams: int = 1000):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[str, _MemoryStream]" = OrderedDict()
+
+    def _evict(self):
+        now = time.monotonic()
+        for stream_id, stream in list(self._streams.items()):
+            expired = stream.finished_at is not None and now - stream.finished_at > self.ttl_seconds
+            if expired or (len(self._streams) > self.max_streams and stream.finished_at is not None):
+                del self._streams[stream_id]
+
+    async def create(self, stream_id: str, owner_id: int):
+        self._evict()
+        self._streams[stream_id] = _MemoryStream(owner_id)
+
+    async def owner(self, stream_id: str) -> Optional[int]:
+        stream = self._streams.get(stream_id)
+        return stream.owner_id if stream else None
+
+    async def append(self, stream_id: str, event_id: int, frame: str):
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return
+        async with stream.changed:
+            stream.events.append((event_id, frame))
+            stream.size += len(frame)
+            stream.last_id = event_id
+            # 超出上限时丢弃最早的事件（过旧的 Last-Event-ID 将无法完整补发）
+            while stream.size > self.max_bytes and len(stream.events) > 1:
+                _, dropped = stream.events.popleft()
+                stream.size -= len(dropped)
+            stream.changed.notify_all()
+
+    async def finish(self, stream_id: str):
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return
+        async with stream.changed:
+            stream.finished_at = time.monotonic()
+            stream.changed.notify_all()
+
+    async def read(
+        self,
+        stream_id: str,
+        after: int,
+        timeout: float
+    ) -> Tuple[List[ReplayEvent], bool]:
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return [], True
+
+        async with stream.changed:
+            try:
+                await asyncio.wait_for(
+                    stream.changed.wait_for(
+                        lambda: stream.last_id > after or stream.finished_at is not None
+                    ),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+            events = [event for event in stream.events if event[0] > after]
+            return events, stream.finished_at is not None
+
+
+class RedisReplayBackend(ReplayBackend):
+    """
+    基于 Redis Streams 的共享重放缓冲区
+
+    事件以显式 ID（"{event_id}-0"）写入，重连时 XREAD 从 Last-Event-ID 之后读取。
+    owner 键与事件键在同一个 pipeline 中续期：生成时间超过 TTL 时流也不会中途失效。
+    """
+
+    def __init__(self, url: str, max_events: int, ttl_seconds: float):
+        self.url = url
+        self.max_events = max_events
+        self.ttl_seconds = int(ttl_seconds)
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    @staticmethod
+    def _events_key(stream_id: str) -> str:
+        return f"sse:{stream_id}:events"
+
+    @staticmethod
+    def _owner_key(stream_id: str) -> str:
+        return f"sse:{stream_id}:owner"
+
+    async def create(self, stream_id: str, owner_id: int):
+        await self.redis.set(self._owner_key(stream_id), owner_id, ex=self.ttl_seconds)
+
+    async def owner(self, stream_id: str) -> Optional[int]:
+        value = await self.redis.get(self._owner_key(stream_id))
+        return int(value) if value is not None else None
+
+    async def append(self, stream_id: str, event_id: int, frame: str):
+        await self._add(stream_id, {"frame": frame}, id=f"{event_id}-0")
+
+    async def finish(self, stream_id: str):
+        await self._add(stream_id, {"done": "1"})
+
+    async def _add(self, stream_id: str, fields: dict, **kwargs):
+        """写入事件并同时续期事件键和 owner 键（一次往返）"""
+        key = self._events_key(stream_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xadd(key, fields, maxlen=self.max_events, approximate=True, **kwargs)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.expire(self._owner_key(stream_id), self.ttl_seconds)
+            await pipe.execute()
+
+    async def read(
+        self,
+        stream_id: str,
+        after: int,
+        timeout: float
+    ) -> Tuple[List[ReplayEvent], bool]:
+        response = await self.redis.xread(
+            {self._events_key(stream_id): f"{after}-0"},
+            count=1000,
+            block=max(1, int(timeout * 1000))
+        )
+
+        events: List[ReplayEvent] = []
+        finished = False
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                if "done" in fields:
+                    finished = True
+                else:
+                    events.append((int(entry_id.split("-")[0]), fields["frame"]))
+        return events, finished
+
+
+class StreamSessionManager:
+    """在后台执行生成流，并支持带 Last-Event-ID 的重连"""
+
+    def __init__(self, backend: ReplayBackend, keepalive_seconds: float = 15.0):
+        self.backend = backend
+        self.keepalive_seconds = keepalive_seconds
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, frames: AsyncIterator[str], owner_id: int) -> str:
+        """
+        在后台任务中消费 SSE 帧并写入重放缓冲区
+
+        Args:
+            frames: 生成流（"data: ...\\n\\n" 格式的 SSE 帧）
+            owner_id: 所属用户ID（重连时校验）
+
+        Returns:
+            str: stream_id
+        """
+        stream_id = uuid.uuid4().hex
+        await self.backend.create(stream_id, owner_id)
+
+        task = asyncio.create_task(self._pump(stream_id, frames), name=f"sse-stream-{stream_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return stream_id
+
+    async def _pump(self, stream_id: str, frames: AsyncIterator[str]):
+        event_id = 1
+        started = json.dumps({"event": "stream", "stream_id": stream_id})
+        await self.backend.append(stream_id, event_id, f"data: {started}\n\n")
+
+        try:
+            async for frame in frames:
+                event_id += 1
+                await self.backend.append(stream_id, event_id, frame)
+        except Exception as e:
+            logger.error(f"SSE stream {stream_id} failed: {e}")
+            event_id += 1
+            error = json.dumps({"event": "error", "message": str(e)}, ensure_ascii=False)
+            await self.backend.append(stream_id, event_id, f"data: {error}\n\n")
+        finally:
+            try:
+                await self.backend.finish(stream_id)
+            except Exception as e:
+                logger.error(f"Failed to finish SSE stream {stream_id}: {e}")
+
+    async def owner(self, stream_id: str) -> Optional[int]:
+        return await self.backend.owner(stream_id)
+
+    async def subscribe(self, stream_id: str, last_event_id: int = 0) -> AsyncIterator[str]:
+        """
+        输出 last_event_id 之后的全部事件，然后跟随实时事件直到生成结束
+
+        Yields:
+            带 "id: N" 的 SSE 帧；空闲时输出 keep-alive 注释
+        """
+        after = last_event_id
+        while True:
+            events, finished = await self.backend.read(stream_id, after, self.keepalive_seconds)
+
+            if events and events[0][0] > after + 1:
+                # 重放缓冲区已丢弃部分事件：通知客户端内容不完整
+                notice = json.dumps({"event": "replay_truncated", "from": events[0][0]})
+                yield f"data: {notice}\n\n"
+
+            for event_id, frame in events:
+                yield f"id: {event_id}\n{frame}"
+                after = event_id
+
+            if finished and not events:
+                return
+            if not events:
+                # 缓冲区已过期 / 被淘汰，或生成进程在 finish 之前退出：
+                # 不会再有新事件，结束而不是无限输出 keep-alive
+                if await self.backend.owner(stream_id) is None:
+                    error = json.dumps({"event": "error", "message": "Stream expired"})
+                    yield f"data: {error}\n\n"
+                    return
+                yield ": keep-alive\n\n"
+
+    async def stop(self):
+        """取消仍在进行的生成（应用关闭时调用）"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """解析 Last-Event-ID 请求头，无效值视为从头开始"""
+    try:
+        return max(0, int(value)) if value else 0
+    except ValueError:
+        return 0
+
+
+def _create_backend() -> ReplayBackend:
+    if settings.SSE_REPLAY_BACKEND == "redis":
+        return RedisReplayBackend(
+            settings.REDIS_URL,
+            max_events=settings.SSE_REPLAY_MAX_EVENTS,
+            ttl_seconds=settings.SSE_REPLAY_TTL_SECONDS,
+        )
+    return MemoryReplayBackend(
+        max_bytes=settings.SSE_REPLAY_MAX_BYTES,
+        ttl_seconds=settings.SSE_REPLAY_TTL_SECONDS,
+    )
+
+
+# Singleton instance
+stream_sessions = StreamSessionManager(
+    _create_backend(),
+    keepalive_seconds=settings.SSE_KEEPALIVE_SECONDS,
+)
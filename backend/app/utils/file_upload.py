@@ -3,34 +3,27 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 from fastapi import UploadFile, HTTPException, status
-from supabase import create_client, Client
 from app.core.config import settings
+from app.services.storage_backends import (
+    StorageBackend,
+    StorageError,
+    get_storage_backend,
+    iter_upload,
+)
 
 
 class ImageUploader:
-    """图片上传工具类 - 使用 Supabase Storage"""
+    """图片上传工具类 - 流式写入存储后端（Supabase Storage / S3 / R2 / 本地）"""
 
     def __init__(self, bucket_name: str = "images"):
         """
         初始化上传器
 
         Args:
-            bucket_name: Supabase Storage 的 bucket 名称，默认为 'images'
+            bucket_name: 存储 bucket 名称，默认为 'images'
         """
         self.bucket_name = bucket_name
 
-        # 检查 Supabase 配置
-        if not settings.SUPABASE_URL or not settings.SUPABASE_SERVICE_KEY:
-            raise ValueError(
-                "Supabase 配置缺失。请在 .env 文件中设置 SUPABASE_URL 和 SUPABASE_SERVICE_KEY"
-            )
-
-        # 初始化 Supabase 客户端（使用 Service Key 以绕过 RLS）
-        self.supabase: Client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_KEY
-        )
-
         # 允许的图片格式和最大文件大小
         self.allowed_content_types = {
             "image/jpeg", "image/jpg", "image/png",
@@ -38,13 +31,24 @@ class ImageUploader:
         }
         self.max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
 
-    def _validate_file(self, file: UploadFile, file_content: bytes) -> str:
+    @property
+    def backend(self) -> StorageBackend:
+        """存储后端，首次使用时创建"""
+        return get_storage_backend(self.bucket_name)
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"文件过大. 最大限制: {settings.MAX_FILE_SIZE_MB}MB"
+        )
+
+    def _validate_file(self, file: UploadFile) -> str:
         """
-        校验文件类型和大小
+        校验文件类型和大小（大小按上传时记录的 file.size，
+        未知时在流式写入过程中校验）
 
         Args:
             file: 上传的文件对象
-            file_content: 文件内容
 
         Returns:
             str: 文件扩展名
@@ -60,11 +64,8 @@ class ImageUploader:
             )
 
         # 2. 校验文件大小
-        if len(file_content) > self.max_size:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"文件过大. 最大限制: {settings.MAX_FILE_SIZE_MB}MB"
-            )
+        if file.size is not None and file.size > self.max_size:
+            raise self._too_large()
 
         # 3. 获取文件扩展名
         file_ext = Path(file.filename).suffix.lower() if file.filename else ".jpg"
@@ -92,7 +93,7 @@ class ImageUploader:
 
     async def save_image(self, file: UploadFile, folder: str = "uploads") -> str:
         """
-        上传图片到 Supabase Storage 并返回公开访问 URL
+        流式上传图片到存储后端并返回公开访问 URL
 
         Args:
             file: FastAPI 的 UploadFile 对象
@@ -105,33 +106,34 @@ class ImageUploader:
             HTTPException: 上传失败
         """
         try:
-            # 1. 读取文件内容
-            file_content = await file.read()
+            # 1. 校验文件
+            file_ext = self._validate_file(file)
 
-            # 2. 校验文件
-            file_ext = self._validate_file(file, file_content)
-
-            # 3. 生成存储路径
+            # 2. 生成存储路径
             file_path = self._generate_file_path(file_ext, folder)
 
-            # 4. 上传到 Supabase Storage
-            response = self.supabase.storage.from_(self.bucket_name).upload(
-                path=file_path,
-                file=file_content,
-                file_options={"content-type": file.content_type}
+            # 3. 按块上传（超过大小限制时中止）
+            await self.backend.put(
+                file_path,
+                iter_upload(file, limit=self.max_size),
+                content_type=file.content_type,
+                size=file.size
             )
 
-            # 5. 获取公开访问 URL
-            public_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
-
-            # 6. 重置文件指针（如果后续还需要使用）
-            await file.seek(0)
-
-            return public_url
+            # 4. 获取公开访问 URL
+            return self.backend.public_url(file_path)
 
         except HTTPException:
             # 重新抛出已知的业务异常
             raise
+        except StorageError as e:
+            if e.status_code == 413:
+                raise self._too_large()
+            print(f"[ImageUploader] 上传失败: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"图片上传失败: {e}"
+            )
         except Exception as e:
             # 捕获所有其他异常并记录
             error_msg = str(e)
@@ -0,0 +1,47 @@
+"""
+Standalone generation worker
+
+Runs the durable generation queue outside the API process so that
+generation throughput scales independently of request serving:
+
+    python -m app.worker
+
+Set GENERATION_WORKER_EMBEDDED=false on the API process when running
+dedicated workers.
+"""
+import asyncio
+import logging
+import signal
+
+from app.core.service_registry import service_registry
+from app.core.supabase_db import engine
+from app.services.ai_service import ai_service
+from app.services.generation_queue import generation_queue
+
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await service_registry.warm_up()
+    await ai_service.start_token_refresh()
+    generation_queue.start()
+    print(f"Generation worker running: {generation_queue.worker_id}")
+
+    await stop_event.wait()
+
+    # Shutdown
+    await generation_queue.stop()
+    await ai_service.stop_token_refresh()
+    await engine.dispose()
+    print("Generation worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+批量迁移课程 HTML 到对象存储
+
+把旧数据 Course.content = {"generated": html} 写入内容寻址存储，
+行上只保留 content_hash / content_size / content_url，并清空 content 列。
+（未迁移的行在被读取时也会惰性迁移，此脚本用于一次性批量处理）
+
+用法: python migrate_course_content.py [batch_size]
+"""
+import asyncio
+import sys
+
+from sqlalchemy import select
+
+from app.core.supabase_db import AsyncSessionLocal, engine
+from app.models import *  # 导入所有模型（解析关系）
+from app.models.course import Course
+from app.services.course_content_store import course_content_store
+
+
+async def migrate_course_content(batch_size: int = 50):
+    """分批迁移，每批一个事务"""
+    migrated = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Course)
+                .where(
+                    Course.id > last_id,
+                    Course.content_hash.is_(None),
+                    Course.content.isnot(None)
+                )
+                .order_by(Course.id)
+                .limit(batch_size)
+            )
+            courses = result.scalars().all()
+
+            if not courses:
+                break
+
+            for course in courses:
+                last_id = course.id
+                try:
+                    if await course_content_store.migrate(course):
+                        migrated += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ 课程 {course.id} 迁移失败: {e}")
+
+            await db.commit()
+            print(f"✅ 已迁移 {migrated} 个课程（最后 ID: {last_id}）")
+
+    print(f"\n完成：迁移 {migrated} 个，失败 {failed} 个")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    asyncio.run(migrate_course_content(size))